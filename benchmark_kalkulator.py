@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark generowania kalkulatora nieruchomości.
+
+Mierzy:
+  * czas importu skryptu (python -X importtime) – budżet --import-budget,
+    openpyxl nie może być ładowany przy samym imporcie,
+  * czas i szczyt pamięci (tracemalloc) każdej funkcji create_*_sheet,
+  * pełne budowanie + zapis skoroszytu (zwykły i strumieniowy) i rozmiar pliku,
+  * przepustowość trybu wsadowego (pełne budowanie i --template)
+dla kilku długości harmonogramu miesięcznego i kilku rozmiarów paczki.
+
+Wyniki zapisywane są jako JSON; --compare porównuje je z poprzednim
+przebiegiem i kończy się kodem 1, jeśli któryś pomiar czasu lub pamięci
+pogorszył się ponad tolerancję. Kodem 1 kończy się też przekroczenie
+budżetu czasu importu.
+
+PRZYKŁAD:
+    python3 benchmark_kalkulator.py --months 360 1200 --batch-sizes 1 20 \
+        --output benchmark.json
+    python3 benchmark_kalkulator.py --compare benchmark.json
+"""
+
+import argparse
+import contextlib
+import csv
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build_kalkulator_nieruchomosc_ch _final.py')
+
+# Pomiary mniejsze niż to (w sekundach / bajtach) nie są zgłaszane jako regresje – to szum.
+MIN_SECONDS = 0.005
+MIN_BYTES = 256 * 1024
+
+# Budżet czasu importu skryptu w sekundach (zimny start, bez openpyxl).
+IMPORT_BUDGET = 0.25
+
+# Import skryptu w osobnym procesie; znacznik @@ oddziela importy samego interpretera i importlib
+_IMPORT_SCRIPT = (
+    "import importlib.util, sys; sys.stderr.write('@@\\n'); sys.stderr.flush(); "
+    "spec = importlib.util.spec_from_file_location('build_kalkulator', sys.argv[1]); "
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+)
+
+
+def load_script():
+    """Ładuje skrypt budujący (nazwa pliku zawiera spację, więc nie da się go zaimportować wprost)."""
+    module = sys.modules.get('build_kalkulator')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('build_kalkulator', SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        # Rejestracja w sys.modules – procesy robocze trybu wsadowego odnajdują funkcje po nazwie modułu
+        sys.modules['build_kalkulator'] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+def bench_startup(repeat):
+    """
+    Koszt importu skryptu według `python -X importtime` (nowy proces przy
+    każdym pomiarze, liczy się najlepszy): suma czasów importów najwyższego
+    poziomu, najcięższe z nich i to, czy załadowano openpyxl.
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _IMPORT_SCRIPT, SCRIPT],
+                                cwd=os.path.dirname(SCRIPT), capture_output=True, text=True, check=True)
+        top_level = {}
+        modules = set()
+        for line in result.stderr.partition('@@\n')[2].splitlines():
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line.split('|')
+            modules.add(name.strip())
+            if not name.startswith('  '):
+                top_level[name.strip()] = int(cumulative) / 1e6
+        seconds = sum(top_level.values())
+        if best is None or seconds < best['seconds']:
+            heaviest = sorted(top_level.items(), key=lambda item: -item[1])[:5]
+            best = {
+                'seconds': seconds,
+                'modules': len(modules),
+                'openpyxl': any(name.split('.')[0] == 'openpyxl' for name in modules),
+                'heaviest': [[name, value] for name, value in heaviest],
+            }
+    return best
+
+
+def _call_builder(script, builder, wb, months):
+    if builder is script.create_monthly_schedule_sheet:
+        builder(wb, months=months)
+    else:
+        builder(wb)
+
+
+def bench_sheets(script, months, repeat):
+    """
+    Czas i szczyt pamięci każdego buildera. Arkusze budowane są po kolei
+    w jednym skoroszycie (jak w main), a czas to najlepszy z repeat przebiegów.
+    """
+    results = {name: {'seconds': None} for name, _ in script.SHEET_BUILDERS}
+    for _ in range(repeat):
+        wb = script.new_workbook()
+        for name, builder in script.SHEET_BUILDERS:
+            start = time.perf_counter()
+            _call_builder(script, builder, wb, months)
+            elapsed = time.perf_counter() - start
+            best = results[name]['seconds']
+            results[name]['seconds'] = elapsed if best is None else min(best, elapsed)
+
+    # Osobny przebieg z tracemalloc – śledzenie alokacji spowalnia, więc nie miesza się z czasami
+    wb = script.new_workbook()
+    tracemalloc.start()
+    for name, builder in script.SHEET_BUILDERS:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        _call_builder(script, builder, wb, months)
+        results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return results
+
+
+def bench_end_to_end(script, months, streaming, repeat, workdir):
+    """Pełne budowanie i zapis skoroszytu: czasy, szczyt pamięci, rozmiar pliku."""
+    filename = os.path.join(workdir, f'e2e_{months}_{int(streaming)}.xlsx')
+    build_best = save_best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        wb = script.build_workbook(streaming=streaming, months=months)
+        built = time.perf_counter()
+        script.save_workbook(wb, filename)
+        saved = time.perf_counter()
+        build_best = built - start if build_best is None else min(build_best, built - start)
+        save_best = saved - built if save_best is None else min(save_best, saved - built)
+
+    tracemalloc.start()
+    script.save_workbook(script.build_workbook(streaming=streaming, months=months), filename)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'months': months,
+        'streaming': streaming,
+        'build_seconds': build_best,
+        'save_seconds': save_best,
+        'total_seconds': build_best + save_best,
+        'peak_bytes': peak,
+        'size_bytes': os.path.getsize(filename),
+    }
+
+
+def write_clients(path, count):
+    """Deterministyczny plik klientów dla trybu wsadowego."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'price', 'cash', 'pillar2', 'rate_h1', 'rate_h2', 'amort_type',
+                         'income', 'voluntary_h1', 'hoa', 'rent'])
+        for idx in range(count):
+            writer.writerow([f'B{idx:05d}', 800_000 + 10_000 * (idx % 50), 150_000 + 1_000 * (idx % 30),
+                             40_000, 0.015 + 0.0005 * (idx % 10), 0.02, 'DN'[idx % 2],
+                             160_000 + 500 * idx, 5_000, 3_000, 2_500])
+
+
+def bench_batch(script, count, template, months, workers, workdir):
+    """Przepustowość trybu wsadowego dla count klientów."""
+    clients = os.path.join(workdir, f'klienci_{count}.csv')
+    write_clients(clients, count)
+    argv = ['--batch', clients, '--output-dir', os.path.join(workdir, f'batch_{count}_{int(template)}'),
+            '--months', str(months)]
+    if workers:
+        argv += ['--workers', str(workers)]
+    if template:
+        argv.append('--template')
+    args = script.parse_args(argv)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        failures = script.run_batch(args)
+    elapsed = time.perf_counter() - start
+    return {
+        'clients': count,
+        'mode': 'template' if template else 'full',
+        'workers': workers or os.cpu_count(),
+        'seconds': elapsed,
+        'workbooks_per_second': count / elapsed,
+        'failures': failures,
+    }
+
+
+def run(months_list, batch_sizes, repeat, workers):
+    script = load_script()
+    import numpy
+    import openpyxl
+
+    report = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'openpyxl': openpyxl.__version__,
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+        },
+        'startup': {},
+        'sheets': {},
+        'end_to_end': [],
+        'batch': [],
+    }
+    print("  -> import skryptu...")
+    report['startup'] = bench_startup(repeat)
+    with tempfile.TemporaryDirectory() as workdir:
+        for months in months_list:
+            print(f"  -> arkusze, {months} miesięcy...")
+            report['sheets'][str(months)] = bench_sheets(script, months, repeat)
+            for streaming in (False, True):
+                print(f"  -> pełny zapis, {months} miesięcy{' (strumieniowo)' if streaming else ''}...")
+                report['end_to_end'].append(bench_end_to_end(script, months, streaming, repeat, workdir))
+        for count in batch_sizes:
+            for template in (False, True):
+                print(f"  -> tryb wsadowy, {count} klientów{' (--template)' if template else ''}...")
+                report['batch'].append(bench_batch(script, count, template, months_list[0], workers, workdir))
+    return report
+
+
+def metrics(report):
+    """Spłaszcza raport do {nazwa pomiaru: (wartość, rodzaj)}; rodzaj: 'seconds', 'bytes' lub 'rate'."""
+    flat = {}
+    if report.get('startup'):
+        flat['startup/import_seconds'] = (report['startup']['seconds'], 'seconds')
+    for months, sheets in report.get('sheets', {}).items():
+        for name, values in sheets.items():
+            flat[f'sheets/{months}/{name}/seconds'] = (values['seconds'], 'seconds')
+            flat[f'sheets/{months}/{name}/peak_bytes'] = (values['peak_bytes'], 'bytes')
+    for entry in report.get('end_to_end', []):
+        prefix = f"end_to_end/{entry['months']}/{'streaming' if entry['streaming'] else 'normal'}"
+        for key in ('build_seconds', 'save_seconds', 'total_seconds'):
+            flat[f'{prefix}/{key}'] = (entry[key], 'seconds')
+        flat[f'{prefix}/peak_bytes'] = (entry['peak_bytes'], 'bytes')
+    for entry in report.get('batch', []):
+        flat[f"batch/{entry['clients']}/{entry['mode']}/workbooks_per_second"] = (entry['workbooks_per_second'], 'rate')
+    return flat
+
+
+def compare(old, new, tolerance):
+    """Lista regresji (nazwa, stara wartość, nowa wartość) przy danej tolerancji względnej."""
+    old_metrics = metrics(old)
+    regressions = []
+    for name, (value, kind) in metrics(new).items():
+        if name not in old_metrics:
+            continue
+        previous = old_metrics[name][0]
+        if kind == 'rate':
+            worse = value < previous * (1 - tolerance)
+        elif kind == 'seconds':
+            worse = value > previous * (1 + tolerance) and value - previous > MIN_SECONDS
+        else:
+            worse = value > previous * (1 + tolerance) and value - previous > MIN_BYTES
+        if worse:
+            regressions.append((name, previous, value))
+    return regressions
+
+
+def print_summary(report):
+    startup = report['startup']
+    print(f"\nImport skryptu: {startup['seconds'] * 1000:.1f} ms, modułów: {startup['modules']}, "
+          f"openpyxl: {'tak' if startup['openpyxl'] else 'nie'}")
+    for name, seconds in startup['heaviest']:
+        print(f"  {name:34s} {seconds * 1000:8.1f} ms")
+    for months, sheets in report['sheets'].items():
+        print(f"\nArkusze ({months} miesięcy):")
+        for name, values in sorted(sheets.items(), key=lambda item: -item[1]['seconds']):
+            print(f"  {name:34s} {values['seconds'] * 1000:8.1f} ms {values['peak_bytes'] / 1024:10.0f} KB")
+    print("\nPełny zapis:")
+    for entry in report['end_to_end']:
+        mode = 'strumieniowo' if entry['streaming'] else 'zwykle'
+        print(f"  {entry['months']:6d} mies. {mode:13s} budowa {entry['build_seconds']:.3f} s, "
+              f"zapis {entry['save_seconds']:.3f} s, pamięć {entry['peak_bytes'] / 2**20:.1f} MB, "
+              f"plik {entry['size_bytes'] / 1024:.0f} KB")
+    print("\nTryb wsadowy:")
+    for entry in report['batch']:
+        print(f"  {entry['clients']:6d} klientów {entry['mode']:9s} {entry['seconds']:.2f} s "
+              f"({entry['workbooks_per_second']:.1f} skoroszytów/s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark generowania kalkulatora nieruchomości.')
+    parser.add_argument('--months', type=int, nargs='+', default=[360, 600, 1200],
+                        help='długości harmonogramu miesięcznego (domyślnie: %(default)s)')
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 10, 50],
+                        help='liczby klientów w trybie wsadowym (domyślnie: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='liczba powtórzeń pomiaru czasu, liczy się najlepszy (domyślnie: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='procesy w trybie wsadowym (domyślnie: liczba rdzeni)')
+    parser.add_argument('-o', '--output', default='benchmark_kalkulator.json',
+                        help='plik wyników JSON (domyślnie: %(default)s)')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='porównaj z poprzednim wynikiem i zakończ kodem 1 przy regresji')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET,
+                        help='maksymalny czas importu skryptu w sekundach (domyślnie: %(default)s)')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='dopuszczalne pogorszenie względne przy --compare (domyślnie: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    previous = None
+    if args.compare:
+        # Wczytujemy przed zapisem – plik porównania może być tym samym co --output
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+
+    print("Benchmark kalkulatora nieruchomości...")
+    report = run(args.months, args.batch_sizes, args.repeat, args.workers)
+    print_summary(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Wyniki zapisane w '{args.output}'")
+
+    status = 0
+    startup = report['startup']
+    if startup['openpyxl'] or startup['seconds'] > args.import_budget:
+        print(f"\n⚠️  Import skryptu: {startup['seconds'] * 1000:.1f} ms (budżet {args.import_budget * 1000:.0f} ms)"
+              f"{', ładuje openpyxl' if startup['openpyxl'] else ''}")
+        status = 1
+
+    if previous is not None:
+        regressions = compare(previous, report, args.tolerance)
+        if regressions:
+            print(f"\n⚠️  Regresje względem '{args.compare}' (tolerancja {args.tolerance:.0%}):")
+            for name, old, new in regressions:
+                print(f"  {name}: {old:.4g} -> {new:.4g}")
+            return 1
+        print(f"\nBrak regresji względem '{args.compare}'.")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,12 +4,49 @@ Skrypt tworzący rozszerzony kalkulator opłacalności zakupu nieruchomości w S
 Wersja z harmonogramami rocznymi i miesięcznymi oraz dobrowolną amortyzacją H1.
 
 INSTRUKCJA UŻYCIA (Linux Mint):
-1. Zainstaluj openpyxl: 
-   sudo apt install python3-openpyxl
+1. Zainstaluj openpyxl i NumPy: 
+   sudo apt install python3-openpyxl python3-numpy
    
 2. Uruchom skrypt:
    python3 build_kalkulator_nieruchomosc_ch.py
    
+   Opcje (python3 build_kalkulator_nieruchomosc_ch.py --help):
+     -o PLIK            nazwa pliku wynikowego
+     --years N          horyzont analizy: harmonogram roczny i tabele roczne (domyślnie 30)
+     --months N         długość harmonogramu miesięcznego (domyślnie 12 * --years)
+     --streaming        zapis strumieniowy (write-only) – stała pamięć przy długich harmonogramach
+     --cached-values    zapisz obliczone wartości obok formuł
+     --no-check         pomiń kontrolę odwołań formuł (brakujące arkusze/komórki)
+     --batch PLIK       jeden skoroszyt na klienta z pliku CSV/JSON (z --output-dir, --workers)
+     --template         w trybie wsadowym: klonowanie gotowego pakietu zamiast budowania od nowa
+     --monte-carlo PLIK losowe ścieżki stóp (rozszerzenie 11_Stress_test) dla klientów z pliku
+                        (z --paths, --rate-volatility, --seed)
+     --backtest PLIK --rates STOPY.csv
+                        historyczne stopy przez harmonogram miesięczny (okno = --months)
+     --scenarios PLIK --plans PLANY.json
+                        scenariusze wzrostu (08) × plany remontów (16) × lata, równolegle (z --workers)
+     --export PLIK      serie czasowe silnika (harmonogramy, ROI, wzrost wartości, ETF/3a)
+                        jako pliki Parquet/Arrow w --output-dir (--format, --chunk-size; wymaga pyarrow)
+     --harvest PLIK/KATALOG ... [--dataset KLIENCI.csv]
+                        zebranie pól wejściowych z wypełnionych skoroszytów klientów do jednej tabeli
+                        (CSV/JSON jak dla --batch; z --workers)
+     --store PLIK [--store-dir KATALOG]
+                        harmonogramy miesięczne całego portfela w magazynie na dysku (np.memmap)
+                        do zapytań o salda i przepływy wszystkich klientów (kalkulator_magazyn)
+     --serve HOST:PORT | --socket ŚCIEŻKA
+                        lokalna usługa HTTP: POST /kpi (wyniki silnika) i POST /workbook (skoroszyt
+                        z szablonu) dla danych klienta w JSON; stałe procesy robocze (--workers)
+                        i pamięć wyników (--result-cache)
+     --tornado PLIK     wrażliwość Tragbarkeit, cash-outu i wyniku sprzedaży na każdy parametr (z --bump)
+     --cache KATALOG    pamięć podręczna XML arkuszy – przebudowywane są tylko arkusze, których
+                        funkcja, dane lub wersja openpyxl się zmieniły (także w --batch)
+     --output-cache KATALOG [--output-cache-size MB]
+                        gotowe skoroszyty (--batch) i wyniki usługi (--serve) pod skrótem
+                        znormalizowanych danych klienta i wersji modelu; identyczni klienci
+                        nie są budowani ponownie (kalkulator_pamiec)
+     --table, --report PLIK.json [--trace-memory]
+                        pomiary każdego arkusza i zapisu (czas, CPU, pamięć, komórki, formuły, style)
+   
 3. Plik kalkulator_nieruchomosc_CH.xlsx zostanie utworzony w bieżącym katalogu
 
 4. Otwórz plik w LibreOffice Calc:
@@ -21,40 +58,357 @@ UŻYTKOWNIK: matin-chuj
 SYSTEM: Linux Mint
 """
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.styles.numbers import FORMAT_PERCENTAGE_00, FORMAT_NUMBER_00
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+import weakref
+from copy import copy
+
+from kalkulator_formuly import column_letters as get_column_letter, split_coordinate
+from kalkulator_silnik import (APPRECIATION_CELLS, CONSTANTS, CONSTANT_CELLS, DEFAULT_CONSTANTS, INPUT_CELLS,
+                               SALE_CELLS, backtest, client_arrays, financing, key_outputs, read_clients,
+                               read_rate_history, renovation_scenarios, sale_parameters, sensitivity, simulate_rates,
+                               split_clients, write_clients)
+from kalkulator_xlsx import (WorkbookTemplate, add_cached_values, check_references, extract_sheet, filled_cells,
+                             read_cells, splice_sheets)
+
+# Formaty liczbowe jak w openpyxl.styles.numbers
+FORMAT_PERCENTAGE_00 = '0.00%'
+FORMAT_NUMBER_00 = '0.00'
+
+# Klasy openpyxl – ustawiane przez load_openpyxl() przy pierwszym budowaniu skoroszytu
+Workbook = MergedCell = WriteOnlyCell = None
+Font = PatternFill = Alignment = Border = Side = DifferentialStyle = None
+CellIsRule = FormulaRule = Rule = DataValidation = None
+SharedFormula = None
+
+
+def load_openpyxl():
+    """
+    Importuje openpyxl (skoroszyt, style, formatowanie warunkowe, walidację)
+    do przestrzeni nazw modułu.
+
+    openpyxl to zdecydowanie najdroższy import skryptu, a nie każde
+    uruchomienie go potrzebuje: --help, procesy robocze trybu --template
+    (tylko klonują gotowy pakiet) czy samo zaimportowanie modułu, żeby
+    sięgnąć po stałe. Dlatego ładujemy go dopiero przed zbudowaniem
+    pierwszego skoroszytu (new_workbook, StreamingWorkbook); kolejne
+    wywołania nic nie robią.
+    """
+    global Workbook, MergedCell, WriteOnlyCell, Font, PatternFill, Alignment, Border, Side
+    global DifferentialStyle, CellIsRule, FormulaRule, Rule, DataValidation, SharedFormula
+    if Workbook is not None:
+        return
+    from openpyxl.cell import MergedCell, WriteOnlyCell
+    from openpyxl.formatting.rule import CellIsRule, FormulaRule, Rule
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.styles.differential import DifferentialStyle
+    from openpyxl.worksheet.datavalidation import DataValidation
+    from openpyxl.worksheet.formula import ArrayFormula
+    SharedFormula = _shared_formula_type(ArrayFormula)
+    # Workbook na końcu – jego obecność oznacza, że wszystkie nazwy są już ustawione
+    from openpyxl import Workbook
+
+
+def _shared_formula_type(ArrayFormula):
+    """
+    Formuła współdzielona (<f t="shared" ref=".." si="..">) dla openpyxl,
+    który sam zapisuje tylko formuły tablicowe i tabele danych: pisarz
+    komórek przepisuje atrybuty i tekst ArrayFormula do elementu <f>, więc
+    wystarczy podklasa z t="shared" i numerem si (komórki poza główną nie
+    mają tekstu ani zakresu).
+    """
+    class SharedFormula(ArrayFormula):
+        t = 'shared'
+
+        def __init__(self, si, ref=None, text=None):
+            super().__init__(ref, text)
+            self.si = si
+
+        def __iter__(self):
+            yield from super().__iter__()
+            yield 'si', str(self.si)
+
+    return SharedFormula
+
+
+def new_workbook(streaming=False):
+    """Pusty skoroszyt (bez domyślnego arkusza 'Sheet') – zwykły albo StreamingWorkbook."""
+    load_openpyxl()
+    wb = StreamingWorkbook() if streaming else Workbook()
+    if 'Sheet' in wb.sheetnames:
+        wb.remove(wb['Sheet'])
+    return wb
+
+
+class StyleRegistry:
+    """
+    Rejestr stylów dla set_cell_style.
+
+    Każda kombinacja argumentów (pogrubienie, rozmiar, tło, ramka, format,
+    wyrównanie) tworzy obiekty Font/PatternFill/Border/Alignment tylko raz.
+    Dodatkowo dla każdego skoroszytu zapamiętywany jest gotowy StyleArray
+    (indeksy stylu w skoroszycie), więc stylowanie nowej komórki to jedno
+    wyszukanie w słowniku i skopiowanie tablicy indeksów.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self._objects = {}
+        self._arrays = weakref.WeakKeyDictionary()
+
+    def objects(self, key):
+        """Zwraca (font, fill, border, alignment) dla klucza stylu – tworzone przy pierwszym użyciu."""
+        objects = self._objects.get(key)
+        if objects is None:
+            font_bold, font_size, bg_color, border, _, alignment = key
+            font = Font(name='Calibri', size=font_size, bold=font_bold) if font_bold or font_size != 11 else None
+            fill = PatternFill(start_color=bg_color, end_color=bg_color, fill_type='solid') if bg_color else None
+            thin = Side(style='thin')
+            borders = Border(left=thin, right=thin, top=thin, bottom=thin) if border else None
+            if alignment not in ('center', 'right'):
+                alignment = 'left'
+            objects = (font, fill, borders, Alignment(horizontal=alignment, vertical='center'))
+            self._objects[key] = objects
+        return objects
+
+    def apply(self, cell, key):
+        self.calls += 1
+        wb = cell.parent.parent
+        arrays = self._arrays.get(wb)
+        if arrays is None:
+            arrays = self._arrays[wb] = {}
+        
+        plain = not cell.has_style
+        if plain:
+            style = arrays.get(key)
+            if style is not None:
+                self.hits += 1
+                cell._style = copy(style)
+                return
+        
+        font, fill, borders, alignment = self.objects(key)
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if borders is not None:
+            cell.border = borders
+        if key[4]:
+            cell.number_format = key[4]
+        cell.alignment = alignment
+        
+        # Zapamiętujemy tylko styl nałożony na komórkę bez stylu – wynik zależy wtedy wyłącznie od klucza
+        if plain:
+            arrays[key] = copy(cell._style)
+
+    def stats(self, wb=None):
+        """
+        Statystyki rejestru; dla podanego skoroszytu także liczba faktycznie
+        użytych stylów (openpyxl zbiera style komórek przy zapisie, więc
+        wywoływać po wb.save).
+        """
+        stats = {
+            'calls': self.calls,
+            'hits': self.hits,
+            'style_keys': len(self._objects),
+        }
+        if wb is not None:
+            stats.update({
+                'cell_styles': len(wb._cell_styles),
+                'fonts': len(wb._fonts),
+                'fills': len(wb._fills),
+                'borders': len(wb._borders),
+                'alignments': len(wb._alignments),
+                'number_formats': len(wb._number_formats),
+            })
+        return stats
+
+
+STYLES = StyleRegistry()
 
 
 def set_cell_style(cell, font_bold=False, font_size=11, bg_color=None, 
                    border=True, number_format=None, alignment='left'):
-    """Pomocnicza funkcja do ustawiania stylu komórki."""
-    if font_bold or font_size != 11:
-        cell.font = Font(name='Calibri', size=font_size, bold=font_bold)
-    
-    if bg_color:
-        cell.fill = PatternFill(start_color=bg_color, end_color=bg_color, fill_type='solid')
-    
-    if border:
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        cell.border = thin_border
-    
-    if number_format:
-        cell.number_format = number_format
-    
-    if alignment == 'center':
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    elif alignment == 'right':
-        cell.alignment = Alignment(horizontal='right', vertical='center')
+    """Pomocnicza funkcja do ustawiania stylu komórki (style współdzielone przez STYLES)."""
+    STYLES.apply(cell, (font_bold, font_size, bg_color, border, number_format, alignment))
+
+
+class StreamingSheet:
+    """
+    Arkusz write-only openpyxl z tym samym interfejsem co zwykły arkusz
+    (ws['B4'], ws.cell(row, column), merge_cells, add_data_validation).
+
+    Komórki są buforowane wierszami i dopisywane do pliku w kolejności
+    wierszy przy flush() lub zamknięciu arkusza. Wierszy już zapisanych
+    nie można zmieniać; szerokości kolumn i freeze_panes trzeba ustawić
+    przed pierwszym flush().
+    """
+
+    def __init__(self, ws):
+        object.__setattr__(self, '_ws', ws)
+        object.__setattr__(self, '_rows', {})
+        object.__setattr__(self, '_written', 0)
+        object.__setattr__(self, '_counts', [0, 0])
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._ws, name, value)
+
+    def __getitem__(self, coordinate):
+        row, column = split_coordinate(coordinate)
+        return self.cell(row=row, column=column)
+
+    def __setitem__(self, coordinate, value):
+        self[coordinate].value = value
+
+    def cell(self, row, column, value=None):
+        if row <= self._written:
+            raise ValueError(f'Wiersz {row} arkusza {self._ws.title} został już zapisany')
+        cells = self._rows.setdefault(row, {})
+        cell = cells.get(column)
+        if cell is None:
+            cell = WriteOnlyCell(self._ws)
+            cell.row = row
+            cell.column = column
+            cells[column] = cell
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def merge_cells(self, range_string):
+        self._ws.merged_cells.add(range_string)
+
+    def add_data_validation(self, data_validation):
+        self._ws.data_validations.append(data_validation)
+
+    def flush(self, last_row=None):
+        """Zapisuje buforowane wiersze do last_row włącznie (domyślnie wszystkie)."""
+        if last_row is None:
+            last_row = max(self._rows, default=self._written)
+        for row in range(self._written + 1, last_row + 1):
+            cells = self._rows.pop(row, {})
+            self._counts[0] += len(cells)
+            self._counts[1] += sum(1 for cell in cells.values() if cell.data_type == 'f')
+            self._ws.append([cells.get(col) for col in range(1, max(cells, default=0) + 1)])
+        object.__setattr__(self, '_written', max(self._written, last_row))
+
+    def counts(self):
+        """(komórki, formuły) zapisane dotąd i czekające w buforze."""
+        buffered = [cell for cells in self._rows.values() for cell in cells.values()]
+        return (self._counts[0] + len(buffered),
+                self._counts[1] + sum(1 for cell in buffered if cell.data_type == 'f'))
+
+    def close(self):
+        self.flush()
+        self._ws.close()
+
+
+class StreamingWorkbook:
+    """
+    Skoroszyt write-only: każdy arkusz jest zamykany (zapisywany do pliku
+    tymczasowego) w chwili utworzenia następnego, więc w pamięci jest
+    naraz co najwyżej jeden arkusz.
+    """
+
+    def __init__(self):
+        load_openpyxl()
+        object.__setattr__(self, '_wb', Workbook(write_only=True))
+        object.__setattr__(self, '_current', None)
+
+    def __getattr__(self, name):
+        return getattr(self._wb, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._wb, name, value)
+
+    def __getitem__(self, title):
+        # Otwarty (bieżący) arkusz można jeszcze uzupełniać przez interfejs StreamingSheet
+        if self._current is not None and self._current.title == title:
+            return self._current
+        return self._wb[title]
+
+    def _close_current(self):
+        if self._current is not None and not self._current.closed:
+            self._current.close()
+
+    def create_sheet(self, title, index=None):
+        self._close_current()
+        sheet = StreamingSheet(self._wb.create_sheet(title, index))
+        object.__setattr__(self, '_current', sheet)
+        return sheet
+
+    def save(self, filename):
+        self._close_current()
+        self._wb.save(filename)
+
+
+def flush_rows(ws, last_row):
+    """W trybie strumieniowym zapisuje wiersze do last_row włącznie; dla zwykłego arkusza nic nie robi."""
+    if isinstance(ws, StreamingSheet):
+        ws.flush(last_row)
+
+
+# Następny wolny numer si formuły współdzielonej w arkuszu (numery są unikalne w obrębie arkusza).
+_SHARED_FORMULA_IDS = weakref.WeakKeyDictionary()
+
+
+class FillDown:
+    """
+    Kolumny tabeli wypełnianej w dół (wiersze first_row..last_row) jako
+    formuły współdzielone: formulas = {kolumna: formuła pierwszego wiersza}.
+    Tekst formuły i zakres ma tylko komórka w first_row, pozostałe – numer
+    si; Excel, LibreOffice i openpyxl przesuwają względne odwołania jak przy
+    przeciąganiu formuły w dół. XML arkusza jest kilkakrotnie mniejszy
+    i szybciej się wczytuje.
+
+    write(row) wpisuje formuły jednego wiersza, więc tabelę zapisuje się
+    wiersz po wierszu, jak dotąd (z flush_rows w trybie strumieniowym).
+    """
+
+    def __init__(self, ws, first_row, last_row, formulas):
+        self.ws = ws
+        self.first_row = first_row
+        self.last_row = last_row
+        self.formulas = formulas
+        self.ids = {}
+        if last_row > first_row:
+            first_id = _SHARED_FORMULA_IDS.get(ws, 0)
+            self.ids = {col: si for si, col in enumerate(formulas, start=first_id)}
+            _SHARED_FORMULA_IDS[ws] = first_id + len(formulas)
+
+    def write(self, row):
+        for col, formula in self.formulas.items():
+            cell = self.ws.cell(row=row, column=col)
+            if col not in self.ids:
+                cell.value = formula
+            elif row == self.first_row:
+                letter = get_column_letter(col)
+                cell.value = SharedFormula(self.ids[col], f'{letter}{row}:{letter}{self.last_row}', formula)
+            else:
+                cell.value = SharedFormula(self.ids[col])
+
+
+def horizon(years, preposition='po'):
+    """Horyzont analizy w opisach arkuszy, z odmianą: 'po 10 latach', 'przez 1 rok', 'przez 22 lata'."""
+    if preposition == 'po':
+        return f'po {years} roku' if years == 1 else f'po {years} latach'
+    if years == 1:
+        noun = 'rok'
+    elif years % 10 in (2, 3, 4) and years % 100 not in (12, 13, 14):
+        noun = 'lata'
     else:
-        cell.alignment = Alignment(horizontal='left', vertical='center')
+        noun = 'lat'
+    return f'{preposition} {years} {noun}'
 
 
 def create_constants_sheet(wb):
@@ -68,19 +422,7 @@ def create_constants_sheet(wb):
     for cell in ['A1', 'B1', 'C1']:
         set_cell_style(ws[cell], font_bold=True)
     
-    data = [
-        ('Min. wkład własny ogółem', 0.20, 'Minimum 20% wartości nieruchomości'),
-        ('Min. wkład własny gotówkowy', 0.10, 'Minimum 10% z gotówki (nie z filarów)'),
-        ('LTV docelowe po amortyzacji', 0.65, 'Loan-to-Value po spłacie Hypoteki 2'),
-        ('Lata amortyzacji do 65%', 15, 'Liczba lat na amortyzację'),
-        ('Oprocentowanie testowe (bank)', 0.05, 'Stopa używana przez bank do testu zdolności'),
-        ('Roczne koszty utrzymania (test)', 0.01, '1% wartości nieruchomości rocznie'),
-        ('Max. Tragbarkeit (udział dochodu)', 0.33, 'Maksymalny udział kosztów w dochodzie'),
-        ('Kurs CHF/PLN', 4.60, 'Aktualny kurs franka szwajcarskiego'),
-        ('Procent kosztów transakcyjnych (notariusz itd.)', 0.016, 'Szacunkowe koszty notarialne i opłaty'),
-    ]
-    
-    for idx, (param, value, desc) in enumerate(data, start=2):
+    for idx, (_, param, value, desc) in enumerate(CONSTANTS, start=2):
         ws[f'A{idx}'] = param
         ws[f'B{idx}'] = value
         ws[f'C{idx}'] = desc
@@ -110,15 +452,9 @@ def create_input_sheet(wb):
     ws['B4'] = ''
     set_cell_style(ws['A4'])
     set_cell_style(ws['B4'], bg_color='CCE5FF', number_format='#,##0.00')
-
-
-   ws['B4'] = ''
-   set_cell_style(ws['A4'])
-   set_cell_style(ws['B4'], bg_color='CCE5FF', number_format='#,##0.00')
-
-   # DODAJ:
-   ws['C4'] = '=IF(B4>0,"","⚠️ Wprowadź cenę > 0")'
-   set_cell_style(ws['C4'], bg_color='FFC7CE', border=False)
+    
+    ws['C4'] = '=IF(B4>0,"","⚠️ Wprowadź cenę > 0")'
+    set_cell_style(ws['C4'], bg_color='FFC7CE', border=False)
     
     ws['A5'] = 'Szacunkowy % kosztów transakcyjnych'
     ws['B5'] = "='00_Stałe'!B10"
@@ -383,7 +719,6 @@ def create_tragbarkeit_sheet(wb):
     set_cell_style(ws['A13'])
     set_cell_style(ws['B13'], bg_color='F2F2F2', font_bold=True)
     
-    from openpyxl.formatting.rule import CellIsRule
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     ws.conditional_formatting.add('B13', CellIsRule(operator='equal', formula=['"OK"'], fill=green_fill))
@@ -462,8 +797,6 @@ def create_cashflow_sheet(wb):
     set_cell_style(ws['B15'], bg_color='F2F2F2', number_format='#,##0.00')
 
    
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.styles.differential import DifferentialStyle
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     ws.conditional_formatting.add('B14', Rule(type='containsText', operator='containsText', text='tańsze', dxf=DifferentialStyle(fill=green_fill)))
@@ -473,8 +806,8 @@ def create_cashflow_sheet(wb):
     ws.column_dimensions['B'].width = 20
 
 
-def create_yearly_schedule_sheet(wb):
-    """Tworzy arkusz 05_Harmonogram_roczny z harmonogramem spłat rocznych."""
+def create_yearly_schedule_sheet(wb, years=30):
+    """Tworzy arkusz 05_Harmonogram_roczny z harmonogramem spłat rocznych (wiersz 13 = rok 0, lata 1..years)."""
     ws = wb.create_sheet('05_Harmonogram_roczny')
     
     ws['A2'] = 'Parametr'
@@ -545,66 +878,45 @@ def create_yearly_schedule_sheet(wb):
         if col in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]:
             cell.number_format = '#,##0.00'
     
-    ws['A14'] = '=A13+1'
-    ws['B14'] = '=L13'
-    ws['C14'] = '=M13'
-    ws['D14'] = '=B14+C14'
-    ws['E14'] = '=B14*$B$6'
-    ws['F14'] = '=C14*$B$7'
-    ws['G14'] = '=E14+F14'
-    ws['H14'] = '=IF($B$10="D",MIN($B$8,C14),0)'
-    ws['I14'] = '=MIN($B$9,B14)'
-    ws['J14'] = '=H14+I14'
-    ws['K14'] = '=G14+J14'
-    ws['L14'] = '=MAX(0,B14-I14)'
-    ws['M14'] = '=MAX(0,C14-H14)'
-    ws['N14'] = '=L14+M14'
+    # Lata 1..years (wiersze 14..13+years) – formuły wiersza 14 wypełnione w dół
+    yearly = FillDown(ws, 14, 13 + years, {
+        1: '=A13+1',
+        2: '=L13',
+        3: '=M13',
+        4: '=B14+C14',
+        5: '=B14*$B$6',
+        6: '=C14*$B$7',
+        7: '=E14+F14',
+        8: '=IF($B$10="D",MIN($B$8,C14),0)',
+        9: '=MIN($B$9,B14)',
+        10: '=H14+I14',
+        11: '=G14+J14',
+        12: '=MAX(0,B14-I14)',
+        13: '=MAX(0,C14-H14)',
+        14: '=L14+M14',
+    })
+    yearly.write(14)
     
     for col in range(1, 15):
         cell = ws.cell(row=14, column=col)
         if col in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]:
             cell.number_format = '#,##0.00'
     
-    for row in range(15, 45):
+    for row in range(15, 14 + years):
+        yearly.write(row)
         for col in range(1, 15):
-            if col == 1:
-                ws.cell(row=row, column=col).value = f'=A{row-1}+1'
-            elif col == 2:
-                ws.cell(row=row, column=col).value = f'=L{row-1}'
-            elif col == 3:
-                ws.cell(row=row, column=col).value = f'=M{row-1}'
-            elif col == 4:
-                ws.cell(row=row, column=col).value = f'=B{row}+C{row}'
-            elif col == 5:
-                ws.cell(row=row, column=col).value = f'=B{row}*$B$6'
-            elif col == 6:
-                ws.cell(row=row, column=col).value = f'=C{row}*$B$7'
-            elif col == 7:
-                ws.cell(row=row, column=col).value = f'=E{row}+F{row}'
-            elif col == 8:
-                ws.cell(row=row, column=col).value = f'=IF($B$10="D",MIN($B$8,C{row}),0)'
-            elif col == 9:
-                ws.cell(row=row, column=col).value = f'=MIN($B$9,B{row})'
-            elif col == 10:
-                ws.cell(row=row, column=col).value = f'=H{row}+I{row}'
-            elif col == 11:
-                ws.cell(row=row, column=col).value = f'=G{row}+J{row}'
-            elif col == 12:
-                ws.cell(row=row, column=col).value = f'=MAX(0,B{row}-I{row})'
-            elif col == 13:
-                ws.cell(row=row, column=col).value = f'=MAX(0,C{row}-H{row})'
-            elif col == 14:
-                ws.cell(row=row, column=col).value = f'=L{row}+M{row}'
             ws.cell(row=row, column=col).number_format = '#,##0.00'
+        flush_rows(ws, row)
+
+
+def create_monthly_schedule_sheet(wb, months=360):
+    """Tworzy arkusz 06_Harmonogram_miesieczny z harmonogramem spłat miesięcznych (wiersz 19 = miesiąc 0)."""
+    ws = wb.create_sheet('06_Harmonogram_miesieczny')
     
+    # Szerokości przed wierszami – w trybie strumieniowym wiersze są zapisywane na bieżąco
     ws.column_dimensions['A'].width = 8
     for col in ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N']:
         ws.column_dimensions[col].width = 14
-
-
-def create_monthly_schedule_sheet(wb):
-    """Tworzy arkusz 06_Harmonogram_miesieczny z harmonogramem spłat miesięcznych."""
-    ws = wb.create_sheet('06_Harmonogram_miesieczny')
     
     ws['A2'] = 'Parametr'
     ws['B2'] = 'Wartość'
@@ -694,65 +1006,41 @@ def create_monthly_schedule_sheet(wb):
         if col in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]:
             cell.number_format = '#,##0.00'
     
-    ws['A20'] = '=A19+1'
-    ws['B20'] = '=L19'
-    ws['C20'] = '=M19'
-    ws['D20'] = '=B20+C20'
-    ws['E20'] = '=B20*$B$8'
-    ws['F20'] = '=C20*$B$9'
-    ws['G20'] = '=E20+F20'
-    ws['H20'] = '=IF($B$14="D",MIN($B$11,C20),0)'
-    ws['I20'] = '=MIN($B$13,B20)'
-    ws['J20'] = '=H20+I20'
-    ws['K20'] = '=G20+J20'
-    ws['L20'] = '=MAX(0,B20-I20)'
-    ws['M20'] = '=MAX(0,C20-H20)'
-    ws['N20'] = '=L20+M20'
+    # Miesiące 1..months (wiersze 20..19+months) – formuły wiersza 20 wypełnione w dół
+    monthly = FillDown(ws, 20, 19 + months, {
+        1: '=A19+1',
+        2: '=L19',
+        3: '=M19',
+        4: '=B20+C20',
+        5: '=B20*$B$8',
+        6: '=C20*$B$9',
+        7: '=E20+F20',
+        8: '=IF($B$14="D",MIN($B$11,C20),0)',
+        9: '=MIN($B$13,B20)',
+        10: '=H20+I20',
+        11: '=G20+J20',
+        12: '=MAX(0,B20-I20)',
+        13: '=MAX(0,C20-H20)',
+        14: '=L20+M20',
+    })
+    monthly.write(20)
     
     for col in range(1, 15):
         cell = ws.cell(row=20, column=col)
         if col in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]:
             cell.number_format = '#,##0.00'
     
-    for row in range(21, 381):
+    flush_rows(ws, 20)
+    
+    for row in range(21, 20 + months):
+        monthly.write(row)
         for col in range(1, 15):
-            if col == 1:
-                ws.cell(row=row, column=col).value = f'=A{row-1}+1'
-            elif col == 2:
-                ws.cell(row=row, column=col).value = f'=L{row-1}'
-            elif col == 3:
-                ws.cell(row=row, column=col).value = f'=M{row-1}'
-            elif col == 4:
-                ws.cell(row=row, column=col).value = f'=B{row}+C{row}'
-            elif col == 5:
-                ws.cell(row=row, column=col).value = f'=B{row}*$B$8'
-            elif col == 6:
-                ws.cell(row=row, column=col).value = f'=C{row}*$B$9'
-            elif col == 7:
-                ws.cell(row=row, column=col).value = f'=E{row}+F{row}'
-            elif col == 8:
-                ws.cell(row=row, column=col).value = f'=IF($B$14="D",MIN($B$11,C{row}),0)'
-            elif col == 9:
-                ws.cell(row=row, column=col).value = f'=MIN($B$13,B{row})'
-            elif col == 10:
-                ws.cell(row=row, column=col).value = f'=H{row}+I{row}'
-            elif col == 11:
-                ws.cell(row=row, column=col).value = f'=G{row}+J{row}'
-            elif col == 12:
-                ws.cell(row=row, column=col).value = f'=MAX(0,B{row}-I{row})'
-            elif col == 13:
-                ws.cell(row=row, column=col).value = f'=MAX(0,C{row}-H{row})'
-            elif col == 14:
-                ws.cell(row=row, column=col).value = f'=L{row}+M{row}'
             ws.cell(row=row, column=col).number_format = '#,##0.00'
-    
-    ws.column_dimensions['A'].width = 8
-    for col in ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N']:
-        ws.column_dimensions[col].width = 14
+        flush_rows(ws, row)
 
 
-def create_roi_sheet(wb):
-    """Tworzy arkusz 07_Analiza_ROI z analizą budowy equity i ROI."""
+def create_roi_sheet(wb, years=30):
+    """Tworzy arkusz 07_Analiza_ROI z analizą budowy equity i ROI (lata 0..years)."""
     ws = wb.create_sheet('07_Analiza_ROI')
     
     ws['A2'] = 'Parametr'
@@ -820,15 +1108,20 @@ def create_roi_sheet(wb):
             cell.number_format = '#,##0.00'
     ws.cell(row=16, column=9).number_format = FORMAT_PERCENTAGE_00
     
-    ws['A17'] = '=A16+1'
-    ws['B17'] = '=B16*(1+$B$10)'
-    ws['C17'] = "='05_Harmonogram_roczny'!L14"
-    ws['D17'] = "='05_Harmonogram_roczny'!M14"
-    ws['E17'] = '=C17+D17'
-    ws['F17'] = '=B17-E17'
-    ws['G17'] = '=F17-F16'
-    ws['H17'] = '=H16+G17'
-    ws['I17'] = '=F17/$B$5'
+    # Lata 1..years (wiersze 17..16+years) – formuły wiersza 17 wypełnione w dół
+    last = 16 + years
+    roi = FillDown(ws, 17, last, {
+        1: '=A16+1',
+        2: '=B16*(1+$B$10)',
+        3: "='05_Harmonogram_roczny'!L14",
+        4: "='05_Harmonogram_roczny'!M14",
+        5: '=C17+D17',
+        6: '=B17-E17',
+        7: '=F17-F16',
+        8: '=H16+G17',
+        9: '=F17/$B$5',
+    })
+    roi.write(17)
     
     for col in range(2, 9):
         cell = ws.cell(row=17, column=col)
@@ -836,38 +1129,30 @@ def create_roi_sheet(wb):
             cell.number_format = '#,##0.00'
     ws.cell(row=17, column=9).number_format = FORMAT_PERCENTAGE_00
     
-    for row in range(18, 47):
-        year = row - 16
-        harmonogram_row = 13 + year
-        ws.cell(row=row, column=1).value = f'=A{row-1}+1'
-        ws.cell(row=row, column=2).value = f'=B{row-1}*(1+$B$10)'
-        ws.cell(row=row, column=3).value = f"='05_Harmonogram_roczny'!L{harmonogram_row}"
-        ws.cell(row=row, column=4).value = f"='05_Harmonogram_roczny'!M{harmonogram_row}"
-        ws.cell(row=row, column=5).value = f'=C{row}+D{row}'
-        ws.cell(row=row, column=6).value = f'=B{row}-E{row}'
-        ws.cell(row=row, column=7).value = f'=F{row}-F{row-1}'
-        ws.cell(row=row, column=8).value = f'=H{row-1}+G{row}'
-        ws.cell(row=row, column=9).value = f'=F{row}/$B$5'
+    for row in range(18, last + 1):
+        roi.write(row)
         for col in range(2, 9):
             cell = ws.cell(row=row, column=col)
             if col <= 8:
                 cell.number_format = '#,##0.00'
         ws.cell(row=row, column=9).number_format = FORMAT_PERCENTAGE_00
     
-    ws['A50'] = 'Equity po 30 latach [CHF]'
-    ws['B50'] = '=F46'
-    set_cell_style(ws['A50'], font_bold=True)
-    set_cell_style(ws['B50'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    # Podsumowanie trzy wiersze pod tabelą (przy 30 latach: wiersze 50–52)
+    summary = last + 4
+    ws[f'A{summary}'] = f'Equity {horizon(years)} [CHF]'
+    ws[f'B{summary}'] = f'=F{last}'
+    set_cell_style(ws[f'A{summary}'], font_bold=True)
+    set_cell_style(ws[f'B{summary}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
     
-    ws['A51'] = 'ROI całkowite z wkładu'
-    ws['B51'] = '=I46'
-    set_cell_style(ws['A51'], font_bold=True)
-    set_cell_style(ws['B51'], font_bold=True, bg_color='FFEB9C', number_format=FORMAT_PERCENTAGE_00)
+    ws[f'A{summary + 1}'] = 'ROI całkowite z wkładu'
+    ws[f'B{summary + 1}'] = f'=I{last}'
+    set_cell_style(ws[f'A{summary + 1}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 1}'], font_bold=True, bg_color='FFEB9C', number_format=FORMAT_PERCENTAGE_00)
     
-    ws['A52'] = 'Średni roczny zwrot CAGR'
-    ws['B52'] = '=(1+I46)^(1/30)-1'
-    set_cell_style(ws['A52'], font_bold=True)
-    set_cell_style(ws['B52'], font_bold=True, bg_color='FFEB9C', number_format=FORMAT_PERCENTAGE_00)
+    ws[f'A{summary + 2}'] = 'Średni roczny zwrot CAGR'
+    ws[f'B{summary + 2}'] = f'=(1+I{last})^(1/{years})-1'
+    set_cell_style(ws[f'A{summary + 2}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 2}'], font_bold=True, bg_color='FFEB9C', number_format=FORMAT_PERCENTAGE_00)
     
     ws.column_dimensions['A'].width = 40
     for col in ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
@@ -877,8 +1162,8 @@ def create_roi_sheet(wb):
 # 1) NOWA FUNKCJA - wkleić POD create_roi_sheet (przed main)
 # ============================================================================
 
-def create_appreciation_sheet(wb):
-    """Tworzy arkusz 08_Symulacja_wzrostu_wartości z 3 scenariuszami."""
+def create_appreciation_sheet(wb, years=30):
+    """Tworzy arkusz 08_Symulacja_wzrostu_wartości z 3 scenariuszami (lata 0..years)."""
     ws = wb.create_sheet('08_Symulacja_wzrostu_wartości')
     
     # Sekcja parametrów
@@ -923,44 +1208,38 @@ def create_appreciation_sheet(wb):
     for col in range(2, 5):
         ws.cell(row=13, column=col).number_format = '#,##0.00'
     
-    # Rok 1 (szablon)
-    ws['A14'] = '=A13+1'
-    ws['B14'] = '=B13*(1+$B$6)'
-    ws['C14'] = '=C13*(1+$B$7)'
-    ws['D14'] = '=D13*(1+$B$8)'
+    # Rok 1 (szablon) wypełniony w dół do roku years (wiersz 13+years)
+    last = 13 + years
+    scenarios = FillDown(ws, 14, last, {
+        1: '=A13+1',
+        2: '=B13*(1+$B$6)',
+        3: '=C13*(1+$B$7)',
+        4: '=D13*(1+$B$8)',
+    })
+    scenarios.write(14)
     
     for col in range(2, 5):
         ws.cell(row=14, column=col).number_format = '#,##0.00'
     
-    # Kopiowanie do roku 30 (wiersz 43)
-    for row in range(15, 44):
-        ws.cell(row=row, column=1).value = f'=A{row-1}+1'
-        ws.cell(row=row, column=2).value = f'=B{row-1}*(1+$B$6)'
-        ws.cell(row=row, column=3).value = f'=C{row-1}*(1+$B$7)'
-        ws.cell(row=row, column=4).value = f'=D{row-1}*(1+$B$8)'
+    # Kopiowanie do roku years
+    for row in range(15, last + 1):
+        scenarios.write(row)
         for col in range(2, 5):
             ws.cell(row=row, column=col).number_format = '#,##0.00'
     
-    # Podsumowanie
-    ws['A46'] = 'Wartość po 30 latach – pesymistyczny'
-    ws['B46'] = '=B43'
-    set_cell_style(ws['A46'], font_bold=True)
-    set_cell_style(ws['B46'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A47'] = 'Wartość po 30 latach – bazowy'
-    ws['B47'] = '=C43'
-    set_cell_style(ws['A47'], font_bold=True)
-    set_cell_style(ws['B47'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A48'] = 'Wartość po 30 latach – optymistyczny'
-    ws['B48'] = '=D43'
-    set_cell_style(ws['A48'], font_bold=True)
-    set_cell_style(ws['B48'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    # Podsumowanie dwa wiersze pod tabelą (przy 30 latach: wiersze 46–50)
+    summary = last + 3
+    for offset, (col, scenario) in enumerate([('B', 'pesymistyczny'), ('C', 'bazowy'), ('D', 'optymistyczny')]):
+        row = summary + offset
+        ws[f'A{row}'] = f'Wartość {horizon(years)} – {scenario}'
+        ws[f'B{row}'] = f'={col}{last}'
+        set_cell_style(ws[f'A{row}'], font_bold=True)
+        set_cell_style(ws[f'B{row}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
     
-    ws['A50'] = 'CAGR scenariusz bazowy'
-    ws['B50'] = '=(C43/$B$4)^(1/30)-1'
-    set_cell_style(ws['A50'], font_bold=True)
-    set_cell_style(ws['B50'], font_bold=True, bg_color='FFEB9C', number_format=FORMAT_PERCENTAGE_00)
+    ws[f'A{summary + 4}'] = 'CAGR scenariusz bazowy'
+    ws[f'B{summary + 4}'] = f'=(C{last}/$B$4)^(1/{years})-1'
+    set_cell_style(ws[f'A{summary + 4}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 4}'], font_bold=True, bg_color='FFEB9C', number_format=FORMAT_PERCENTAGE_00)
     
     ws.column_dimensions['A'].width = 45
     ws.column_dimensions['B'].width = 20
@@ -972,8 +1251,8 @@ def create_appreciation_sheet(wb):
 # 2) NOWA FUNKCJA - wkleić POD create_appreciation_sheet (przed main)
 # ============================================================================
 
-def create_opportunity_cost_sheet(wb):
-    """Tworzy arkusz 09_Koszt_alternatywny_kapitalu - porównanie ETF vs equity."""
+def create_opportunity_cost_sheet(wb, years=30):
+    """Tworzy arkusz 09_Koszt_alternatywny_kapitalu - porównanie ETF vs equity (lata 0..years)."""
     ws = wb.create_sheet('09_Koszt_alternatywny_kapitalu')
     
     # Sekcja parametrów
@@ -1030,56 +1309,51 @@ def create_opportunity_cost_sheet(wb):
     for col in range(2, 8):
         ws.cell(row=16, column=col).number_format = '#,##0.00'
     
-    # Rok 1 (wiersz 17 - szablon)
-    ws['A17'] = '=A16+1'
-    ws['B17'] = '=E16'
-    ws['C17'] = '=$B$8'
-    ws['D17'] = '=(B17+C17)*$B$5'
-    ws['E17'] = '=B17+C17+D17'
-    ws['F17'] = "='07_Analiza_ROI'!F17"
-    ws['G17'] = '=E17-F17'
-    ws['H17'] = '=IF(G17>0,"ETF > nieruchomość","ETF ≤ nieruchomość")'
+    # Rok 1 (wiersz 17 - szablon) wypełniony w dół do roku years (wiersz 16+years)
+    last = 16 + years
+    etf = FillDown(ws, 17, last, {
+        1: '=A16+1',
+        2: '=E16',
+        3: '=$B$8',
+        4: '=(B17+C17)*$B$5',
+        5: '=B17+C17+D17',
+        6: "='07_Analiza_ROI'!F17",
+        7: '=E17-F17',
+        8: '=IF(G17>0,"ETF > nieruchomość","ETF ≤ nieruchomość")',
+    })
+    etf.write(17)
     
     for col in range(2, 8):
         ws.cell(row=17, column=col).number_format = '#,##0.00'
     
-    # Kopiowanie do roku 30 (wiersz 46)
-    for row in range(18, 47):
-        year = row - 16
-        roi_row = 16 + year
-        
-        ws.cell(row=row, column=1).value = f'=A{row-1}+1'
-        ws.cell(row=row, column=2).value = f'=E{row-1}'
-        ws.cell(row=row, column=3).value = '=$B$8'
-        ws.cell(row=row, column=4).value = f'=(B{row}+C{row})*$B$5'
-        ws.cell(row=row, column=5).value = f'=B{row}+C{row}+D{row}'
-        ws.cell(row=row, column=6).value = f"='07_Analiza_ROI'!F{roi_row}"
-        ws.cell(row=row, column=7).value = f'=E{row}-F{row}'
-        ws.cell(row=row, column=8).value = f'=IF(G{row}>0,"ETF > nieruchomość","ETF ≤ nieruchomość")'
+    # Kopiowanie do roku years
+    for row in range(18, last + 1):
+        etf.write(row)
         
         for col in range(2, 8):
             ws.cell(row=row, column=col).number_format = '#,##0.00'
     
-    # Podsumowanie
-    ws['A50'] = 'Kapitał alternatywny po 30 latach [CHF]'
-    ws['B50'] = '=E46'
-    set_cell_style(ws['A50'], font_bold=True)
-    set_cell_style(ws['B50'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    # Podsumowanie trzy wiersze pod tabelą (przy 30 latach: wiersze 50–53)
+    summary = last + 4
+    ws[f'A{summary}'] = f'Kapitał alternatywny {horizon(years)} [CHF]'
+    ws[f'B{summary}'] = f'=E{last}'
+    set_cell_style(ws[f'A{summary}'], font_bold=True)
+    set_cell_style(ws[f'B{summary}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
     
-    ws['A51'] = 'Equity w nieruchomości po 30 latach [CHF]'
-    ws['B51'] = '=F46'
-    set_cell_style(ws['A51'], font_bold=True)
-    set_cell_style(ws['B51'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    ws[f'A{summary + 1}'] = f'Equity w nieruchomości {horizon(years)} [CHF]'
+    ws[f'B{summary + 1}'] = f'=F{last}'
+    set_cell_style(ws[f'A{summary + 1}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 1}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
     
-    ws['A52'] = 'Różnica: ETF – nieruchomość [CHF]'
-    ws['B52'] = '=B50-B51'
-    set_cell_style(ws['A52'], font_bold=True)
-    set_cell_style(ws['B52'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    ws[f'A{summary + 2}'] = 'Różnica: ETF – nieruchomość [CHF]'
+    ws[f'B{summary + 2}'] = f'=B{summary}-B{summary + 1}'
+    set_cell_style(ws[f'A{summary + 2}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 2}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
     
-    ws['A53'] = 'Komentarz'
-    ws['B53'] = '=IF(B52>0,"Lepsza inwestycja w ETF","Lepsza inwestycja w nieruchomość")'
-    set_cell_style(ws['A53'], font_bold=True)
-    set_cell_style(ws['B53'], font_bold=True, bg_color='FFEB9C')
+    ws[f'A{summary + 3}'] = 'Komentarz'
+    ws[f'B{summary + 3}'] = f'=IF(B{summary + 2}>0,"Lepsza inwestycja w ETF","Lepsza inwestycja w nieruchomość")'
+    set_cell_style(ws[f'A{summary + 3}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 3}'], font_bold=True, bg_color='FFEB9C')
     
     ws.column_dimensions['A'].width = 50
     for col in ['B', 'C', 'D', 'E', 'F', 'G']:
@@ -1092,8 +1366,11 @@ def create_opportunity_cost_sheet(wb):
 # 1) NOWA FUNKCJA - wkleić POD definicją create_opportunity_cost_sheet (lub ostatnią funkcją tworzącą arkusze)
 # ============================================================================
 
-def create_rent_vs_buy_sheet(wb):
-    """Tworzy arkusz 10_Rent_vs_Buy_30lat - porównanie kupna vs wynajmu w 30 latach."""
+def create_rent_vs_buy_sheet(wb, years=30):
+    """
+    Tworzy arkusz 10_Rent_vs_Buy_30lat - porównanie kupna vs wynajmu w horyzoncie years lat.
+    Nazwa arkusza nie zależy od horyzontu – używają jej adresy 'Arkusz!B6' w danych klientów.
+    """
     ws = wb.create_sheet('10_Rent_vs_Buy_30lat')
     
     # Sekcja parametrów
@@ -1122,8 +1399,8 @@ def create_rent_vs_buy_sheet(wb):
     set_cell_style(ws['A7'])
     set_cell_style(ws['B7'], bg_color='CCE5FF', number_format=FORMAT_PERCENTAGE_00)
     
-    ws['A8'] = 'Equity po 30 latach [CHF]'
-    ws['B8'] = "='07_Analiza_ROI'!F46"
+    ws['A8'] = f'Equity {horizon(years)} [CHF]'
+    ws['B8'] = f"='07_Analiza_ROI'!F{16 + years}"
     set_cell_style(ws['A8'])
     set_cell_style(ws['B8'], bg_color='F2F2F2', number_format='#,##0.00')
     
@@ -1146,57 +1423,58 @@ def create_rent_vs_buy_sheet(wb):
     for col in range(2, 6):
         ws.cell(row=16, column=col).number_format = '#,##0.00'
     
-    # Rok 1 (wiersz 17 - szablon)
-    ws['A17'] = '=A16+1'
-    ws['B17'] = '=B16*(1+$B$7)'
-    ws['C17'] = '=C16*(1+$B$6)'
-    ws['D17'] = '=C17-B17'
-    ws['E17'] = '=E16+D17'
+    # Rok 1 (wiersz 17 - szablon) wypełniony w dół do roku years (wiersz 16+years)
+    last = 16 + years
+    costs = FillDown(ws, 17, last, {
+        1: '=A16+1',
+        2: '=B16*(1+$B$7)',
+        3: '=C16*(1+$B$6)',
+        4: '=C17-B17',
+        5: '=E16+D17',
+    })
+    costs.write(17)
     
     for col in range(2, 6):
         ws.cell(row=17, column=col).number_format = '#,##0.00'
     
-    # Kopiowanie do roku 30 (wiersz 46)
-    for row in range(18, 47):
-        ws.cell(row=row, column=1).value = f'=A{row-1}+1'
-        ws.cell(row=row, column=2).value = f'=B{row-1}*(1+$B$7)'
-        ws.cell(row=row, column=3).value = f'=C{row-1}*(1+$B$6)'
-        ws.cell(row=row, column=4).value = f'=C{row}-B{row}'
-        ws.cell(row=row, column=5).value = f'=E{row-1}+D{row}'
+    # Kopiowanie do roku years
+    for row in range(18, last + 1):
+        costs.write(row)
         
         for col in range(2, 6):
             ws.cell(row=row, column=col).number_format = '#,##0.00'
     
-    # Podsumowanie
-    ws['A50'] = 'Suma kosztów posiadania przez 30 lat [CHF]'
-    ws['B50'] = '=SUM(B16:B46)'
-    set_cell_style(ws['A50'], font_bold=True)
-    set_cell_style(ws['B50'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A51'] = 'Suma kosztów wynajmu przez 30 lat [CHF]'
-    ws['B51'] = '=SUM(C16:C46)'
-    set_cell_style(ws['A51'], font_bold=True)
-    set_cell_style(ws['B51'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A52'] = 'Różnica (wynajem – kupno) [CHF]'
-    ws['B52'] = '=B51-B50'
-    set_cell_style(ws['A52'], font_bold=True)
-    set_cell_style(ws['B52'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A53'] = 'Equity po 30 latach [CHF]'
-    ws['B53'] = '=$B$8'
-    set_cell_style(ws['A53'], font_bold=True)
-    set_cell_style(ws['B53'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A54'] = 'Efekt netto (różnica + equity) [CHF]'
-    ws['B54'] = '=B52+B53'
-    set_cell_style(ws['A54'], font_bold=True)
-    set_cell_style(ws['B54'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
-    
-    ws['A55'] = 'Komentarz'
-    ws['B55'] = '=IF(B54>0,"Kupno opłaca się bardziej","Wynajem opłaca się bardziej")'
-    set_cell_style(ws['A55'], font_bold=True)
-    set_cell_style(ws['B55'], font_bold=True, bg_color='FFEB9C')
+    # Podsumowanie trzy wiersze pod tabelą (przy 30 latach: wiersze 50–55)
+    summary = last + 4
+    ws[f'A{summary}'] = f'Suma kosztów posiadania {horizon(years, "przez")} [CHF]'
+    ws[f'B{summary}'] = f'=SUM(B16:B{last})'
+    set_cell_style(ws[f'A{summary}'], font_bold=True)
+    set_cell_style(ws[f'B{summary}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    
+    ws[f'A{summary + 1}'] = f'Suma kosztów wynajmu {horizon(years, "przez")} [CHF]'
+    ws[f'B{summary + 1}'] = f'=SUM(C16:C{last})'
+    set_cell_style(ws[f'A{summary + 1}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 1}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    
+    ws[f'A{summary + 2}'] = 'Różnica (wynajem – kupno) [CHF]'
+    ws[f'B{summary + 2}'] = f'=B{summary + 1}-B{summary}'
+    set_cell_style(ws[f'A{summary + 2}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 2}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    
+    ws[f'A{summary + 3}'] = f'Equity {horizon(years)} [CHF]'
+    ws[f'B{summary + 3}'] = '=$B$8'
+    set_cell_style(ws[f'A{summary + 3}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 3}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    
+    ws[f'A{summary + 4}'] = 'Efekt netto (różnica + equity) [CHF]'
+    ws[f'B{summary + 4}'] = f'=B{summary + 2}+B{summary + 3}'
+    set_cell_style(ws[f'A{summary + 4}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 4}'], font_bold=True, bg_color='FFEB9C', number_format='#,##0.00')
+    
+    ws[f'A{summary + 5}'] = 'Komentarz'
+    ws[f'B{summary + 5}'] = f'=IF(B{summary + 4}>0,"Kupno opłaca się bardziej","Wynajem opłaca się bardziej")'
+    set_cell_style(ws[f'A{summary + 5}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 5}'], font_bold=True, bg_color='FFEB9C')
     
     ws.column_dimensions['A'].width = 50
     ws.column_dimensions['B'].width = 35
@@ -1311,19 +1589,69 @@ def create_stress_test_sheet(wb):
         # H: Status
         ws.cell(row=row, column=8).value = f"=IF(G{row}<'00_Stałe'!B8,\"OK\",\"Ryzyko Tragbarkeit\")"
     
+    # Powierzchnia niezależnych szoków H1 (wiersze) × H2 (kolumny), jak kalkulator_silnik.stress_surface:
+    # H1 o stałej stopie i H2 na SARON mogą zmieniać się różnie; stopy nie spadają poniżej 0
+    ws['A23'] = 'POWIERZCHNIA SZOKÓW H1 × H2 – TRAGBARKEIT'
+    set_cell_style(ws['A23'], font_bold=True, font_size=12, border=False)
+    
+    ws['A24'] = 'Szok stopy testowej banku (Δ)'
+    ws['B24'] = 0
+    set_cell_style(ws['A24'])
+    set_cell_style(ws['B24'], bg_color='CCE5FF', number_format=FORMAT_PERCENTAGE_00)
+    
+    ws['A25'] = 'Tragbarkeit wg banku przy szoku stopy testowej'
+    ws['B25'] = "=IFERROR(('03_Tragbarkeit'!B9+'03_Tragbarkeit'!B2*B24)/'03_Tragbarkeit'!B10,\"\")"
+    set_cell_style(ws['A25'])
+    set_cell_style(ws['B25'], bg_color='F2F2F2', font_bold=True, number_format=FORMAT_PERCENTAGE_00)
+    
+    ws['A26'] = 'Limit Tragbarkeit'
+    ws['B26'] = "='00_Stałe'!B8"
+    set_cell_style(ws['A26'])
+    set_cell_style(ws['B26'], bg_color='F2F2F2', font_bold=True, number_format=FORMAT_PERCENTAGE_00)
+    
+    grid_shocks = [-0.01, -0.005, 0, 0.005, 0.01, 0.015, 0.02, 0.025, 0.03]
+    ws['A28'] = 'Szok H1 ↓ / szok H2 →'
+    set_cell_style(ws['A28'], font_bold=True, bg_color='D0D0D0', alignment='center')
+    for idx, shock in enumerate(grid_shocks):
+        cell = ws.cell(row=28, column=2 + idx, value=shock)
+        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center', number_format=FORMAT_PERCENTAGE_00)
+        cell = ws.cell(row=29 + idx, column=1, value=shock)
+        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center', number_format=FORMAT_PERCENTAGE_00)
+    
+    for row in range(29, 29 + len(grid_shocks)):
+        for col in range(2, 2 + len(grid_shocks)):
+            letter = get_column_letter(col)
+            cell = ws.cell(row=row, column=col)
+            cell.value = (f"=IFERROR((($B$6*MAX(0,$B$4+$A{row})/12+$B$7*MAX(0,$B$5+{letter}$28)/12"
+                          f"+$B$8+$B$9+$B$10+$B$11)*12)/'01_Wejście'!$B$24,\"\")")
+            cell.number_format = FORMAT_PERCENTAGE_00
+    
+    # Mapa ciepła: zielony poniżej 90% limitu, żółty do limitu, czerwony od limitu;
+    # ISNUMBER pomija komórki z "" (brak dochodu), które CellIsRule porównałby jak tekst
+    surface = f'B29:{get_column_letter(1 + len(grid_shocks))}{28 + len(grid_shocks)}'
+    green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
+    yellow_fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
+    red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
+    ws.conditional_formatting.add(surface, FormulaRule(formula=['AND(ISNUMBER(B29),B29>=$B$26)'], fill=red_fill))
+    ws.conditional_formatting.add(surface, FormulaRule(formula=['AND(ISNUMBER(B29),B29>=$B$26*0.9,B29<$B$26)'],
+                                                       fill=yellow_fill))
+    ws.conditional_formatting.add(surface, FormulaRule(formula=['AND(ISNUMBER(B29),B29<$B$26*0.9)'], fill=green_fill))
+    
     ws.column_dimensions['A'].width = 20
     for col in ['B', 'C', 'D', 'E', 'F']:
         ws.column_dimensions[col].width = 22
     ws.column_dimensions['G'].width = 25
     ws.column_dimensions['H'].width = 20
+    ws.column_dimensions['I'].width = 12
+    ws.column_dimensions['J'].width = 12
 
 
 # ============================================================================
 # 1) NOWA FUNKCJA - wkleić POD create_stress_test_sheet (lub ostatnią funkcją tworzącą arkusze)
 # ============================================================================
 
-def create_sale_analysis_sheet(wb):
-    """Tworzy arkusz 12_Analiza_sprzedaży_po_X_latach - analiza wyniku sprzedaży po X latach."""
+def create_sale_analysis_sheet(wb, years=30):
+    """Tworzy arkusz 12_Analiza_sprzedazy_X_lat - analiza wyniku sprzedaży po X latach (tabela dla X = 1..years)."""
     ws = wb.create_sheet('12_Analiza_sprzedazy_X_lat')
     
     # Sekcja parametrów
@@ -1352,6 +1680,13 @@ def create_sale_analysis_sheet(wb):
     set_cell_style(ws['A7'])
     set_cell_style(ws['B7'], bg_color='CCE5FF', number_format='0')
     
+    # X poza horyzontem harmonogramu 05 nie ma salda kredytu – walidacja tutaj, #N/A w B10 dla danych z pliku
+    dv = DataValidation(type="whole", operator="between", formula1='1', formula2=str(years), allow_blank=True)
+    dv.error = f'Wprowadź liczbę lat od 1 do {years}'
+    dv.errorTitle = 'Nieprawidłowa wartość'
+    ws.add_data_validation(dv)
+    dv.add(ws['B7'])
+    
     ws['A8'] = 'Roczny wzrost wartości nieruchomości'
     ws['B8'] = ''
     set_cell_style(ws['A8'])
@@ -1363,7 +1698,7 @@ def create_sale_analysis_sheet(wb):
     set_cell_style(ws['B9'], bg_color='CCE5FF', number_format=FORMAT_PERCENTAGE_00)
     
     ws['A10'] = 'Rok sprzedaży w harmonogramie'
-    ws['B10'] = '=13+$B$7'
+    ws['B10'] = f'=IF($B$7>{years},NA(),13+$B$7)'
     set_cell_style(ws['A10'])
     set_cell_style(ws['B10'], bg_color='F2F2F2', number_format='0')
     
@@ -1453,8 +1788,47 @@ def create_sale_analysis_sheet(wb):
     set_cell_style(ws['A38'], font_bold=True)
     set_cell_style(ws['B38'], font_bold=True, bg_color='FFEB9C')
     
+    # Wynik sprzedaży dla każdego horyzontu X = 1…years (jak kalkulator_silnik.sale_sweep),
+    # z tym samym wzrostem wartości i kosztami sprzedaży co powyżej
+    ws['A41'] = f'SPRZEDAŻ W KAŻDYM ROKU (X = 1…{years})'
+    set_cell_style(ws['A41'], font_bold=True, font_size=12, border=False)
+    
+    last = 44 + years
+    ws['A42'] = 'Najlepszy rok sprzedaży (najwyższy CAGR)'
+    ws['B42'] = f'=IFERROR(INDEX(A45:A{last},MATCH(MAX(H45:H{last}),H45:H{last},0)),"")'
+    set_cell_style(ws['A42'], font_bold=True)
+    set_cell_style(ws['B42'], font_bold=True, bg_color='FFEB9C', number_format='0')
+    
+    headers = ['Rok sprzedaży (X)', 'Wartość przy sprzedaży [CHF]', 'Koszty sprzedaży [CHF]',
+               'Saldo kredytu [CHF]', 'Środki po spłacie kredytu [CHF]', 'Zysk vs wkład własny [CHF]',
+               'ROI', 'CAGR']
+    for col_idx, header in enumerate(headers, start=1):
+        cell = ws.cell(row=44, column=col_idx)
+        cell.value = header
+        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
+    
+    for year in range(1, years + 1):
+        row = 44 + year
+        ws.cell(row=row, column=1).value = year
+        # Saldo końcowe roku X – wiersz 13+X harmonogramu rocznego (kolumna N = H1 + H2)
+        ws.cell(row=row, column=2).value = f'=$B$4*(1+$B$8)^A{row}'
+        ws.cell(row=row, column=3).value = f'=B{row}*$B$9'
+        ws.cell(row=row, column=4).value = f"='05_Harmonogram_roczny'!N{13 + year}"
+        ws.cell(row=row, column=5).value = f'=B{row}-C{row}-D{row}'
+        ws.cell(row=row, column=6).value = f'=E{row}-$B$5'
+        ws.cell(row=row, column=7).value = f'=IFERROR(F{row}/$B$5,"")'
+        ws.cell(row=row, column=8).value = f'=IFERROR((1+G{row})^(1/A{row})-1,"")'
+        for col in range(2, 7):
+            ws.cell(row=row, column=col).number_format = '#,##0.00'
+        for col in (7, 8):
+            ws.cell(row=row, column=col).number_format = FORMAT_PERCENTAGE_00
+    
     ws.column_dimensions['A'].width = 50
     ws.column_dimensions['B'].width = 30
+    for col in ['C', 'D', 'E', 'F']:
+        ws.column_dimensions[col].width = 22
+    ws.column_dimensions['G'].width = 12
+    ws.column_dimensions['H'].width = 12
 
 
 # ============================================================================
@@ -1525,15 +1899,11 @@ def create_prd_analysis_sheet(wb):
     set_cell_style(ws['B20'], font_bold=True, bg_color='FFEB9C')
     
     # Dodatkowe formatowanie warunkowe dla B20
-    from openpyxl.formatting.rule import CellIsRule
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     yellow_fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
     orange_fill = PatternFill(start_color='FFC000', end_color='FFC000', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.styles.differential import DifferentialStyle
-    
     ws.conditional_formatting.add('B20',
         Rule(type='containsText', operator='containsText', text='Tanio', dxf=DifferentialStyle(fill=green_fill)))
     ws.conditional_formatting.add('B20',
@@ -1575,7 +1945,7 @@ def create_new_property_after_sale_sheet(wb):
     set_cell_style(ws['A4'], font_bold=True, font_size=12, border=False)
     
     ws['A6'] = 'Środki po sprzedaży (po spłacie kredytu) [CHF]'
-    ws['B6'] = "='12_Analiza_sprzedaży_po_X_latach'!B30"
+    ws['B6'] = "='12_Analiza_sprzedazy_X_lat'!B30"
     set_cell_style(ws['A6'])
     set_cell_style(ws['B6'], bg_color='F2F2F2', font_bold=True, number_format='#,##0.00')
     
@@ -1585,7 +1955,7 @@ def create_new_property_after_sale_sheet(wb):
     set_cell_style(ws['B7'], bg_color='F2F2F2', font_bold=True, number_format='#,##0.00')
     
     ws['A8'] = 'Lata do sprzedaży obecnej nieruchomości (X)'
-    ws['B8'] = "='12_Analiza_sprzedaży_po_X_latach'!B7"
+    ws['B8'] = "='12_Analiza_sprzedazy_X_lat'!B7"
     set_cell_style(ws['A8'])
     set_cell_style(ws['B8'], bg_color='F2F2F2', font_bold=True, number_format='0')
     
@@ -1671,6 +2041,14 @@ def create_new_property_after_sale_sheet(wb):
     set_cell_style(ws['A32'], font_bold=True)
     set_cell_style(ws['B32'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
+    # Największa cena spełniająca oba testy z sekcji D – wzór zamknięty jak
+    # w kalkulator_silnik.max_affordable_price: MIN(cena bez H2, cena z H2, wkład/min. wkład)
+    ws['A33'] = 'Maksymalna cena nowej nieruchomości (wkład i Tragbarkeit) [CHF]'
+    ws['B33'] = ('=IF(OR(B29<=0,B32<=0),0,MIN((B17*B29+B32*B15)/(B15+B16),'
+                 '(B17*B29+B32/B14+B32*B15)/((1-B13)/B14+B15+B16),B32/B12))')
+    set_cell_style(ws['A33'], font_bold=True)
+    set_cell_style(ws['B33'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    
     # ========================================================================
     # SEKCJA D – Test banku dla nowej nieruchomości
     # ========================================================================
@@ -1744,7 +2122,6 @@ def create_new_property_after_sale_sheet(wb):
     set_cell_style(ws['B50'], bg_color='F2F2F2', font_bold=True)
     
     # Formatowanie warunkowe dla ocen
-    from openpyxl.formatting.rule import CellIsRule
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
@@ -2026,7 +2403,6 @@ def create_family_planning_sheet(wb):
     set_cell_style(ws['B71'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
     # Formatowanie warunkowe dla B71
-    from openpyxl.formatting.rule import CellIsRule
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
@@ -2187,8 +2563,6 @@ def create_tax_canton_analysis_sheet(wb):
     ws['A68'] = 'Kod kantonu'
     set_cell_style(ws['A68'], font_bold=True, bg_color='E0E0E0')
     
-    from openpyxl.worksheet.datavalidation import DataValidation
-    
     # Data validation dla wyboru kantonów
     dv = DataValidation(type="list", formula1='"ZH,ZG,BE,GE,VS,TI,LU,SZ,NW,OW,UR,GL,FR,SO,BS,BL,SH,AR,AI,SG,GR,AG"', 
                         allow_blank=True)
@@ -2320,10 +2694,23 @@ def create_tax_canton_analysis_sheet(wb):
     ws.column_dimensions['E'].width = 20
     ws.column_dimensions['F'].width = 20
 
-def create_renovation_sheet(wb):
-    """Tworzy arkusz 16_Renowacje - model remontu i renowacji nieruchomości."""
+def create_renovation_sheet(wb, years=30):
+    """Tworzy arkusz 16_Renowacje - model remontu i renowacji nieruchomości (lata 0..years)."""
     ws = wb.create_sheet('16_Renowacje')
     
+    # Szerokości kolumn (przed wierszami – tryb strumieniowy)
+    ws.column_dimensions['A'].width = 50
+    ws.column_dimensions['B'].width = 20
+    ws.column_dimensions['C'].width = 15
+    ws.column_dimensions['D'].width = 18
+    ws.column_dimensions['E'].width = 18
+    ws.column_dimensions['F'].width = 18
+    ws.column_dimensions['G'].width = 15
+    ws.column_dimensions['H'].width = 18
+    ws.column_dimensions['I'].width = 18
+    ws.column_dimensions['J'].width = 18
+    ws.column_dimensions['K'].width = 18
+    
     # Nagłówek główny
     ws['A1'] = 'MODEL REMONTU I RENOWACJI NIERUCHOMOŚCI'
     set_cell_style(ws['A1'], font_bold=True, font_size=14, border=False)
@@ -2341,7 +2728,7 @@ def create_renovation_sheet(wb):
     set_cell_style(ws['B5'], bg_color='F2F2F2', font_bold=True, number_format='#,##0.00')
     
     ws['A6'] = 'Horyzont analizy [lata]'
-    ws['B6'] = 30
+    ws['B6'] = years
     set_cell_style(ws['A6'])
     set_cell_style(ws['B6'], bg_color='CCE5FF', number_format='0')
     
@@ -2404,12 +2791,19 @@ def create_renovation_sheet(wb):
         set_cell_style(ws.cell(row=row, column=6), bg_color='F2F2F2', number_format=FORMAT_PERCENTAGE_00)
     
     # ========================================================================
-    # SEKCJA C – Roczna agregacja remontów
+    # SEKCJA C – Roczna agregacja remontów (A–E)
+    # SEKCJA D – Wpływ remontów na wartość nieruchomości (G–K)
+    # Obie tabele leżą w tych samych wierszach, więc budowane są razem,
+    # wiersz po wierszu.
     # ========================================================================
     
     ws['A32'] = 'KOSZTY REMONTÓW W CZASIE'
     set_cell_style(ws['A32'], font_bold=True, font_size=12, border=False)
     
+    ws['G32'] = 'WPŁYW REMONTÓW NA WARTOŚĆ NIERUCHOMOŚCI'
+    set_cell_style(ws['G32'], font_bold=True, font_size=12, border=False)
+    ws.merge_cells('G32:K32')
+    
     # Nagłówki tabeli agregacji
     headers_agg = ['Rok', 'Koszt roczny [CHF]', 'Część inwestycyjna [CHF]', 
                    'Część utrzymaniowa [CHF]', 'Skumulowany koszt [CHF]']
@@ -2419,6 +2813,16 @@ def create_renovation_sheet(wb):
         cell.value = header
         set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
     
+    # Nagłówki tabeli wartości
+    headers_value = ['Rok', 'Wartość wg scenariusza 08 [CHF]', 
+                     'Skumulowana część inwestycyjna [CHF]', 
+                     'Wartość po remontach [CHF]', 'Różnica vs scenariusz [CHF]']
+    
+    for col_idx, header in enumerate(headers_value, start=7):
+        cell = ws.cell(row=34, column=col_idx)
+        cell.value = header
+        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
+    
     # Rok 0 (wiersz bazowy dla skumulowanego)
     ws['A35'] = 0
     ws['B35'] = 0
@@ -2430,9 +2834,23 @@ def create_renovation_sheet(wb):
         set_cell_style(ws.cell(row=35, column=col), bg_color='F2F2F2', number_format='#,##0.00')
     ws.cell(row=35, column=1).number_format = '0'
     
-    # Lata 1-30 (wiersze 36-65)
-    for year in range(1, 31):
+    ws['G35'] = 0
+    ws['H35'] = "=$B$5"
+    ws['I35'] = 0
+    ws['J35'] = '=H35+I35'
+    ws['K35'] = '=J35-H35'
+    
+    for col in range(7, 12):
+        set_cell_style(ws.cell(row=35, column=col), bg_color='F2F2F2', number_format='#,##0.00')
+    ws.cell(row=35, column=7).number_format = '0'
+    
+    flush_rows(ws, 35)
+    
+    # Lata 1..years (wiersze 36..35+years)
+    last = 35 + years
+    for year in range(1, years + 1):
         row = 35 + year
+        sheet08_row = 13 + year  # rok 1 w arkuszu 08 to wiersz 14, itd.
         
         # Rok
         ws.cell(row=row, column=1).value = year
@@ -2453,40 +2871,6 @@ def create_renovation_sheet(wb):
         # Skumulowany koszt
         ws.cell(row=row, column=5).value = f'=E{row-1}+B{row}'
         ws.cell(row=row, column=5).number_format = '#,##0.00'
-    
-    # ========================================================================
-    # SEKCJA D – Wpływ remontów na wartość nieruchomości
-    # ========================================================================
-    
-    ws['G32'] = 'WPŁYW REMONTÓW NA WARTOŚĆ NIERUCHOMOŚCI'
-    set_cell_style(ws['G32'], font_bold=True, font_size=12, border=False)
-    ws.merge_cells('G32:K32')
-    
-    # Nagłówki
-    headers_value = ['Rok', 'Wartość wg scenariusza 08 [CHF]', 
-                     'Skumulowana część inwestycyjna [CHF]', 
-                     'Wartość po remontach [CHF]', 'Różnica vs scenariusz [CHF]']
-    
-    for col_idx, header in enumerate(headers_value, start=7):
-        cell = ws.cell(row=34, column=col_idx)
-        cell.value = header
-        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
-    
-    # Rok 0 (wiersz 35)
-    ws['G35'] = 0
-    ws['H35'] = "=$B$5"
-    ws['I35'] = 0
-    ws['J35'] = '=H35+I35'
-    ws['K35'] = '=J35-H35'
-    
-    for col in range(7, 12):
-        set_cell_style(ws.cell(row=35, column=col), bg_color='F2F2F2', number_format='#,##0.00')
-    ws.cell(row=35, column=7).number_format = '0'
-    
-    # Lata 1-30 (wiersze 36-65)
-    for year in range(1, 31):
-        row = 35 + year
-        sheet08_row = 13 + year  # rok 1 w arkuszu 08 to wiersz 14, itd.
         
         # Rok
         ws.cell(row=row, column=7).value = year
@@ -2511,49 +2895,52 @@ def create_renovation_sheet(wb):
         # Różnica
         ws.cell(row=row, column=11).value = f'=J{row}-H{row}'
         ws.cell(row=row, column=11).number_format = '#,##0.00'
+        
+        flush_rows(ws, row)
     
     # ========================================================================
     # SEKCJA E – Podsumowanie sprzedażowe
     # ========================================================================
     
-    ws['A70'] = 'PODSUMOWANIE DLA MOMENTU SPRZEDAŻY'
-    set_cell_style(ws['A70'], font_bold=True, font_size=12, border=False)
-    
-    ws['A72'] = 'Horyzont sprzedaży (X lat)'
-    ws['B72'] = "='12_Analiza_sprzedaży_po_X_latach'!B7"
-    set_cell_style(ws['A72'])
-    set_cell_style(ws['B72'], bg_color='F2F2F2', font_bold=True, number_format='0')
-    
-    ws['A74'] = 'Skumulowany koszt remontów do roku X [CHF]'
-    ws['B74'] = '=IF(B72<=30,INDEX($E$35:$E$65,B72+1),0)'
-    set_cell_style(ws['A74'], font_bold=True)
-    set_cell_style(ws['B74'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
-    
-    ws['A75'] = 'Dodatkowa wartość dzięki remontom do roku X [CHF]'
-    ws['B75'] = '=IF(B72<=30,INDEX($K$35:$K$65,B72+1),0)'
-    set_cell_style(ws['A75'], font_bold=True)
-    set_cell_style(ws['B75'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
-    
-    ws['A76'] = 'Efekt netto remontów przy sprzedaży [CHF]'
-    ws['B76'] = '=B75-B74'
-    set_cell_style(ws['A76'], font_bold=True)
-    set_cell_style(ws['B76'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
-    
-    ws['A78'] = 'Interpretacja efektu netto'
-    ws['B78'] = '=IF(B76>0,"Remonty zwiększają wartość netto","Remonty nie pokrywają kosztów")'
-    set_cell_style(ws['A78'], font_bold=True)
-    set_cell_style(ws['B78'], bg_color='FFEB9C', font_bold=True)
-    
-    # Formatowanie warunkowe dla B78
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.styles.differential import DifferentialStyle
+    # Podsumowanie cztery wiersze pod tabelą (przy 30 latach: wiersze 70–89)
+    summary = last + 5
+    ws[f'A{summary}'] = 'PODSUMOWANIE DLA MOMENTU SPRZEDAŻY'
+    set_cell_style(ws[f'A{summary}'], font_bold=True, font_size=12, border=False)
+    
+    ws[f'A{summary + 2}'] = 'Horyzont sprzedaży (X lat)'
+    ws[f'B{summary + 2}'] = "='12_Analiza_sprzedazy_X_lat'!B7"
+    set_cell_style(ws[f'A{summary + 2}'])
+    set_cell_style(ws[f'B{summary + 2}'], bg_color='F2F2F2', font_bold=True, number_format='0')
+    
+    ws[f'A{summary + 4}'] = 'Skumulowany koszt remontów do roku X [CHF]'
+    ws[f'B{summary + 4}'] = f'=IF(B{summary + 2}<={years},INDEX($E$35:$E${last},B{summary + 2}+1),NA())'
+    set_cell_style(ws[f'A{summary + 4}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 4}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    
+    ws[f'A{summary + 5}'] = 'Dodatkowa wartość dzięki remontom do roku X [CHF]'
+    ws[f'B{summary + 5}'] = f'=IF(B{summary + 2}<={years},INDEX($K$35:$K${last},B{summary + 2}+1),NA())'
+    set_cell_style(ws[f'A{summary + 5}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 5}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    
+    ws[f'A{summary + 6}'] = 'Efekt netto remontów przy sprzedaży [CHF]'
+    ws[f'B{summary + 6}'] = f'=B{summary + 5}-B{summary + 4}'
+    set_cell_style(ws[f'A{summary + 6}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 6}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    
+    ws[f'A{summary + 8}'] = 'Interpretacja efektu netto'
+    ws[f'B{summary + 8}'] = (f'=IF(B{summary + 6}>0,'
+                               '"Remonty zwiększają wartość netto","Remonty nie pokrywają kosztów")')
+    set_cell_style(ws[f'A{summary + 8}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 8}'], bg_color='FFEB9C', font_bold=True)
+    
+    # Formatowanie warunkowe interpretacji
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
-    ws.conditional_formatting.add('B78',
+    ws.conditional_formatting.add(f'B{summary + 8}',
         Rule(type='containsText', operator='containsText', text='zwiększają', 
              dxf=DifferentialStyle(fill=green_fill)))
-    ws.conditional_formatting.add('B78',
+    ws.conditional_formatting.add(f'B{summary + 8}',
         Rule(type='containsText', operator='containsText', text='nie pokrywają', 
              dxf=DifferentialStyle(fill=red_fill)))
     
@@ -2561,51 +2948,39 @@ def create_renovation_sheet(wb):
     # SEKCJA F – Statystyki dodatkowe
     # ========================================================================
     
-    ws['A82'] = 'STATYSTYKI REMONTÓW'
-    set_cell_style(ws['A82'], font_bold=True, font_size=12, border=False)
-    
-    ws['A84'] = 'Liczba planowanych remontów'
-    ws['B84'] = '=COUNTIF($C$17:$C$26,">0")'
-    set_cell_style(ws['A84'])
-    set_cell_style(ws['B84'], bg_color='F2F2F2', number_format='0')
-    
-    ws['A85'] = 'Całkowity koszt wszystkich remontów [CHF]'
-    ws['B85'] = '=SUM($D$17:$D$26)'
-    set_cell_style(ws['A85'])
-    set_cell_style(ws['B85'], bg_color='F2F2F2', number_format='#,##0.00')
-    
-    ws['A86'] = 'Średni koszt remontu [CHF]'
-    ws['B86'] = '=IF(B84>0,B85/B84,0)'
-    set_cell_style(ws['A86'])
-    set_cell_style(ws['B86'], bg_color='F2F2F2', number_format='#,##0.00')
-    
-    ws['A87'] = 'Procent kosztów inwestycyjnych [%]'
-    ws['B87'] = '=IF(B85>0,SUMPRODUCT($D$17:$D$26*$F$17:$F$26)/B85,0)'
-    set_cell_style(ws['A87'])
-    set_cell_style(ws['B87'], bg_color='F2F2F2', number_format=FORMAT_PERCENTAGE_00)
-    
-    ws['A88'] = 'Całkowity koszt inwestycyjny [CHF]'
-    ws['B88'] = '=SUMPRODUCT($D$17:$D$26*$F$17:$F$26)'
-    set_cell_style(ws['A88'])
-    set_cell_style(ws['B88'], bg_color='F2F2F2', number_format='#,##0.00')
-    
-    ws['A89'] = 'Całkowity koszt utrzymaniowy [CHF]'
-    ws['B89'] = '=B85-B88'
-    set_cell_style(ws['A89'])
-    set_cell_style(ws['B89'], bg_color='F2F2F2', number_format='#,##0.00')
-    
-    # Szerokości kolumn
-    ws.column_dimensions['A'].width = 50
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 18
-    ws.column_dimensions['E'].width = 18
-    ws.column_dimensions['F'].width = 18
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 18
-    ws.column_dimensions['I'].width = 18
-    ws.column_dimensions['J'].width = 18
-    ws.column_dimensions['K'].width = 18
+    ws[f'A{summary + 12}'] = 'STATYSTYKI REMONTÓW'
+    set_cell_style(ws[f'A{summary + 12}'], font_bold=True, font_size=12, border=False)
+    
+    ws[f'A{summary + 14}'] = 'Liczba planowanych remontów'
+    ws[f'B{summary + 14}'] = '=COUNTIF($C$17:$C$26,">0")'
+    set_cell_style(ws[f'A{summary + 14}'])
+    set_cell_style(ws[f'B{summary + 14}'], bg_color='F2F2F2', number_format='0')
+    
+    ws[f'A{summary + 15}'] = 'Całkowity koszt wszystkich remontów [CHF]'
+    ws[f'B{summary + 15}'] = '=SUM($D$17:$D$26)'
+    set_cell_style(ws[f'A{summary + 15}'])
+    set_cell_style(ws[f'B{summary + 15}'], bg_color='F2F2F2', number_format='#,##0.00')
+    
+    ws[f'A{summary + 16}'] = 'Średni koszt remontu [CHF]'
+    ws[f'B{summary + 16}'] = f'=IF(B{summary + 14}>0,B{summary + 15}/B{summary + 14},0)'
+    set_cell_style(ws[f'A{summary + 16}'])
+    set_cell_style(ws[f'B{summary + 16}'], bg_color='F2F2F2', number_format='#,##0.00')
+    
+    ws[f'A{summary + 17}'] = 'Procent kosztów inwestycyjnych [%]'
+    ws[f'B{summary + 17}'] = f'=IF(B{summary + 15}>0,SUMPRODUCT($D$17:$D$26*$F$17:$F$26)/B{summary + 15},0)'
+    set_cell_style(ws[f'A{summary + 17}'])
+    set_cell_style(ws[f'B{summary + 17}'], bg_color='F2F2F2', number_format=FORMAT_PERCENTAGE_00)
+    
+    ws[f'A{summary + 18}'] = 'Całkowity koszt inwestycyjny [CHF]'
+    ws[f'B{summary + 18}'] = '=SUMPRODUCT($D$17:$D$26*$F$17:$F$26)'
+    set_cell_style(ws[f'A{summary + 18}'])
+    set_cell_style(ws[f'B{summary + 18}'], bg_color='F2F2F2', number_format='#,##0.00')
+    
+    ws[f'A{summary + 19}'] = 'Całkowity koszt utrzymaniowy [CHF]'
+    ws[f'B{summary + 19}'] = f'=B{summary + 15}-B{summary + 18}'
+    set_cell_style(ws[f'A{summary + 19}'])
+    set_cell_style(ws[f'B{summary + 19}'], bg_color='F2F2F2', number_format='#,##0.00')
+
 
 def create_tax_canton_analysis_sheet(wb):
     """Tworzy arkusz 17_Podatki_kantony - analiza podatkowa kantonów."""
@@ -2756,8 +3131,6 @@ def create_tax_canton_analysis_sheet(wb):
     ws['A68'] = 'Kod kantonu'
     set_cell_style(ws['A68'], font_bold=True, bg_color='E0E0E0')
     
-    from openpyxl.worksheet.datavalidation import DataValidation
-    
     # Data validation dla wyboru kantonów
     dv = DataValidation(type="list", formula1='"ZH,ZG,BE,GE,VS,TI,LU,SZ,NW,OW,UR,GL,FR,SO,BS,BL,SH,AR,AI,SG,GR,AG"', 
                         allow_blank=True)
@@ -2966,7 +3339,6 @@ def create_liquidity_and_buffer_sheet(wb):
     set_cell_style(ws['B20'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
     # Formatowanie warunkowe dla nadwyżki/deficytu
-    from openpyxl.formatting.rule import CellIsRule
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
@@ -3059,8 +3431,6 @@ def create_liquidity_and_buffer_sheet(wb):
     ws.conditional_formatting.add('D35:D37', CellIsRule(operator='greaterThanOrEqual', formula=['0'], fill=green_fill))
     ws.conditional_formatting.add('D35:D37', CellIsRule(operator='lessThan', formula=['0'], fill=red_fill))
     
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.styles.differential import DifferentialStyle
     
     ws.conditional_formatting.add('E35:E37',
         Rule(type='containsText', operator='containsText', text='OK', 
@@ -3189,10 +3559,23 @@ def create_liquidity_and_buffer_sheet(wb):
     ws.column_dimensions['H'].width = 18
 
 
-def create_amort_vs_etf_sheet(wb):
-    """Tworzy arkusz 19_Amortyzacja_vs_ETF - porównanie pełnej amortyzacji vs inwestycji w ETF."""
+def create_amort_vs_etf_sheet(wb, years=30):
+    """Tworzy arkusz 19_Amortyzacja_vs_ETF - porównanie pełnej amortyzacji vs inwestycji w ETF (lata 0..years)."""
     ws = wb.create_sheet('19_Amortyzacja_vs_ETF')
     
+    # Szerokości kolumn (przed wierszami – tryb strumieniowy)
+    ws.column_dimensions['A'].width = 50
+    ws.column_dimensions['B'].width = 25
+    ws.column_dimensions['C'].width = 20
+    ws.column_dimensions['D'].width = 20
+    ws.column_dimensions['E'].width = 5
+    ws.column_dimensions['F'].width = 10
+    ws.column_dimensions['G'].width = 22
+    ws.column_dimensions['H'].width = 22
+    ws.column_dimensions['I'].width = 22
+    ws.column_dimensions['J'].width = 22
+    ws.column_dimensions['K'].width = 22
+    
     # Nagłówek główny
     ws['A1'] = 'PORÓWNANIE: PEŁNA AMORTYZACJA vs ETF ZAMIAST DOBROWOLNEJ AMORTYZACJI'
     set_cell_style(ws['A1'], font_bold=True, font_size=14, border=False)
@@ -3240,20 +3623,35 @@ def create_amort_vs_etf_sheet(wb):
     set_cell_style(ws['B14'], bg_color='F2F2F2', font_bold=True, number_format='#,##0.00')
     
     # ========================================================================
-    # SEKCJA B – Tabela scenariusza A (pełna amortyzacja)
+    # SEKCJA B – Tabela scenariusza A (pełna amortyzacja, kolumny A–D)
+    # SEKCJA C – Tabela scenariusza B (ETF zamiast dobrowolnej amortyzacji, F–K)
+    # Obie tabele leżą w tych samych wierszach, więc budowane są razem,
+    # wiersz po wierszu.
     # ========================================================================
     
     ws['A18'] = 'SCENARIUSZ A – PEŁNA AMORTYZACJA (jak w bazowym modelu)'
     set_cell_style(ws['A18'], font_bold=True, font_size=12, border=False)
     
-    # Nagłówki
-    headers_A = ['Rok', 'Wartość nieruchomości [CHF]', 'Saldo kredytu A [CHF]', 'Equity A [CHF]']
+    ws['F18'] = 'SCENARIUSZ B – ETF ZAMIAST DOBROWOLNEJ AMORTYZACJI'
+    set_cell_style(ws['F18'], font_bold=True, font_size=12, border=False)
+    ws.merge_cells('F18:J18')
+    
+    # Nagłówki
+    headers_A = ['Rok', 'Wartość nieruchomości [CHF]', 'Saldo kredytu A [CHF]', 'Equity A [CHF]']
     
     for col_idx, header in enumerate(headers_A, start=1):
         cell = ws.cell(row=20, column=col_idx)
         cell.value = header
         set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
     
+    headers_B = ['Rok', 'Dobrowolna amort. [CHF]', 'ETF narastająco [CHF]', 
+                 'Saldo kredytu B [CHF]', 'Equity nier. B [CHF]', 'Majątek netto B [CHF]']
+    
+    for col_idx, header in enumerate(headers_B, start=6):
+        cell = ws.cell(row=20, column=col_idx)
+        cell.value = header
+        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
+    
     # Rok 0 (wiersz 21)
     ws['A21'] = 0
     ws['B21'] = '=$B$5'
@@ -3267,45 +3665,6 @@ def create_amort_vs_etf_sheet(wb):
         else:
             cell.number_format = '#,##0.00'
     
-    # Lata 1–30 (wiersze 22–51)
-    for year in range(1, 31):
-        row = 21 + year
-        harmonogram_row = 13 + year
-        
-        # Rok
-        ws.cell(row=row, column=1).value = year
-        ws.cell(row=row, column=1).number_format = '0'
-        
-        # Wartość nieruchomości
-        ws.cell(row=row, column=2).value = f'=B{row-1}*(1+$B$11)'
-        ws.cell(row=row, column=2).number_format = '#,##0.00'
-        
-        # Saldo kredytu A (z 05_Harmonogram_roczny)
-        ws.cell(row=row, column=3).value = f"='05_Harmonogram_roczny'!N{harmonogram_row}"
-        ws.cell(row=row, column=3).number_format = '#,##0.00'
-        
-        # Equity A
-        ws.cell(row=row, column=4).value = f'=B{row}-C{row}'
-        ws.cell(row=row, column=4).number_format = '#,##0.00'
-    
-    # ========================================================================
-    # SEKCJA C – Tabela scenariusza B (ETF zamiast dobrowolnej amortyzacji)
-    # ========================================================================
-    
-    ws['F18'] = 'SCENARIUSZ B – ETF ZAMIAST DOBROWOLNEJ AMORTYZACJI'
-    set_cell_style(ws['F18'], font_bold=True, font_size=12, border=False)
-    ws.merge_cells('F18:J18')
-    
-    # Nagłówki
-    headers_B = ['Rok', 'Dobrowolna amort. [CHF]', 'ETF narastająco [CHF]', 
-                 'Saldo kredytu B [CHF]', 'Equity nier. B [CHF]', 'Majątek netto B [CHF]']
-    
-    for col_idx, header in enumerate(headers_B, start=6):
-        cell = ws.cell(row=20, column=col_idx)
-        cell.value = header
-        set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
-    
-    # Rok 0 (wiersz 21)
     ws['F21'] = 0
     ws['G21'] = 0
     ws['H21'] = 0
@@ -3320,96 +3679,92 @@ def create_amort_vs_etf_sheet(wb):
         else:
             cell.number_format = '#,##0.00'
     
-    # Lata 1–30 (wiersze 22–51)
-    for year in range(1, 31):
+    flush_rows(ws, 21)
+    
+    # Lata 1..years (wiersze 22..21+years) – formuły wiersza 22 wypełnione w dół
+    last = 21 + years
+    table = FillDown(ws, 22, last, {
+        2: '=B21*(1+$B$11)',                        # Wartość nieruchomości
+        3: "='05_Harmonogram_roczny'!N14",          # Saldo kredytu A (z 05_Harmonogram_roczny)
+        4: '=B22-C22',                              # Equity A
+        7: '=$B$14',                                # Dobrowolna amortyzacja
+        8: '=H21*(1+$B$12)+G22',                    # ETF narastająco
+        9: '=C22+SUM($G$22:G22)',                   # Saldo kredytu B (= Saldo A + skumulowana dobrowolna amort.)
+        10: '=B22-I22',                             # Equity nieruchomości B
+        11: '=J22+H22',                             # Majątek netto B
+    })
+    for year in range(1, years + 1):
         row = 21 + year
+        table.write(row)
         
-        # Rok
-        ws.cell(row=row, column=6).value = year
-        ws.cell(row=row, column=6).number_format = '0'
-        
-        # Dobrowolna amortyzacja
-        ws.cell(row=row, column=7).value = '=$B$14'
-        ws.cell(row=row, column=7).number_format = '#,##0.00'
-        
-        # ETF narastająco
-        ws.cell(row=row, column=8).value = f'=H{row-1}*(1+$B$12)+G{row}'
-        ws.cell(row=row, column=8).number_format = '#,##0.00'
-        
-        # Saldo kredytu B (= Saldo A + skumulowana dobrowolna amort.)
-        ws.cell(row=row, column=9).value = f'=C{row}+SUM($G$22:G{row})'
-        ws.cell(row=row, column=9).number_format = '#,##0.00'
-        
-        # Equity nieruchomości B
-        ws.cell(row=row, column=10).value = f'=B{row}-I{row}'
-        ws.cell(row=row, column=10).number_format = '#,##0.00'
+        # Rok (tabela A i B)
+        for col in (1, 6):
+            ws.cell(row=row, column=col).value = year
+            ws.cell(row=row, column=col).number_format = '0'
+        for col in (2, 3, 4, 7, 8, 9, 10, 11):
+            ws.cell(row=row, column=col).number_format = '#,##0.00'
         
-        # Majątek netto B
-        ws.cell(row=row, column=11).value = f'=J{row}+H{row}'
-        ws.cell(row=row, column=11).number_format = '#,##0.00'
+        flush_rows(ws, row)
     
     # ========================================================================
     # SEKCJA D – Podsumowanie końcowe
     # ========================================================================
     
-    ws['A55'] = 'PODSUMOWANIE KOŃCOWE'
-    set_cell_style(ws['A55'], font_bold=True, font_size=12, border=False)
+    # Podsumowanie trzy wiersze pod tabelą (przy 30 latach: wiersze 55–61)
+    summary = last + 4
+    ws[f'A{summary}'] = 'PODSUMOWANIE KOŃCOWE'
+    set_cell_style(ws[f'A{summary}'], font_bold=True, font_size=12, border=False)
     
-    ws['A57'] = 'Equity scenariusz A po X latach [CHF]'
-    ws['B57'] = '=INDEX($D$21:$D$51,$B$9+1)'
-    set_cell_style(ws['A57'], font_bold=True)
-    set_cell_style(ws['B57'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 2}'] = 'Equity scenariusz A po X latach [CHF]'
+    ws[f'B{summary + 2}'] = f'=INDEX($D$21:$D${last},$B$9+1)'
+    set_cell_style(ws[f'A{summary + 2}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 2}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
-    ws['A58'] = 'Majątek netto scenariusz B po X latach [CHF]'
-    ws['B58'] = '=INDEX($K$21:$K$51,$B$9+1)'
-    set_cell_style(ws['A58'], font_bold=True)
-    set_cell_style(ws['B58'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 3}'] = 'Majątek netto scenariusz B po X latach [CHF]'
+    ws[f'B{summary + 3}'] = f'=INDEX($K$21:$K${last},$B$9+1)'
+    set_cell_style(ws[f'A{summary + 3}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 3}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
-    ws['A59'] = 'Różnica: B – A [CHF]'
-    ws['B59'] = '=B58-B57'
-    set_cell_style(ws['A59'], font_bold=True)
-    set_cell_style(ws['B59'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 4}'] = 'Różnica: B – A [CHF]'
+    ws[f'B{summary + 4}'] = f'=B{summary + 3}-B{summary + 2}'
+    set_cell_style(ws[f'A{summary + 4}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 4}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
-    ws['A61'] = 'Komentarz'
-    ws['B61'] = '=IF(B59>0,"ETF + mniejsza amortyzacja daje lepszy wynik","Pełna amortyzacja daje lepszy wynik")'
-    set_cell_style(ws['A61'], font_bold=True)
-    set_cell_style(ws['B61'], bg_color='FFEB9C', font_bold=True)
+    ws[f'A{summary + 6}'] = 'Komentarz'
+    ws[f'B{summary + 6}'] = (f'=IF(B{summary + 4}>0,'
+                               '"ETF + mniejsza amortyzacja daje lepszy wynik","Pełna amortyzacja daje lepszy wynik")')
+    set_cell_style(ws[f'A{summary + 6}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 6}'], bg_color='FFEB9C', font_bold=True)
     
     # Formatowanie warunkowe
-    from openpyxl.formatting.rule import CellIsRule
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
-    ws.conditional_formatting.add('B59', CellIsRule(operator='greaterThan', formula=['0'], fill=green_fill))
-    ws.conditional_formatting.add('B59', CellIsRule(operator='lessThan', formula=['0'], fill=red_fill))
+    ws.conditional_formatting.add(f'B{summary + 4}', CellIsRule(operator='greaterThan', formula=['0'], fill=green_fill))
+    ws.conditional_formatting.add(f'B{summary + 4}', CellIsRule(operator='lessThan', formula=['0'], fill=red_fill))
     
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.styles.differential import DifferentialStyle
     
-    ws.conditional_formatting.add('B61',
+    ws.conditional_formatting.add(f'B{summary + 6}',
         Rule(type='containsText', operator='containsText', text='lepszy wynik',
              dxf=DifferentialStyle(fill=green_fill)))
-    ws.conditional_formatting.add('B61',
+    ws.conditional_formatting.add(f'B{summary + 6}',
         Rule(type='containsText', operator='containsText', text='Pełna amortyzacja',
              dxf=DifferentialStyle(fill=red_fill)))
-    
-    # Szerokości kolumn
-    ws.column_dimensions['A'].width = 50
-    ws.column_dimensions['B'].width = 25
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 20
-    ws.column_dimensions['E'].width = 5
-    ws.column_dimensions['F'].width = 10
-    ws.column_dimensions['G'].width = 22
-    ws.column_dimensions['H'].width = 22
-    ws.column_dimensions['I'].width = 22
-    ws.column_dimensions['J'].width = 22
-    ws.column_dimensions['K'].width = 22
 
-def create_amort_direct_vs_3a_sheet(wb):
-    """Tworzy arkusz 20_Amortyzacja_direct_vs_3a - porównanie amortyzacji bezpośredniej z pośrednią (Säule 3a)."""
+
+def create_amort_direct_vs_3a_sheet(wb, years=30):
+    """
+    Tworzy arkusz 20_Amortyzacja_direct_vs_3a - porównanie amortyzacji bezpośredniej z pośrednią
+    (Säule 3a) w latach 1..years.
+    """
     ws = wb.create_sheet('20_Amortyzacja_direct_vs_3a')
     
+    # Szerokości kolumn (przed wierszami – tryb strumieniowy)
+    ws.column_dimensions['A'].width = 50
+    ws.column_dimensions['B'].width = 20
+    for col in ['C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N']:
+        ws.column_dimensions[col].width = 18
+    
     # ========================================================================
     # SEKCJA A – Dane wejściowe
     # ========================================================================
@@ -3479,13 +3834,19 @@ def create_amort_direct_vs_3a_sheet(wb):
     set_cell_style(ws['B16'], bg_color='F2F2F2', font_bold=True, number_format='#,##0.00')
     
     # ========================================================================
-    # SEKCJA B – Scenariusz A (direct amortisation)
+    # SEKCJA B – Scenariusz A (direct amortisation, kolumny A–D)
+    # SEKCJA C – Scenariusz B (indirect via Säule 3a, kolumny G–N)
+    # Obie tabele leżą w tych samych wierszach, więc budowane są razem,
+    # wiersz po wierszu.
     # ========================================================================
     
     ws['A20'] = 'SCENARIUSZ A – AMORTYZACJA BEZPOŚREDNIA (DIRECT)'
     set_cell_style(ws['A20'], font_bold=True, font_size=12, border=False)
     
-    # Nagłówki tabeli
+    ws['G20'] = 'SCENARIUSZ B – AMORTYZACJA POŚREDNIA (SÄULE 3A)'
+    set_cell_style(ws['G20'], font_bold=True, font_size=12, border=False)
+    
+    # Nagłówki tabeli A
     headers_A = ['Rok', 'Wartość nieruchomości A [CHF]', 'Saldo kredytu A [CHF]', 'Equity A [CHF]']
     
     for col_idx, header in enumerate(headers_A, start=1):
@@ -3493,35 +3854,7 @@ def create_amort_direct_vs_3a_sheet(wb):
         cell.value = header
         set_cell_style(cell, font_bold=True, bg_color='D0D0D0', alignment='center')
     
-    # Wiersze danych (lata 1-30)
-    for year in range(1, 31):
-        row = 22 + year
-        
-        # Kolumna A - Rok
-        ws.cell(row=row, column=1).value = year
-        ws.cell(row=row, column=1).number_format = '0'
-        
-        # Kolumna B - Wartość nieruchomości A
-        ws.cell(row=row, column=2).value = f'=$B$5*(1+$B$9)^A{row}'
-        ws.cell(row=row, column=2).number_format = '#,##0.00'
-        
-        # Kolumna C - Saldo kredytu A
-        harmonogram_row = 12 + year
-        ws.cell(row=row, column=3).value = f"=INDEX('05_Harmonogram_roczny'!$L:$L,{harmonogram_row})"
-        ws.cell(row=row, column=3).number_format = '#,##0.00'
-        
-        # Kolumna D - Equity A
-        ws.cell(row=row, column=4).value = f'=B{row}-C{row}'
-        ws.cell(row=row, column=4).number_format = '#,##0.00'
-    
-    # ========================================================================
-    # SEKCJA C – Scenariusz B (indirect via Säule 3a)
-    # ========================================================================
-    
-    ws['G20'] = 'SCENARIUSZ B – AMORTYZACJA POŚREDNIA (SÄULE 3A)'
-    set_cell_style(ws['G20'], font_bold=True, font_size=12, border=False)
-    
-    # Nagłówki tabeli
+    # Nagłówki tabeli B
     headers_B = [
         'Rok',
         'Amortyzacja dobrowolna [CHF/rok]',
@@ -3542,200 +3875,1536 @@ def create_amort_direct_vs_3a_sheet(wb):
     ws.cell(row=22, column=11).value = 0
     ws.cell(row=22, column=11).number_format = '#,##0.00'
     
-    # Wiersze danych (lata 1-30)
-    for year in range(1, 31):
+    flush_rows(ws, 22)
+    
+    # Wiersze danych (lata 1..years) – formuły wiersza 23 wypełnione w dół
+    last = 22 + years
+    table = FillDown(ws, 23, last, {
+        2: '=$B$5*(1+$B$9)^A23',                    # Kolumna B - Wartość nieruchomości A
+        4: '=B23-C23',                              # Kolumna D - Equity A
+        8: '=$B$15',                                # Kolumna H - Amortyzacja dobrowolna
+        9: '=H23',                                  # Kolumna I - Wpłata na Säule 3a
+        10: '=I23*$B$11',                           # Kolumna J - Ulga podatkowa
+        11: '=K22*(1+$B$10)+I23+J23',               # Kolumna K - Wartość Säule 3a
+        12: '=C23+SUM($H$23:H23)',                  # Kolumna L - Saldo kredytu B
+        13: '=B23-L23',                             # Kolumna M - Equity nieruchomości B
+        14: '=M23+K23',                             # Kolumna N - Majątek netto B
+    })
+    for year in range(1, years + 1):
         row = 22 + year
+        table.write(row)
         
-        # Kolumna G - Rok
-        ws.cell(row=row, column=7).value = year
-        ws.cell(row=row, column=7).number_format = '0'
-        
-        # Kolumna H - Amortyzacja dobrowolna
-        ws.cell(row=row, column=8).value = '=$B$15'
-        ws.cell(row=row, column=8).number_format = '#,##0.00'
+        # Kolumny A i G - Rok
+        for col in (1, 7):
+            ws.cell(row=row, column=col).value = year
+            ws.cell(row=row, column=col).number_format = '0'
         
-        # Kolumna I - Wpłata na Säule 3a
-        ws.cell(row=row, column=9).value = f'=H{row}'
-        ws.cell(row=row, column=9).number_format = '#,##0.00'
-        
-        # Kolumna J - Ulga podatkowa
-        ws.cell(row=row, column=10).value = f'=I{row}*$B$11'
-        ws.cell(row=row, column=10).number_format = '#,##0.00'
-        
-        # Kolumna K - Wartość Säule 3a
-        ws.cell(row=row, column=11).value = f'=K{row-1}*(1+$B$10)+I{row}+J{row}'
-        ws.cell(row=row, column=11).number_format = '#,##0.00'
-        
-        # Kolumna L - Saldo kredytu B
-        ws.cell(row=row, column=12).value = f'=C{row}+SUM($H$23:H{row})'
-        ws.cell(row=row, column=12).number_format = '#,##0.00'
+        # Kolumna C - Saldo kredytu A (INDEX ze stałym numerem wiersza – nie da się wypełnić w dół)
+        harmonogram_row = 12 + year
+        ws.cell(row=row, column=3).value = f"=INDEX('05_Harmonogram_roczny'!$L:$L,{harmonogram_row})"
         
-        # Kolumna M - Equity nieruchomości B
-        ws.cell(row=row, column=13).value = f'=B{row}-L{row}'
-        ws.cell(row=row, column=13).number_format = '#,##0.00'
+        for col in (2, 3, 4, 8, 9, 10, 11, 12, 13, 14):
+            ws.cell(row=row, column=col).number_format = '#,##0.00'
         
-        # Kolumna N - Majątek netto B
-        ws.cell(row=row, column=14).value = f'=M{row}+K{row}'
-        ws.cell(row=row, column=14).number_format = '#,##0.00'
+        flush_rows(ws, row)
     
     # ========================================================================
     # SEKCJA D – Podsumowanie na horyzoncie X lat
     # ========================================================================
     
-    ws['A56'] = 'PODSUMOWANIE PO X LATACH'
-    set_cell_style(ws['A56'], font_bold=True, font_size=12, border=False)
+    # Podsumowanie trzy wiersze pod tabelą (przy 30 latach: wiersze 56–64)
+    summary = last + 4
+    ws[f'A{summary}'] = 'PODSUMOWANIE PO X LATACH'
+    set_cell_style(ws[f'A{summary}'], font_bold=True, font_size=12, border=False)
     
     # Scenariusz A
-    ws['A58'] = 'Equity A po X latach [CHF]'
-    ws['B58'] = '=INDEX($D$23:$D$52,$B$8)'
-    set_cell_style(ws['A58'], font_bold=True)
-    set_cell_style(ws['B58'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 2}'] = 'Equity A po X latach [CHF]'
+    ws[f'B{summary + 2}'] = f'=INDEX($D$23:$D${last},$B$8)'
+    set_cell_style(ws[f'A{summary + 2}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 2}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
     # Scenariusz B
-    ws['A59'] = 'Equity B nieruchomości po X latach [CHF]'
-    ws['B59'] = '=INDEX($M$23:$M$52,$B$8)'
-    set_cell_style(ws['A59'], font_bold=True)
-    set_cell_style(ws['B59'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 3}'] = 'Equity B nieruchomości po X latach [CHF]'
+    ws[f'B{summary + 3}'] = f'=INDEX($M$23:$M${last},$B$8)'
+    set_cell_style(ws[f'A{summary + 3}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 3}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
-    ws['A60'] = 'Wartość Säule 3a po X latach [CHF]'
-    ws['B60'] = '=INDEX($K$23:$K$52,$B$8)'
-    set_cell_style(ws['A60'], font_bold=True)
-    set_cell_style(ws['B60'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 4}'] = 'Wartość Säule 3a po X latach [CHF]'
+    ws[f'B{summary + 4}'] = f'=INDEX($K$23:$K${last},$B$8)'
+    set_cell_style(ws[f'A{summary + 4}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 4}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
-    ws['A61'] = 'Majątek netto B po X latach [CHF]'
-    ws['B61'] = '=B59+B60'
-    set_cell_style(ws['A61'], font_bold=True)
-    set_cell_style(ws['B61'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 5}'] = 'Majątek netto B po X latach [CHF]'
+    ws[f'B{summary + 5}'] = f'=B{summary + 3}+B{summary + 4}'
+    set_cell_style(ws[f'A{summary + 5}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 5}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
     # Porównanie
-    ws['A63'] = 'Różnica: Majątek B – Equity A [CHF]'
-    ws['B63'] = '=B61-B58'
-    set_cell_style(ws['A63'], font_bold=True)
-    set_cell_style(ws['B63'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
+    ws[f'A{summary + 7}'] = 'Różnica: Majątek B – Equity A [CHF]'
+    ws[f'B{summary + 7}'] = f'=B{summary + 5}-B{summary + 2}'
+    set_cell_style(ws[f'A{summary + 7}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 7}'], bg_color='FFEB9C', font_bold=True, number_format='#,##0.00')
     
-    ws['A64'] = 'Werdykt'
-    ws['B64'] = '=IF(B63>0,"Lepsza amortyzacja pośrednia (Säule 3a)","Lepsza amortyzacja bezpośrednia")'
-    set_cell_style(ws['A64'], font_bold=True)
-    set_cell_style(ws['B64'], bg_color='FFEB9C', font_bold=True)
+    ws[f'A{summary + 8}'] = 'Werdykt'
+    ws[f'B{summary + 8}'] = (f'=IF(B{summary + 7}>0,'
+                               '"Lepsza amortyzacja pośrednia (Säule 3a)","Lepsza amortyzacja bezpośrednia")')
+    set_cell_style(ws[f'A{summary + 8}'], font_bold=True)
+    set_cell_style(ws[f'B{summary + 8}'], bg_color='FFEB9C', font_bold=True)
     
     # Formatowanie warunkowe dla werdyktu
-    from openpyxl.formatting.rule import Rule
-    from openpyxl.styles.differential import DifferentialStyle
     green_fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
     red_fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
     
-    ws.conditional_formatting.add('B63',
-        Rule(type='expression', formula=['B63>0'], dxf=DifferentialStyle(fill=green_fill)))
-    ws.conditional_formatting.add('B63',
-        Rule(type='expression', formula=['B63<0'], dxf=DifferentialStyle(fill=red_fill)))
+    ws.conditional_formatting.add(f'B{summary + 7}',
+        Rule(type='expression', formula=[f'B{summary + 7}>0'], dxf=DifferentialStyle(fill=green_fill)))
+    ws.conditional_formatting.add(f'B{summary + 7}',
+        Rule(type='expression', formula=[f'B{summary + 7}<0'], dxf=DifferentialStyle(fill=red_fill)))
     
-    ws.conditional_formatting.add('B64',
+    ws.conditional_formatting.add(f'B{summary + 8}',
         Rule(type='containsText', operator='containsText', text='pośrednia',
              dxf=DifferentialStyle(fill=green_fill)))
-    ws.conditional_formatting.add('B64',
+    ws.conditional_formatting.add(f'B{summary + 8}',
         Rule(type='containsText', operator='containsText', text='bezpośrednia',
              dxf=DifferentialStyle(fill=red_fill)))
-    
-    # Szerokości kolumn
-    ws.column_dimensions['A'].width = 50
-    ws.column_dimensions['B'].width = 20
-    for col in ['C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N']:
-        ws.column_dimensions[col].width = 18
 
 
+def sheet_counts(ws):
+    """Liczba komórek i formuł arkusza (zwykłego lub StreamingSheet)."""
+    if isinstance(ws, StreamingSheet):
+        return ws.counts()
+    cells = [cell for cell in ws._cells.values() if not isinstance(cell, MergedCell)]
+    return len(cells), sum(1 for cell in cells if cell.data_type == 'f')
 
-def main():
-    """Główna funkcja tworząca cały skoroszyt z 20 arkuszami."""
-    print("Tworzenie rozszerzonego kalkulatora nieruchomości w Szwajcarii...")
-    
-    wb = Workbook()
-    
-    if 'Sheet' in wb.sheetnames:
-        wb.remove(wb['Sheet'])
-    
-    print("  -> Tworzenie arkusza 00_Stałe...")
-    create_constants_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 01_Wejście...")
-    create_input_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 02_Finansowanie...")
-    create_financing_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 03_Tragbarkeit...")
-    create_tragbarkeit_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 04_Cashflow...")
-    create_cashflow_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 05_Harmonogram_roczny...")
-    create_yearly_schedule_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 06_Harmonogram_miesieczny...")
-    create_monthly_schedule_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 07_Analiza_ROI...")
-    create_roi_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 08_Symulacja_wzrostu_wartości...")
-    create_appreciation_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 09_Koszt_alternatywny_kapitalu...")
-    create_opportunity_cost_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 10_Rent_vs_Buy_30lat...")
-    create_rent_vs_buy_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 11_Stress_test...")
-    create_stress_test_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 12_Analiza_sprzedaży_po_X_latach...")
-    create_sale_analysis_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 13_Analiza_PRD...")
-    create_prd_analysis_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 14_Nowa_nieruchomosc_X_lat...")
-    create_new_property_after_sale_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 15_Planowanie_rodziny...")
-    create_family_planning_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 16_Renowacje...")
-    create_renovation_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 17_Podatki_kantony...")
-    create_tax_canton_analysis_sheet(wb)
-    
-    print("  -> Tworzenie arkusza 18_Plynnosc_poduszka...")
-    create_liquidity_and_buffer_sheet(wb)
+
+class BuildReport:
+    """
+    Pomiary kolejnych kroków budowania skoroszytu (arkusze i zapis):
+    czas, czas CPU, szczyt pamięci (tracemalloc, opcjonalnie), liczba
+    zapisanych komórek i formuł oraz wywołań set_cell_style.
+    """
+
+    COLUMNS = ['wall_seconds', 'cpu_seconds', 'peak_bytes', 'cells', 'formulas', 'styles_applied']
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.steps = []
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Mierzy blok kodu; wywołujący może uzupełnić 'cells' i 'formulas' w zwróconym słowniku."""
+        entry = {'step': name, 'cells': 0, 'formulas': 0}
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        styles = STYLES.calls
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_seconds'] = time.perf_counter() - wall
+            entry['cpu_seconds'] = time.process_time() - cpu
+            entry['peak_bytes'] = tracemalloc.get_traced_memory()[1] - base if self.trace_memory else None
+            entry['styles_applied'] = STYLES.calls - styles
+            self.steps.append(entry)
+
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def totals(self):
+        sheets = [entry for entry in self.steps if entry['step'] != 'zapis']
+        totals = {key: sum(entry[key] for entry in self.steps) for key in ('wall_seconds', 'cpu_seconds', 'styles_applied')}
+        totals['cells'] = sum(entry['cells'] for entry in sheets)
+        totals['formulas'] = sum(entry['formulas'] for entry in sheets)
+        peaks = [entry['peak_bytes'] for entry in self.steps if entry['peak_bytes'] is not None]
+        totals['peak_bytes'] = max(peaks) if peaks else None
+        return totals
+
+    def to_dict(self):
+        return {'steps': self.steps, 'total': self.totals()}
+
+    @staticmethod
+    def table(steps, total=None):
+        """Tabela tekstowa z listy kroków (także zagregowanych dla wielu skoroszytów)."""
+        lines = [f"{'Krok':34s} {'czas [ms]':>10s} {'CPU [ms]':>10s} {'pamięć [KB]':>12s} "
+                 f"{'komórki':>8s} {'formuły':>8s} {'style':>7s}"]
+        for entry in list(steps) + ([dict(total, step='RAZEM')] if total else []):
+            peak = '-' if entry['peak_bytes'] is None else f"{entry['peak_bytes'] / 1024:.0f}"
+            lines.append(f"{entry['step']:34s} {entry['wall_seconds'] * 1000:10.1f} {entry['cpu_seconds'] * 1000:10.1f} "
+                         f"{peak:>12s} {entry['cells']:8d} {entry['formulas']:8d} {entry['styles_applied']:7d}")
+        return '\n'.join(lines)
+
+
+# Kolejność arkuszy skoroszytu: (nazwa arkusza, funkcja budująca).
+SHEET_BUILDERS = [
+    ('00_Stałe', create_constants_sheet),
+    ('01_Wejście', create_input_sheet),
+    ('02_Finansowanie', create_financing_sheet),
+    ('03_Tragbarkeit', create_tragbarkeit_sheet),
+    ('04_Cashflow', create_cashflow_sheet),
+    ('05_Harmonogram_roczny', create_yearly_schedule_sheet),
+    ('06_Harmonogram_miesieczny', create_monthly_schedule_sheet),
+    ('07_Analiza_ROI', create_roi_sheet),
+    ('08_Symulacja_wzrostu_wartości', create_appreciation_sheet),
+    ('09_Koszt_alternatywny_kapitalu', create_opportunity_cost_sheet),
+    ('10_Rent_vs_Buy_30lat', create_rent_vs_buy_sheet),
+    ('11_Stress_test', create_stress_test_sheet),
+    ('12_Analiza_sprzedazy_X_lat', create_sale_analysis_sheet),
+    ('13_Analiza_PRD', create_prd_analysis_sheet),
+    ('14_Nowa_nieruchomosc_X_lat', create_new_property_after_sale_sheet),
+    ('15_Planowanie_rodziny', create_family_planning_sheet),
+    ('16_Renowacje', create_renovation_sheet),
+    ('17_Podatki_kantony', create_tax_canton_analysis_sheet),
+    ('18_Plynnosc_poduszka', create_liquidity_and_buffer_sheet),
+    ('19_Amortyzacja_vs_ETF', create_amort_vs_etf_sheet),
+    ('20_Amortyzacja_direct_vs_3a', create_amort_direct_vs_3a_sheet),
+]
+
+# Arkusze z tabelami rocznymi na horyzoncie analizy (parametr years funkcji arkusza)
+HORIZON_BUILDERS = {
+    create_yearly_schedule_sheet, create_roi_sheet, create_appreciation_sheet, create_opportunity_cost_sheet,
+    create_rent_vs_buy_sheet, create_sale_analysis_sheet, create_renovation_sheet, create_amort_vs_etf_sheet,
+    create_amort_direct_vs_3a_sheet,
+}
+
+
+def builder_options(builder, years=30, months=None):
+    """Parametry funkcji arkusza: długość harmonogramu 06 (months, domyślnie 12 * years) albo horyzont (years)."""
+    if builder is create_monthly_schedule_sheet:
+        return {'months': months or 12 * years}
+    if builder in HORIZON_BUILDERS:
+        return {'years': years}
+    return {}
+
+
+class SheetCache:
+    """
+    Pamięć podręczna gotowych arkuszy (XML z pakietu) na dysku.
+
+    Kluczem arkusza jest skrót SHA-256 źródła jego funkcji create_*_sheet,
+    wspólnego kodu skryptu (wszystko poza funkcjami arkuszy: style,
+    StreamingWorkbook…), danych wpisywanych do arkusza, opcji budowania
+    (--streaming i builder_options: --months dla 06, --years dla arkuszy
+    z tabelami rocznymi) i wersji openpyxl. Trafione arkusze są
+    w build_workbook tylko pustymi zaślepkami, a apply() po zapisie wkleja
+    w nie zapamiętany XML (splice_sheets, ze scaleniem stylów) i zapisuje
+    na dysk arkusze zbudowane od nowa.
+    """
+
+    VERSION = 1
     
-    print("  -> Tworzenie arkusza 19_Amortyzacja_vs_ETF...")
-    create_amort_vs_etf_sheet(wb)
+    # Skróty źródeł: {funkcja arkusza: skrót}, '' = kod wspólny; liczone raz na proces
+    _digests = None
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = {}
+        self.misses = {}
+
+    @classmethod
+    def source_digests(cls):
+        """
+        Skróty źródła każdej funkcji arkusza i reszty skryptu. Zakresy linii
+        funkcji pochodzą z jednego przebiegu ast po pliku skryptu
+        (inspect.getsource dla każdej funkcji osobno jest kilkadziesiąt razy
+        wolniejsze); zmiana wspólnych pomocników unieważnia wszystkie arkusze.
+        """
+        if cls._digests is None:
+            import ast
+            import hashlib
+            import openpyxl
+            
+            with open(os.path.abspath(__file__), encoding='utf-8') as f:
+                lines = f.read().splitlines(keepends=True)
+            # Funkcja o tej samej nazwie może być zdefiniowana dwa razy – liczy się ta z builder.__code__
+            spans = {node.lineno: node.end_lineno for node in ast.parse(''.join(lines)).body
+                     if isinstance(node, ast.FunctionDef)}
+            digests, common = {}, list(lines)
+            for _, builder in SHEET_BUILDERS:
+                first = builder.__code__.co_firstlineno
+                source = ''.join(lines[first - 1:spans[first]])
+                digests[builder] = hashlib.sha256(source.encode('utf-8')).hexdigest()
+                common[first - 1:spans[first]] = [''] * (spans[first] - first + 1)
+            header = f'{cls.VERSION}|{openpyxl.__version__}|'
+            digests[''] = hashlib.sha256((header + ''.join(common)).encode('utf-8')).hexdigest()
+            cls._digests = digests
+        return cls._digests
+
+    def key(self, name, builder, cells, streaming=False, options=None):
+        """
+        Klucz arkusza name; cells = {adres: wartość} wpisywane do arkusza po
+        zbudowaniu, options – parametry funkcji arkusza (builder_options).
+        """
+        import hashlib
+        
+        digests = self.source_digests()
+        options = dict(options or {}, streaming=streaming)
+        payload = json.dumps([digests[''], name, digests[builder], sorted(cells.items()), options],
+                             ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def lookup(self, name, builder, cells, streaming=False, options=None):
+        """Fragment arkusza z pamięci albo None (arkusz trzeba zbudować – zostanie zapamiętany w apply)."""
+        key = self.key(name, builder, cells, streaming, options)
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                fragment = json.load(f)
+        except (OSError, ValueError):
+            self.misses[name] = {'key': key}
+            return None
+        self.hits[name] = fragment
+        return fragment
+
+    def built(self, name, cells, formulas):
+        """Liczniki zbudowanego arkusza (do raportu przy późniejszych trafieniach)."""
+        self.misses[name].update(cells=cells, formulas=formulas)
+
+    def apply(self, data):
+        """Zapisuje nowe arkusze pakietu do pamięci i wkleja trafione; zwraca bajty pakietu."""
+        os.makedirs(self.directory, exist_ok=True)
+        for name, miss in self.misses.items():
+            fragment = dict(extract_sheet(data, name), cells=miss.get('cells', 0), formulas=miss.get('formulas', 0))
+            # Zapis przez plik tymczasowy – procesy trybu wsadowego mogą pisać ten sam klucz naraz
+            path = self._path(miss['key'])
+            temporary = f'{path}.{os.getpid()}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(fragment, f, ensure_ascii=False)
+            os.replace(temporary, path)
+        return splice_sheets(data, list(self.hits.values()))
+
+
+def input_cells(client):
+    """
+    Zamienia dane klienta na {(arkusz, adres): wartość}.
+
+    Klucze to nazwy pól INPUT_CELLS (01_Wejście), CONSTANT_CELLS (00_Stałe)
+    albo adresy 'Arkusz!B4'; pole 'id' jest pomijane.
+    """
+    cells = {}
+    for key, value in client.items():
+        if key == 'id':
+            continue
+        if key in INPUT_CELLS:
+            cells[('01_Wejście', INPUT_CELLS[key])] = value
+        elif key in CONSTANT_CELLS:
+            cells[('00_Stałe', CONSTANT_CELLS[key])] = value
+        elif '!' in key:
+            sheet, coordinate = key.rsplit('!', 1)
+            cells[(sheet.strip("'"), coordinate.replace('$', '').upper())] = value
+        else:
+            raise ValueError(f'Nieznane pole danych klienta: {key}')
+    return cells
+
+
+def normalized_inputs(client):
+    """
+    Dane klienta w postaci kanonicznej (klucz OutputCache): posortowana
+    lista [arkusz, adres, wartość] z input_cells, liczby jako float, bez
+    stałych równych wartościom domyślnym 00_Stałe – skoroszyt i wyniki są
+    wtedy takie same jak bez tych pól.
+    """
+    defaults = {('00_Stałe', CONSTANT_CELLS[key]): value for key, value in DEFAULT_CONSTANTS.items()}
+    normalized = []
+    for (sheet, coordinate), value in input_cells(client).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value) + 0.0  # -0.0 i 0 to ta sama komórka
+            if defaults.get((sheet, coordinate)) == value:
+                continue
+        normalized.append([sheet, coordinate, value])
+    return sorted(normalized, key=lambda item: item[:2])
+
+
+# Wersja modelu (skrót źródeł), liczona raz na proces przez model_version.
+_MODEL_VERSION = None
+
+
+def model_version():
+    """
+    Skrót źródeł skryptu i modułów kalkulatora (silnik, formuły, xlsx) oraz
+    wersji openpyxl – każda zmiana modelu unieważnia wpisy OutputCache.
+    """
+    global _MODEL_VERSION
+    if _MODEL_VERSION is None:
+        import hashlib
+        import openpyxl
+        
+        digest = hashlib.sha256(openpyxl.__version__.encode('ascii'))
+        for module in ('__main__', 'kalkulator_silnik', 'kalkulator_formuly', 'kalkulator_xlsx'):
+            path = os.path.abspath(__file__) if module == '__main__' else sys.modules[module].__file__
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _MODEL_VERSION = digest.hexdigest()
+    return _MODEL_VERSION
+
+
+def output_key(kind, client, options=None):
+    """Klucz OutputCache wyniku kind ('workbook', 'kpi') dla klienta przy opcjach options."""
+    from kalkulator_pamiec import OutputCache
     
-    print("  -> Tworzenie arkusza 20_Amortyzacja_direct_vs_3a...")
-    create_amort_direct_vs_3a_sheet(wb)
+    return OutputCache.key(kind, normalized_inputs(client), model_version(), options)
+
+
+def open_output_cache(args):
+    """OutputCache z opcji --output-cache / --output-cache-size albo None."""
+    if not args.output_cache:
+        return None
+    from kalkulator_pamiec import OutputCache
     
-    wb.active = wb['01_Wejście']
+    return OutputCache(args.output_cache, max_bytes=int(args.output_cache_size * 2**20))
+
+
+def build_workbook(inputs=None, streaming=False, years=30, months=None, report=None, cache=None):
+    """
+    Buduje cały skoroszyt (arkusze z SHEET_BUILDERS).
+
+    years – horyzont analizy: liczba wierszy harmonogramu rocznego 05
+    i wszystkich tabel rocznych (07–10, 12, 16, 19, 20) wraz z zakresami
+    INDEX/SUM w podsumowaniach; months – długość harmonogramu miesięcznego
+    06 (domyślnie 12 * years).
+
+    inputs – dane klienta (jak w input_cells) wpisywane do arkuszy zaraz po
+    ich utworzeniu, więc działa to także w trybie strumieniowym.
+    report – opcjonalny BuildReport, do którego trafiają pomiary arkuszy.
+    cache – opcjonalny SheetCache: arkusze z pamięci są pustymi zaślepkami,
+    a skoroszyt trzeba zapisać przez save_workbook(..., cache=cache).
+    """
+    report = report or BuildReport()
+    cells = input_cells(inputs or {})
+    wb = new_workbook(streaming)
+    
+    for name, builder in SHEET_BUILDERS:
+        sheet_cells = {coordinate: value for (sheet, coordinate), value in cells.items() if sheet == name}
+        for coordinate in sheet_cells:
+            del cells[(name, coordinate)]
+        with report.step(name) as entry:
+            options = builder_options(builder, years, months)
+            fragment = cache.lookup(name, builder, sheet_cells, streaming, options) if cache else None
+            if fragment is not None:
+                wb.create_sheet(name)
+                entry['cells'], entry['formulas'] = fragment['cells'], fragment['formulas']
+                continue
+            
+            builder(wb, **options)
+            
+            for coordinate, value in sheet_cells.items():
+                wb[name][coordinate] = value
+            entry['cells'], entry['formulas'] = sheet_counts(wb[name])
+            if cache:
+                cache.built(name, entry['cells'], entry['formulas'])
+    
+    if cells:
+        unknown = ', '.join(f'{sheet}!{coordinate}' for sheet, coordinate in cells)
+        raise ValueError(f'Nieznane arkusze w danych klienta: {unknown}')
+    
+    wb.active = wb.sheetnames.index('01_Wejście')
+    return wb
+
+
+def save_workbook(wb, filename, cached_values=False, check=False, cache=None):
+    """
+    Zapisuje skoroszyt; opcjonalnie z obliczonymi wartościami obok każdej formuły.
+
+    check=True sprawdza przed zapisem pliku, czy formuły nie odwołują się do
+    nieistniejących arkuszy lub komórek poza arkuszem (DanglingReferenceError).
+    cache – SheetCache użyty w build_workbook (wklejenie arkuszy z pamięci).
+    """
+    if not cached_values and not check and cache is None:
+        wb.save(filename)
+        return
+    
+    if cached_values:
+        # Wartości są już policzone – nie wymuszamy przeliczenia przy otwarciu
+        wb.calculation.fullCalcOnLoad = False
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    data = buffer.getvalue()
+    if cache is not None:
+        data = cache.apply(data)
+    if cached_values:
+        data = add_cached_values(data, check=check)
+    elif check:
+        check_references(data)
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+def build_client_workbook(job):
+    """
+    Zadanie procesu roboczego trybu wsadowego: buduje i zapisuje skoroszyt
+    jednego klienta. Błędy nie przerywają przebiegu – wracają w wyniku.
+    """
+    client_id, client, filename, options = job
+    start = time.perf_counter()
+    report = BuildReport(trace_memory=options['trace_memory'])
+    cache = SheetCache(options['cache']) if options['cache'] else None
+    try:
+        wb = build_workbook(inputs=client, streaming=options['streaming'], years=options['years'],
+                            months=options['months'], report=report, cache=cache)
+        with report.step('zapis') as entry:
+            save_workbook(wb, filename, cached_values=options['cached_values'],
+                          check=options['check'] and options['cached_values'], cache=cache)
+        entry['cells'], entry['formulas'] = report.totals()['cells'], report.totals()['formulas']
+    except Exception as exc:
+        return {'id': client_id, 'file': filename, 'error': f'{type(exc).__name__}: {exc}'}
+    finally:
+        report.close()
+    return {
+        'id': client_id,
+        'file': filename,
+        'seconds': time.perf_counter() - start,
+        'cell_styles': len(wb._cell_styles),
+        'steps': report.steps,
+    }
+
+
+# Szablon pakietu w procesie roboczym (tryb --template), ustawiany przez _init_template.
+_TEMPLATE = None
+
+
+def _init_template(data):
+    global _TEMPLATE
+    _TEMPLATE = WorkbookTemplate(data)
+
+
+def render_client_workbook(job):
+    """
+    Zadanie trybu --template: wpisuje dane klienta do gotowego pakietu
+    (tylko XML arkuszy z danymi klienta) i zapisuje plik.
+    """
+    client_id, client, filename, options = job
+    start = time.perf_counter()
+    try:
+        data = _TEMPLATE.render(input_cells(client), cached_values=options['cached_values'])
+        with open(filename, 'wb') as f:
+            f.write(data)
+    except Exception as exc:
+        return {'id': client_id, 'file': filename, 'error': f'{type(exc).__name__}: {exc}'}
+    return {'id': client_id, 'file': filename, 'seconds': time.perf_counter() - start}
+
+
+def aggregate_steps(step_lists):
+    """Sumuje pomiary tych samych kroków z wielu skoroszytów (pamięć: maksimum)."""
+    totals = {}
+    for steps in step_lists:
+        for entry in steps:
+            total = totals.setdefault(entry['step'], dict(entry, wall_seconds=0.0, cpu_seconds=0.0, peak_bytes=None,
+                                                                cells=0, formulas=0, styles_applied=0))
+            for key in ('wall_seconds', 'cpu_seconds', 'cells', 'formulas', 'styles_applied'):
+                total[key] += entry[key]
+            if entry['peak_bytes'] is not None:
+                total['peak_bytes'] = max(total['peak_bytes'] or 0, entry['peak_bytes'])
+    return list(totals.values())
+
+
+def write_report(filename, report):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def client_filename(output_dir, client_id, taken=None):
+    """
+    Ścieżka pliku klienta; identyfikator oczyszczony ze znaków niedozwolonych w nazwach plików.
+
+    taken – zbiór nazw plików już przydzielonych w tym przebiegu (małymi
+    literami): powtórzony identyfikator albo taki, który po oczyszczeniu
+    daje tę samą nazwę ('a b' i 'a_b'), dostaje przyrostek _2, _3, …
+    """
+    safe_id = base_id = re.sub(r'[^\w.-]+', '_', str(client_id)).strip('._') or 'klient'
+    if taken is not None:
+        suffix = 2
+        while f'kalkulator_{safe_id}.xlsx'.lower() in taken:
+            safe_id, suffix = f'{base_id}_{suffix}', suffix + 1
+        taken.add(f'kalkulator_{safe_id}.xlsx'.lower())
+    return os.path.join(output_dir, f'kalkulator_{safe_id}.xlsx')
+
+
+def client_id_from_filename(path):
+    """Identyfikator klienta z nazwy pliku – odwrotność client_filename (bez prefiksu 'kalkulator_')."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    prefix = 'kalkulator_'
+    return stem[len(prefix):] if stem.startswith(prefix) and len(stem) > len(prefix) else stem
+
+
+def run_batch(args):
+    """Tryb wsadowy: jeden skoroszyt na klienta, równolegle na wszystkich rdzeniach. Zwraca liczbę błędów."""
+    from concurrent.futures import ProcessPoolExecutor
+    
+    clients = read_clients(args.batch)
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {'streaming': args.streaming, 'years': args.years, 'months': args.months,
+               'cached_values': args.cached_values, 'trace_memory': args.trace_memory, 'check': args.check,
+               'cache': args.cache}
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Tryb wsadowy: {len(clients)} klientów z '{args.batch}', procesy: {workers}")
+    
+    start = time.perf_counter()
+    jobs, results, pending, taken = [], [], {}, set()
+    for idx, client in enumerate(clients, start=1):
+        client_id = client.get('id', f'{idx:04d}')
+        filename = client_filename(args.output_dir, client_id, taken)
+        try:
+            # Pola liczbowe jak w silniku – tekst w polu liczbowym dałby skoroszyt pełen #VALUE!
+            inputs, _, _ = split_clients([client])
+            client_arrays(inputs)
+        except ValueError as exc:
+            results.append({'id': client_id, 'file': filename, 'error': f'{type(exc).__name__}: {exc}'})
+            print(f"  ❌ {client_id}: {results[-1]['error']}")
+            continue
+        jobs.append((client_id, client, filename, options))
+    
+    output_cache = open_output_cache(args)
+    if output_cache is not None:
+        jobs, pending = lookup_output_cache(output_cache, jobs, options, args.template, results)
+    
+    worker, chunksize, pool_options = build_client_workbook, 1, {}
+    if args.template and jobs:
+        # Skoroszyt budowany raz; klienci to tylko podmiana komórek w gotowym pakiecie
+        buffer = io.BytesIO()
+        cache = SheetCache(args.cache) if args.cache else None
+        build_workbook(streaming=args.streaming, years=args.years, months=args.months, cache=cache).save(buffer)
+        data = cache.apply(buffer.getvalue()) if cache else buffer.getvalue()
+        if args.check:
+            check_references(data)
+        worker, chunksize = render_client_workbook, max(1, len(jobs) // (workers * 4))
+        pool_options = {'initializer': _init_template, 'initargs': (data,)}
+    
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as pool:
+        for job, result in zip(jobs, pool.map(worker, jobs, chunksize=chunksize)):
+            results.append(result)
+            if 'error' in result:
+                print(f"  ❌ {result['id']}: {result['error']}")
+            else:
+                print(f"  -> {result['file']} ({result['seconds']:.2f} s)")
+            if id(job) in pending:
+                store_output_cache(output_cache, *pending.pop(id(job)), result, results)
+    elapsed = time.perf_counter() - start
+    
+    failures = [r for r in results if 'error' in r]
+    done = len(results) - len(failures)
+    print(f"\n✅ Utworzono {done} z {len(results)} skoroszytów w {elapsed:.2f} s "
+          f"({done / elapsed if elapsed else 0:.2f} skoroszytów/s)")
+    styles = [r['cell_styles'] for r in results if 'cell_styles' in r]
+    if styles:
+        print(f"   Style komórek na skoroszyt: {min(styles)}–{max(styles)}")
+    if output_cache is not None:
+        stats = output_cache.stats()
+        print(f"   Pamięć wyników: {stats['hits']} trafień, {stats['misses']} chybień, "
+              f"{stats['evictions']} usuniętych, {stats['entries']} plików ({stats['bytes'] / 2**20:.1f} MB)")
+    if failures:
+        print(f"⚠️  Błędy: {len(failures)}")
+        for failure in failures:
+            print(f"   {failure['id']}: {failure['error']}")
+    
+    per_step = aggregate_steps(r['steps'] for r in results if 'steps' in r)
+    if args.table and per_step:
+        print("\nKoszt kroków (suma dla wszystkich klientów):")
+        print(BuildReport.table(per_step))
+    if args.report:
+        write_report(args.report, {
+            'mode': 'template' if args.template else 'full',
+            'seconds': elapsed,
+            'workbooks_per_second': done / elapsed if elapsed else 0,
+            'per_step': per_step,
+            'output_cache': output_cache.stats() if output_cache is not None else None,
+            'clients': results,
+        })
+    return len(failures)
+
+
+def lookup_output_cache(output_cache, jobs, options, template, results):
+    """
+    Skoroszyty klientów z pamięci wyników (--output-cache) trybu wsadowego:
+    trafienia zapisywane są od razu (wynik z 'cached': True w results),
+    a z klientów o identycznych danych budowany jest tylko pierwszy.
+    Zwraca (zadania do zbudowania, {id(zadanie): (klucz, zadania-duplikaty)}).
+    """
+    key_options = {'template': template, 'cached_values': options['cached_values'], 'years': options['years'],
+                   'months': options['months'], 'streaming': options['streaming']}
+    remaining, pending, first = [], {}, {}
+    for job in jobs:
+        client_id, client, filename, _ = job
+        try:
+            key = output_key('workbook', client, key_options)
+        except ValueError:
+            remaining.append(job)  # błędne pole zgłosi proces roboczy
+            continue
+        if key in first:
+            pending[id(first[key])][1].append(job)
+            continue
+        job_start = time.perf_counter()
+        data = output_cache.get(key)
+        if data is None:
+            first[key] = job
+            pending[id(job)] = (key, [])
+            remaining.append(job)
+            continue
+        with open(filename, 'wb') as f:
+            f.write(data)
+        results.append({'id': client_id, 'file': filename, 'seconds': time.perf_counter() - job_start,
+                        'cached': True})
+        print(f"  -> {filename} (z pamięci wyników)")
+    return remaining, pending
+
+
+def store_output_cache(output_cache, key, duplicates, result, results):
+    """Zapamiętuje zbudowany skoroszyt i kopiuje go klientom o identycznych danych (lookup_output_cache)."""
+    data = None
+    if 'error' not in result:
+        with open(result['file'], 'rb') as f:
+            data = f.read()
+        output_cache.put(key, data, '.xlsx')
+    for client_id, _, filename, _ in duplicates:
+        if data is None:
+            results.append({'id': client_id, 'file': filename, 'error': result['error']})
+            print(f"  ❌ {client_id}: {result['error']}")
+            continue
+        with open(filename, 'wb') as f:
+            f.write(data)
+        results.append({'id': client_id, 'file': filename, 'seconds': 0.0, 'cached': True})
+        print(f"  -> {filename} (jak {result['id']})")
+
+
+def run_monte_carlo(args):
+    """
+    Symulacja Monte Carlo stóp (simulate_rates) dla każdego klienta z pliku:
+    rozkład miesięcznego kosztu i Tragbarkeit w kolejnych latach oraz
+    prawdopodobieństwo przekroczenia limitu z 00_Stałe. Zwraca liczbę błędów.
+    """
+    clients = read_clients(args.monte_carlo)
+    print(f"Monte Carlo stóp: {len(clients)} klientów z '{args.monte_carlo}', "
+          f"{args.paths} ścieżek, zmienność {args.rate_volatility:.2%} rocznie")
+    results, failures = [], 0
+    for idx, client in enumerate(clients, start=1):
+        client_id = client.get('id', f'{idx:04d}')
+        constants = {key: client[key] for key in CONSTANT_CELLS if key in client}
+        start = time.perf_counter()
+        try:
+            result = simulate_rates(client, paths=args.paths, years=args.years, volatility=args.rate_volatility,
+                                    seed=args.seed, constants=constants)
+        except Exception as exc:  # jeden błędny wiersz nie przerywa całej symulacji
+            failures += 1
+            print(f"\n  ❌ {client_id}: {type(exc).__name__}: {exc}")
+            continue
+        elapsed = time.perf_counter() - start
+        
+        print(f"\nKlient {client_id} ({elapsed:.2f} s): P(Tragbarkeit ≥ {result['limit']:.0%} "
+              f"choć w jednym roku) = {result['breach_any']:.1%}")
+        print(f"  {'Rok':>4} {'Koszt mies. P5':>15} {'P50':>10} {'P95':>10} "
+              f"{'Tragb. P50':>11} {'P95':>8} {'P(>limit)':>10}")
+        for i, year in enumerate(result['year']):
+            print(f"  {year:4d} {result['monthly_cost'][5][i]:15,.0f} {result['monthly_cost'][50][i]:10,.0f} "
+                  f"{result['monthly_cost'][95][i]:10,.0f} {result['tragbarkeit'][50][i]:11.1%} "
+                  f"{result['tragbarkeit'][95][i]:8.1%} {result['breach_probability'][i]:10.1%}")
+        results.append({
+            'id': client_id,
+            'seconds': elapsed,
+            'breach_any': float(result['breach_any']),
+            'years': [
+                {'year': int(year),
+                 'monthly_cost': {str(q): float(v[i]) for q, v in result['monthly_cost'].items()},
+                 'monthly_cost_mean': float(result['monthly_cost_mean'][i]),
+                 'tragbarkeit': {str(q): float(v[i]) for q, v in result['tragbarkeit'].items()},
+                 'tragbarkeit_mean': float(result['tragbarkeit_mean'][i]),
+                 'breach_probability': float(result['breach_probability'][i])}
+                for i, year in enumerate(result['year'])
+            ],
+        })
+    
+    if args.report:
+        write_report(args.report, {
+            'mode': 'monte_carlo',
+            'paths': args.paths,
+            'rate_volatility': args.rate_volatility,
+            'seed': args.seed,
+            'clients': results,
+        })
+    return failures
+
+
+def run_backtest(args):
+    """
+    Backtest historycznych stóp (backtest) dla każdego klienta z pliku: każdy
+    miesiąc historii z pliku --rates jest startem kredytu z oknem --months
+    miesięcy. Wypisuje najlepszy, medianowy i najgorszy start (łączne odsetki)
+    oraz szczytowy miesięczny cash-out. Zwraca liczbę błędów.
+    """
+    dates, rates = read_rate_history(args.rates)
+    clients = read_clients(args.backtest)
+    mode = 'zmiany stóp względem startu' if args.relative_rates else 'stopy historyczne'
+    print(f"Backtest: {len(clients)} klientów z '{args.backtest}', {len(dates)} miesięcy stóp z "
+          f"'{args.rates}' ({dates[0]} – {dates[-1]}), okno {args.months} miesięcy, {mode}")
+    results, failures = [], 0
+    for idx, client in enumerate(clients, start=1):
+        client_id = client.get('id', f'{idx:04d}')
+        constants = {key: client[key] for key in CONSTANT_CELLS if key in client}
+        try:
+            result = backtest(client, dates, rates, months=args.months, relative=args.relative_rates,
+                              constants=constants)
+        except Exception as exc:  # jeden błędny wiersz nie przerywa backtestu
+            failures += 1
+            print(f"\n  ❌ {client_id}: {type(exc).__name__}: {exc}")
+            continue
+        
+        print(f"\nKlient {client_id} ({len(result['start'])} startów):")
+        print(f"  {'':9s} {'Start':>10} {'Odsetki łącznie':>16} {'Szczyt cash-out/mies.':>22}")
+        for name, label in (('best', 'najlepszy'), ('median', 'mediana'), ('worst', 'najgorszy')):
+            entry = result['summary'][name]
+            print(f"  {label:9s} {entry['start']:>10} {entry['total_interest']:16,.0f} {entry['peak_cash_out']:22,.0f}")
+        print(f"  Najwyższy cash-out we wszystkich startach: {result['peak_cash_out'].max():,.0f} CHF/mies.")
+        results.append({
+            'id': client_id,
+            'summary': {name: {key: value if key == 'start' else float(value) for key, value in entry.items()}
+                        for name, entry in result['summary'].items()},
+            'starts': [{'start': start, 'total_interest': float(total), 'peak_cash_out': float(peak)}
+                       for start, total, peak in zip(result['start'], result['total_interest'],
+                                                     result['peak_cash_out'])],
+        })
+    
+    if args.report:
+        write_report(args.report, {'mode': 'backtest', 'rates': args.rates, 'months': args.months,
+                                   'relative': args.relative_rates, 'clients': results})
+    return failures
+
+
+def read_plans(path):
+    """
+    Wczytuje warianty planu remontów z pliku JSON: lista planów albo
+    {'investment_share': 0.7, 'plans': [...]}; plan to
+    {'name': ..., 'renovations': [{'year', 'cost', 'raises_standard'}, ...]}
+    z opcjonalnym własnym 'investment_share'; plan bez 'renovations' to plan
+    bez remontów. Zwraca (plany, udział domyślny lub None); plan w innej
+    postaci to ValueError z nazwą planu.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    share = None
+    if isinstance(data, dict):
+        share = data.get('investment_share')
+        data = data.get('plans', [])
+    plans = []
+    for idx, plan in enumerate(data, start=1):
+        if isinstance(plan, list):
+            plan = {'renovations': plan}
+        if not isinstance(plan, dict):
+            raise ValueError(f"{path}: plan {idx} musi być obiektem albo listą remontów")
+        name = plan.get('name', f'plan {idx}')
+        renovations = plan.get('renovations', [])
+        if not isinstance(renovations, list) or not all(isinstance(item, dict) for item in renovations):
+            raise ValueError(f"{path}: plan '{name}': 'renovations' musi być listą remontów "
+                             f"{{'year', 'cost', 'raises_standard'}}")
+        plans.append(dict(plan, name=name, renovations=renovations))
+    if not plans:
+        raise ValueError(f"{path}: brak planów remontów")
+    return plans, share
+
+
+def evaluate_client_scenarios(job):
+    """
+    Kostka scenariusz × plan × rok (renovation_scenarios) dla jednego
+    klienta – funkcja procesu roboczego --scenarios. job = (id, klient, plany,
+    udział domyślny, lata); błędy zwracane są w wyniku.
+    """
+    client_id, client, plans, share, years = job
+    try:
+        cells = input_cells(client)
+        names = list(APPRECIATION_CELLS)
+        growth = [cells.get(('08_Symulacja_wzrostu_wartości', APPRECIATION_CELLS[name])) or 0.0 for name in names]
+        default_share = share if share is not None else cells.get(('16_Renowacje', 'B8'), 0.7)
+        shares = [plan.get('investment_share', default_share) for plan in plans]
+        sale_years = cells.get(('12_Analiza_sprzedazy_X_lat', SALE_CELLS['sale_years'])) or years
+        cube = renovation_scenarios(client, growth, [plan['renovations'] for plan in plans], years=years,
+                                    investment_share=shares)
+    except Exception as exc:
+        return {'id': client_id, 'error': f'{type(exc).__name__}: {exc}'}
+    return {
+        'id': client_id,
+        'scenarios': names,
+        'growth': growth,
+        'plans': [plan['name'] for plan in plans],
+        'sale_year': min(int(sale_years), years),
+        'scenario_value': cube['scenario_value'].tolist(),
+        'value': cube['value'].tolist(),
+        'cost': cube['cost'].tolist(),
+        'net_effect': cube['net_effect'].tolist(),
+    }
+
+
+def run_scenarios(args):
+    """
+    Wszystkie scenariusze wzrostu wartości (08) × warianty planu remontów
+    (plik --plans) × lata dla klientów z pliku, równolegle na wszystkich
+    rdzeniach (jeden klient = jedno zadanie). Wypisuje wyniki w roku sprzedaży
+    ('12_Analiza_sprzedazy_X_lat!B7' klienta, domyślnie ostatni rok), pełne
+    kostki trafiają do --report. Zwraca liczbę błędów.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    plans, share = read_plans(args.plans)
+    clients = read_clients(args.scenarios)
+    years = args.years
+    jobs = [(client.get('id', f'{idx:04d}'), client, plans, share, years)
+            for idx, client in enumerate(clients, start=1)]
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Scenariusze: {len(jobs)} klientów z '{args.scenarios}', {len(plans)} planów remontów "
+          f"z '{args.plans}', procesy: {workers}")
+    
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(evaluate_client_scenarios, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    elapsed = time.perf_counter() - start
+    
+    failures = 0
+    for result in results:
+        if 'error' in result:
+            failures += 1
+            print(f"\n  ❌ {result['id']}: {result['error']}")
+            continue
+        year = result['sale_year']
+        print(f"\nKlient {result['id']} – rok sprzedaży {year}:")
+        print(f"  {'Scenariusz':12s} {'Plan':20s} {'Wartość [CHF]':>16} {'Koszt remontów':>16} {'Efekt netto':>14}")
+        for s_idx, scenario in enumerate(result['scenarios']):
+            for p_idx, plan in enumerate(result['plans']):
+                print(f"  {scenario:12s} {plan[:20]:20s} {result['value'][s_idx][p_idx][year]:16,.0f} "
+                      f"{result['cost'][s_idx][p_idx][year]:16,.0f} {result['net_effect'][s_idx][p_idx][year]:14,.0f}")
+    print(f"\n✅ {len(results) - failures} z {len(results)} klientów w {elapsed:.2f} s")
+    
+    if args.report:
+        write_report(args.report, {'mode': 'scenarios', 'plans': plans, 'years': years, 'seconds': elapsed,
+                                   'clients': results})
+    return failures
+
+
+def run_export(args):
+    """
+    Eksport kolumnowy (kalkulator_arrow): harmonogramy, ROI, scenariusze
+    wzrostu wartości i porównania ETF/3a klientów z pliku jako tabele
+    Parquet/Arrow w --output-dir, porcjami po --chunk-size klientów.
+    Błędni klienci są pomijani. Zwraca liczbę błędów.
+    """
+    from kalkulator_arrow import export_tables
+    
+    clients = read_clients(args.export)
+    print(f"Eksport: {len(clients)} klientów z '{args.export}' -> '{args.output_dir}' ({args.format}, "
+          f"porcje po {args.chunk_size})")
+    failures = []
+    
+    def on_error(client_id, exc):
+        failures.append({'id': client_id, 'error': f'{type(exc).__name__}: {exc}'})
+        print(f"  ❌ {client_id}: {type(exc).__name__}: {exc}")
+    
+    start = time.perf_counter()
+    written = export_tables(clients, args.output_dir, fmt=args.format, chunk_size=args.chunk_size,
+                            years=args.years, months=args.months, on_error=on_error)
+    elapsed = time.perf_counter() - start
+    for name, (path, rows) in written.items():
+        print(f"  {name:18s} {rows:>12,} wierszy  {path}")
+    print(f"✅ {len(clients) - len(failures)} z {len(clients)} klientów w {elapsed:.2f} s")
+    
+    if args.report:
+        write_report(args.report, {'mode': 'export', 'format': args.format, 'seconds': elapsed,
+                                   'tables': {name: {'path': path, 'rows': rows}
+                                              for name, (path, rows) in written.items()},
+                                   'failures': failures})
+    return len(failures)
+
+
+# Kolor tła pól do wypełnienia przez użytkownika (niebieskie komórki arkuszy).
+INPUT_COLOR = 'CCE5FF'
+
+
+def harvest_fields(streaming=False):
+    """
+    Pola wejściowe skoroszytu: [(nazwa pola, arkusz, adres)] – stałe 00_Stałe
+    (klucze CONSTANT_CELLS), niebieskie pola 01_Wejście (klucze INPUT_CELLS)
+    i niebieskie pola pozostałych arkuszy ('Arkusz!B4'), jak w pliku klientów.
+    Niebieskie pola odczytywane są z właśnie zbudowanego skoroszytu.
+    """
+    buffer = io.BytesIO()
+    build_workbook(streaming=streaming).save(buffer)
+    input_names = {cell: key for key, cell in INPUT_CELLS.items()}
+    fields = [(key, '00_Stałe', cell) for key, cell in CONSTANT_CELLS.items()]
+    for sheet, coordinate in filled_cells(buffer.getvalue(), INPUT_COLOR):
+        if sheet == '01_Wejście' and coordinate in input_names:
+            fields.append((input_names[coordinate], sheet, coordinate))
+        elif sheet != '00_Stałe':
+            fields.append((f'{sheet}!{coordinate}', sheet, coordinate))
+    return fields
+
+
+def harvest_workbook(job):
+    """
+    Zadanie procesu roboczego --harvest: wartości pól wejściowych jednego
+    pliku (read_cells – strumieniowo, tylko potrzebne arkusze). Błędy
+    wracają w wyniku.
+    """
+    path, fields = job
+    try:
+        values = read_cells(path, [(sheet, coordinate) for _, sheet, coordinate in fields])
+    except Exception as exc:
+        return {'file': path, 'error': f'{type(exc).__name__}: {exc}'}
+    return {'file': path, 'values': {name: values[(sheet, coordinate)] for name, sheet, coordinate in fields}}
+
+
+def harvest_paths(sources):
+    """Pliki .xlsx z listy plików i katalogów (katalogi bez podkatalogów, kolejność alfabetyczna)."""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(os.path.join(source, name) for name in os.listdir(source)
+                                if name.lower().endswith('.xlsx') and not name.startswith('~$')))
+        else:
+            paths.append(source)
+    return paths
+
+
+def run_harvest(args):
+    """
+    Zbiera pola wejściowe (harvest_fields) z wypełnionych przez klientów
+    skoroszytów – równolegle, po jednym pliku na zadanie – i zapisuje je
+    jako jedną tabelę --dataset (CSV/JSON w formacie --batch; id = nazwa
+    pliku bez prefiksu 'kalkulator_' z trybu --batch, więc ponowne --batch
+    daje te same nazwy plików). Zwraca liczbę błędów.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    paths = harvest_paths(args.harvest)
+    fields = harvest_fields()
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Zbieranie danych: {len(paths)} skoroszytów, {len(fields)} pól wejściowych, procesy: {workers}")
+    
+    start = time.perf_counter()
+    jobs = [(path, fields) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(harvest_workbook, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    elapsed = time.perf_counter() - start
+    
+    clients, failures, ids = [], [], set()
+    for result in results:
+        if 'error' in result:
+            failures.append(result)
+            print(f"  ❌ {result['file']}: {result['error']}")
+            continue
+        client_id = base_id = client_id_from_filename(result['file'])
+        suffix = 2
+        while client_id in ids:
+            client_id, suffix = f'{base_id}_{suffix}', suffix + 1
+        ids.add(client_id)
+        clients.append(dict(result['values'], id=client_id))
+    write_clients(args.dataset, clients, ['id'] + [name for name, _, _ in fields])
+    print(f"✅ {len(clients)} z {len(results)} skoroszytów -> '{args.dataset}' w {elapsed:.2f} s")
+    
+    if args.report:
+        write_report(args.report, {'mode': 'harvest', 'dataset': args.dataset, 'seconds': elapsed,
+                                   'files': len(results), 'fields': [name for name, _, _ in fields],
+                                   'failures': failures})
+    return len(failures)
+
+
+def run_store(args):
+    """
+    Zapisuje harmonogramy miesięczne (--months) klientów z pliku do magazynu
+    ScheduleStore w --store-dir i wypisuje zestawienie portfela z magazynu:
+    łączne salda H1/H2 na koniec lat i roczny cash-out. Zwraca liczbę błędów.
+    """
+    from kalkulator_magazyn import ScheduleStore
+    
+    clients = read_clients(args.store)
+    print(f"Magazyn harmonogramów: {len(clients)} klientów z '{args.store}' -> '{args.store_dir}', "
+          f"{args.months} miesięcy")
+    failures = []
+    
+    def on_error(client_id, exc):
+        failures.append({'id': client_id, 'error': f'{type(exc).__name__}: {exc}'})
+        print(f"  ❌ {client_id}: {type(exc).__name__}: {exc}")
+    
+    start = time.perf_counter()
+    store = ScheduleStore.create(args.store_dir, clients, months=args.months, chunk_size=args.chunk_size,
+                                 on_error=on_error)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(args.store_dir, name)) for name in os.listdir(args.store_dir))
+    print(f"✅ {len(store)} z {len(clients)} klientów w {elapsed:.2f} s ({size / 2 ** 20:.1f} MB)")
+    
+    summary = []
+    if len(store):
+        print(f"\n  {'Rok':>4} {'Saldo H1 [CHF]':>18} {'Saldo H2 [CHF]':>18} {'Cash-out [CHF]':>18}")
+        for year in sorted({1, 5, 10, 15, 20, 25, 30, args.months // 12} & set(range(1, args.months // 12 + 1))):
+            row = {'year': year, 'close_h1': float(store.year('close_h1', year).sum()),
+                   'close_h2': float(store.year('close_h2', year).sum()),
+                   'cash_out': float(store.year('cash_out', year).sum())}
+            summary.append(row)
+            print(f"  {year:4d} {row['close_h1']:18,.0f} {row['close_h2']:18,.0f} {row['cash_out']:18,.0f}")
+    
+    if args.report:
+        write_report(args.report, {'mode': 'store', 'directory': args.store_dir, 'months': args.months,
+                                   'clients': len(store), 'bytes': size, 'seconds': elapsed,
+                                   'summary': summary, 'failures': failures})
+    return len(failures)
+
+
+def client_kpis(client):
+    """
+    Główne wyniki silnika dla jednego klienta (jak w input_cells): finansowanie
+    (02), Tragbarkeit (03), miesięczny cash-out (04) i środki po sprzedaży
+    (12, parametry z pól '12_Analiza_sprzedazy_X_lat!B7..B9' – sale_parameters,
+    puste pole = 0 jak w arkuszu). Brak wyniku (#DIV/0! w arkuszu) to None.
+    """
+    inputs, constants, cells = split_clients([client])
+    f = financing(inputs, constants)
+    outputs = key_outputs(inputs, constants, **sale_parameters(cells[0]))
+    kpis = {key: float(f[key][0]) for key in ('price', 'equity', 'loan', 'h1', 'h2', 'amort_h2_yearly')}
+    kpis.update((key, float(value[0])) for key, value in outputs.items())
+    return {key: None if value != value else value for key, value in kpis.items()}
+
+
+def service_task(job):
+    """
+    Zadanie procesu roboczego usługi (--serve): ('kpi', klient, opcje) -> słownik
+    wyników, ('workbook', klient, opcje) -> bajty skoroszytu z szablonu
+    (_init_template). Wyjątki przechodzą do usługi jako odpowiedź 400.
+    """
+    kind, client, options = job
+    if kind == 'kpi':
+        return client_kpis(client)
+    return _TEMPLATE.render(input_cells(client), cached_values=options.get('cached_values', False))
+
+
+def _warm_worker(_):
+    """Pierwsze zadanie procesu roboczego – uruchamia proces przed pierwszym żądaniem."""
+    return os.getpid()
+
+
+class ResultCache:
+    """
+    Wyniki usługi w pamięci (klucze jak w OutputCache – output_key):
+    najdawniej używane usuwane po przekroczeniu max_entries.
+    """
+
+    def __init__(self, max_entries=256):
+        from collections import OrderedDict
+        
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def make_service_handler(pool, cache, output_cache=None, workbook_options=None):
+    """
+    Klasa obsługi żądań HTTP usługi nad pulą procesów pool, pamięcią wyników
+    cache (ResultCache) i opcjonalnie pamięcią na dysku output_cache
+    (OutputCache, wspólna z trybem --batch --template dla tych samych opcji
+    workbook_options).
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs, urlsplit
+    
+    lock = threading.Lock()
+    
+    class ServiceHandler(BaseHTTPRequestHandler):
+        server_version = 'KalkulatorCH/1.0'
+        
+        def address_string(self):
+            # Gniazdo uniksowe nie ma adresu klienta
+            return self.client_address[0] if self.client_address else 'unix'
+        
+        def _send(self, status, body, content_type='application/json; charset=utf-8', headers=None):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            if urlsplit(self.path).path != '/health':
+                self._send(404, {'error': f'Nieznana ścieżka: {self.path}'})
+                return
+            with lock:
+                stats = {'status': 'ok', 'cache': cache.stats()}
+                if output_cache is not None:
+                    stats['output_cache'] = output_cache.stats()
+            self._send(200, stats)
+        
+        def do_POST(self):
+            url = urlsplit(self.path)
+            kind = {'/kpi': 'kpi', '/workbook': 'workbook'}.get(url.path)
+            if kind is None:
+                self._send(404, {'error': f'Nieznana ścieżka: {url.path}'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                client = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(client, dict):
+                    raise ValueError('Dane klienta muszą być obiektem JSON')
+            except ValueError as exc:
+                self._send(400, {'error': f'Niepoprawny JSON: {exc}'})
+                return
+            query = parse_qs(url.query)
+            options = {'cached_values': query.get('cached_values', ['0'])[0] in ('1', 'true', 'tak')}
+            
+            try:
+                key = output_key(kind, client, dict(workbook_options or {}, **options) if kind == 'workbook' else None)
+            except ValueError as exc:
+                self._send(400, {'error': f'{type(exc).__name__}: {exc}'})
+                return
+            source = 'hit'
+            with lock:
+                result = cache.get(key)
+                if result is None and output_cache is not None:
+                    stored = output_cache.get(key)
+                    if stored is not None:
+                        result = json.loads(stored) if kind == 'kpi' else stored
+                        cache.put(key, result)
+                        source = 'stored'
+            if result is None:
+                source = 'miss'
+                try:
+                    result = pool.submit(service_task, (kind, client, options)).result()
+                except Exception as exc:
+                    self._send(400, {'error': f'{type(exc).__name__}: {exc}'})
+                    return
+                with lock:
+                    cache.put(key, result)
+                    if output_cache is not None:
+                        if kind == 'kpi':
+                            output_cache.put(key, json.dumps(result).encode('utf-8'), '.json')
+                        else:
+                            output_cache.put(key, result, '.xlsx')
+            
+            headers = {'X-Cache': source}
+            if kind == 'kpi':
+                self._send(200, result, headers=headers)
+            else:
+                headers['Content-Disposition'] = f'attachment; filename="{client_filename("", client.get("id", "klient"))}"'
+                self._send(200, result, XLSX_CONTENT_TYPE, headers)
+    
+    return ServiceHandler
+
+
+def run_server(args):
+    """
+    Lokalna usługa obliczeń (--serve HOST:PORT albo --socket ŚCIEŻKA), tylko
+    biblioteka standardowa. Szablon skoroszytu budowany jest raz; procesy
+    robocze startują od razu z gotowym szablonem (WorkbookTemplate), openpyxl
+    i NumPy, więc żądanie nie płaci za uruchomienie interpretera ani importy.
+    Identyczne żądania (po normalizacji danych – normalized_inputs) obsługuje
+    ResultCache bez udziału procesów roboczych, a z --output-cache także
+    wyniki zapisane na dysku w poprzednich uruchomieniach.
+    """
+    import socketserver
+    from concurrent.futures import ProcessPoolExecutor
+    from http.server import ThreadingHTTPServer
+    
+    # Najpierw adres: zajęty port nie czeka na budowanie szablonu i procesy robocze.
+    # Klasę obsługi żądań (zależną od puli) serwer dostaje dopiero przed serve_forever.
+    try:
+        if args.socket:
+            class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+                daemon_threads = True
+            
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            server, where = UnixHTTPServer(args.socket, None), f'unix:{args.socket}'
+        else:
+            host, _, port = args.serve.rpartition(':')
+            server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), None)
+            where = f'http://{server.server_address[0]}:{server.server_address[1]}'
+    except OSError as exc:
+        print(f"❌ Nie można uruchomić usługi na {args.socket or args.serve}: {exc.strerror or exc}")
+        return 1
+    
+    pool = None
+    try:
+        buffer = io.BytesIO()
+        cache = SheetCache(args.cache) if args.cache else None
+        build_workbook(streaming=args.streaming, years=args.years, months=args.months, cache=cache).save(buffer)
+        data = cache.apply(buffer.getvalue()) if cache else buffer.getvalue()
+        if args.check:
+            check_references(data)
+        
+        workers = args.workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_template, initargs=(data,))
+        list(pool.map(_warm_worker, range(workers)))
+        workbook_options = {'template': True, 'years': args.years, 'months': args.months, 'streaming': args.streaming}
+        server.RequestHandlerClass = make_service_handler(pool, ResultCache(args.result_cache),
+                                                          open_output_cache(args), workbook_options)
+        
+        print(f"Usługa kalkulatora: {where}, procesy: {workers} "
+              f"(POST /kpi, POST /workbook, GET /health; Ctrl+C kończy)")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if pool is not None:
+            pool.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+# Nazwy wyników sensitivity w tabelach tornado
+TORNADO_OUTPUTS = {
+    'tragbarkeit': ('Tragbarkeit (03_Tragbarkeit!B11)', '{:.2%}'),
+    'monthly_cash_out': ('Miesięczny cash-out [CHF] (04_Cashflow!B8)', '{:,.0f}'),
+    'net_sale_proceeds': ('Środki po sprzedaży [CHF] (12_Analiza_sprzedazy_X_lat!B30)', '{:,.0f}'),
+}
+
+
+def run_tornado(args):
+    """
+    Analiza wrażliwości (sensitivity) dla każdego klienta z pliku: ranking
+    parametrów 00_Stałe i pól 01_Wejście według wpływu na Tragbarkeit,
+    miesięczny cash-out i środki po sprzedaży. Parametry sprzedaży (lata,
+    wzrost wartości, koszty) pochodzą z pól '12_Analiza_sprzedazy_X_lat!B7..B9'
+    pliku klientów (sale_parameters – puste pole = 0, jak w arkuszu). Zwraca
+    liczbę błędów.
+    """
+    clients = read_clients(args.tornado)
+    print(f"Tornado: {len(clients)} klientów z '{args.tornado}', zmiana parametrów ±{args.bump:.0%}")
+    results, failures = [], 0
+    for idx, client in enumerate(clients, start=1):
+        client_id = client.get('id', f'{idx:04d}')
+        try:
+            cells = input_cells(client)
+            constants = {key: cells[('00_Stałe', cell)] for key, cell in CONSTANT_CELLS.items()
+                         if ('00_Stałe', cell) in cells}
+            inputs = {key: cells[('01_Wejście', cell)] for key, cell in INPUT_CELLS.items()
+                      if ('01_Wejście', cell) in cells}
+            sale = sale_parameters(cells)
+            tornado = sensitivity(inputs, bump=args.bump, constants=constants, **sale)
+        except Exception as exc:  # jeden błędny wiersz nie przerywa analizy
+            failures += 1
+            print(f"\n  ❌ {client_id}: {type(exc).__name__}: {exc}")
+            continue
+        
+        print(f"\nKlient {client_id}:")
+        for name, rows in tornado.items():
+            title, fmt = TORNADO_OUTPUTS[name]
+            if rows[0]['base'] != rows[0]['base']:
+                print(f"  {title}: brak wyniku (#DIV/0! – uzupełnij dochód/parametry)")
+                continue
+            print(f"  {title}, wartość bazowa {fmt.format(rows[0]['base'])}")
+            for row in rows:
+                if not row['swing'] > 0:
+                    continue
+                print(f"    {row['parameter']:18s} -{args.bump:.0%}: {fmt.format(row['low']):>14} "
+                      f" +{args.bump:.0%}: {fmt.format(row['high']):>14}  rozpiętość {fmt.format(row['swing'])}")
+        results.append({'id': client_id, 'sale': sale,
+                        'tornado': {name: [{key: float(value) if key != 'parameter' else value
+                                            for key, value in row.items()} for row in rows]
+                                    for name, rows in tornado.items()}})
+    
+    if args.report:
+        write_report(args.report, {'mode': 'tornado', 'bump': args.bump, 'clients': results})
+    return failures
+
+
+def parse_args(argv=None):
+    """Parsuje argumenty wiersza poleceń."""
+    parser = argparse.ArgumentParser(
+        description='Tworzy kalkulator opłacalności zakupu nieruchomości w Szwajcarii (.xlsx).')
+    parser.add_argument('-o', '--output', default='kalkulator_nieruchomosc_CH.xlsx',
+                        help='nazwa pliku wynikowego (domyślnie: %(default)s)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='buduj skoroszyt w trybie write-only (wiersze zapisywane na bieżąco, '
+                             'stałe zużycie pamięci przy długich harmonogramach)')
+    parser.add_argument('--years', type=int, default=30,
+                        help='horyzont analizy w latach: długość harmonogramu rocznego 05 i tabel rocznych '
+                             '(07–10, 12, 16, 19, 20), także w --monte-carlo, --scenarios i --export '
+                             '(domyślnie: %(default)s)')
+    parser.add_argument('--months', type=int, default=None,
+                        help='liczba miesięcy harmonogramu w arkuszu 06 (domyślnie: 12 * --years)')
+    parser.add_argument('--cached-values', action='store_true',
+                        help='policz model w Pythonie i zapisz wartości obok formuł '
+                             '(plik otwiera się bez przeliczania, czytelny dla pandas/openpyxl)')
+    parser.add_argument('--no-check', dest='check', action='store_false',
+                        help='nie sprawdzaj odwołań formuł do nieistniejących arkuszy i komórek poza arkuszem')
+    parser.add_argument('--report', metavar='PLIK',
+                        help='zapisz pomiary budowania (czas, CPU, pamięć, komórki, formuły, style '
+                             'dla każdego arkusza i zapisu) do pliku JSON')
+    parser.add_argument('--table', action='store_true',
+                        help='wypisz pomiary budowania jako tabelę')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='mierz szczyt pamięci kroków (tracemalloc; spowalnia budowanie)')
+    parser.add_argument('--batch', metavar='PLIK',
+                        help='tryb wsadowy: CSV/JSON z danymi klientów (pola jak w INPUT_CELLS, '
+                             'CONSTANT_CELLS lub "Arkusz!B4"; kolumna id nazywa plik)')
+    parser.add_argument('--template', action='store_true',
+                        help='tryb wsadowy: zbuduj skoroszyt raz i dla każdego klienta podmieniaj '
+                             'tylko komórki danych w gotowym pakiecie (milisekundy na klienta)')
+    parser.add_argument('--cache', metavar='KATALOG',
+                        help='pamięć podręczna XML arkuszy: przebudowuj tylko arkusze, których funkcja, '
+                             'dane lub wersja openpyxl się zmieniły')
+    parser.add_argument('--output-dir', default='.',
+                        help='katalog plików w trybie wsadowym (domyślnie: bieżący)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='liczba procesów w trybie wsadowym (domyślnie: liczba rdzeni)')
+    parser.add_argument('--monte-carlo', metavar='PLIK',
+                        help='symulacja Monte Carlo stóp dla klientów z pliku CSV/JSON (jak --batch): '
+                             'rozkład kosztu miesięcznego i Tragbarkeit w kolejnych latach')
+    parser.add_argument('--paths', type=int, default=20_000,
+                        help='liczba ścieżek stóp w --monte-carlo (domyślnie: %(default)s)')
+    parser.add_argument('--rate-volatility', type=float, default=0.01,
+                        help='roczna zmienność przesunięcia stóp w --monte-carlo (domyślnie: %(default)s)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='ziarno generatora losowego w --monte-carlo (powtarzalne wyniki)')
+    parser.add_argument('--tornado', metavar='PLIK',
+                        help='analiza wrażliwości (tornado) dla klientów z pliku CSV/JSON (jak --batch)')
+    parser.add_argument('--bump', type=float, default=0.1,
+                        help='względna zmiana parametrów w --tornado (domyślnie: %(default)s = ±10%%)')
+    parser.add_argument('--backtest', metavar='PLIK',
+                        help='backtest historycznych stóp dla klientów z pliku CSV/JSON (jak --batch); '
+                             'okno harmonogramu = --months')
+    parser.add_argument('--rates', metavar='CSV',
+                        help='historyczne miesięczne stopy dla --backtest (data + stopa albo rate_h1, rate_h2)')
+    parser.add_argument('--relative-rates', action='store_true',
+                        help='w --backtest: stopa klienta + zmiana stopy historycznej od startu okna')
+    parser.add_argument('--scenarios', metavar='PLIK',
+                        help='scenariusze wzrostu wartości × plany remontów × lata dla klientów z pliku '
+                             'CSV/JSON (jak --batch), równolegle')
+    parser.add_argument('--plans', metavar='JSON',
+                        help='warianty planu remontów dla --scenarios')
+    parser.add_argument('--export', metavar='PLIK',
+                        help='eksport serii czasowych silnika dla klientów z pliku CSV/JSON (jak --batch) '
+                             'do plików kolumnowych w --output-dir')
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet',
+                        help='format plików --export (domyślnie: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='liczba klientów w jednej porcji --export i --store (domyślnie: %(default)s)')
+    parser.add_argument('--store', metavar='PLIK',
+                        help='harmonogramy miesięczne klientów z pliku CSV/JSON (jak --batch) w magazynie '
+                             'na dysku (np.memmap) z indeksem klientów')
+    parser.add_argument('--store-dir', default='harmonogramy',
+                        help='katalog magazynu --store (domyślnie: %(default)s)')
+    parser.add_argument('--harvest', metavar='PLIK', nargs='+',
+                        help='zbierz pola wejściowe z wypełnionych skoroszytów (pliki .xlsx lub katalogi) '
+                             'do jednej tabeli --dataset')
+    parser.add_argument('--dataset', default='klienci.csv',
+                        help='tabela wynikowa --harvest, CSV lub JSON (domyślnie: %(default)s)')
+    parser.add_argument('--serve', metavar='HOST:PORT',
+                        help='uruchom lokalną usługę HTTP (POST /kpi, POST /workbook z danymi klienta w JSON)')
+    parser.add_argument('--socket', metavar='ŚCIEŻKA',
+                        help='usługa na gnieździe uniksowym zamiast portu TCP')
+    parser.add_argument('--output-cache', metavar='KATALOG',
+                        help='pamięć wyników adresowana treścią: skoroszyty (--batch) i wyniki usługi '
+                             '(--serve) pod skrótem znormalizowanych danych klienta i wersji modelu')
+    parser.add_argument('--output-cache-size', type=float, default=512,
+                        help='limit rozmiaru --output-cache w MB; najdawniej używane pliki są usuwane '
+                             '(domyślnie: %(default)s)')
+    parser.add_argument('--result-cache', type=int, default=256,
+                        help='liczba wyników usługi trzymanych w pamięci (domyślnie: %(default)s, 0 = bez)')
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error('--chunk-size musi być liczbą dodatnią')
+    if args.scenarios and not args.plans:
+        parser.error('--scenarios wymaga pliku planów --plans')
+    if args.backtest and not args.rates:
+        parser.error('--backtest wymaga pliku stóp --rates')
+    if args.years < 1:
+        parser.error('--years musi być liczbą dodatnią')
+    if args.months is None:
+        args.months = 12 * args.years
+    if args.months < 1:
+        parser.error('--months musi być liczbą dodatnią')
+    if args.paths < 1:
+        parser.error('--paths musi być liczbą dodatnią')
+    return args
+
+
+def main(argv=None):
+    """Główna funkcja tworząca cały skoroszyt z 21 arkuszami."""
+    args = parse_args(argv)
+    if args.batch:
+        return 1 if run_batch(args) else 0
+    if args.monte_carlo:
+        return 1 if run_monte_carlo(args) else 0
+    if args.tornado:
+        return 1 if run_tornado(args) else 0
+    if args.backtest:
+        return 1 if run_backtest(args) else 0
+    if args.scenarios:
+        return 1 if run_scenarios(args) else 0
+    if args.export:
+        return 1 if run_export(args) else 0
+    if args.harvest:
+        return 1 if run_harvest(args) else 0
+    if args.store:
+        return 1 if run_store(args) else 0
+    if args.serve or args.socket:
+        return run_server(args)
     
-    filename = 'kalkulator_nieruchomosc_CH.xlsx'
-    wb.save(filename)
+    print("Tworzenie rozszerzonego kalkulatora nieruchomości w Szwajcarii...")
     
-    print(f"\n✅ Plik '{filename}' został utworzony pomyślnie!")
+    report = BuildReport(trace_memory=args.trace_memory)
+    cache = SheetCache(args.cache) if args.cache else None
+    wb = build_workbook(streaming=args.streaming, years=args.years, months=args.months, report=report, cache=cache)
+    
+    filename = args.output
+    with report.step('zapis') as entry:
+        save_workbook(wb, filename, cached_values=args.cached_values, check=args.check, cache=cache)
+    report.close()
+    
+    totals = report.totals()
+    entry['cells'], entry['formulas'] = totals['cells'], totals['formulas']
+    print(f"\n✅ Plik '{filename}' został utworzony pomyślnie! "
+          f"({len(wb.sheetnames)} arkuszy, {totals['cells']} komórek, {totals['formulas']} formuł, "
+          f"{totals['wall_seconds']:.2f} s)")
+    if args.table:
+        print()
+        print(BuildReport.table(report.steps, totals))
+    if args.report:
+        write_report(args.report, dict(report.to_dict(), file=filename))
+    if cache:
+        print(f"   Pamięć podręczna arkuszy: {len(cache.hits)} z {len(SHEET_BUILDERS)} arkuszy z '{args.cache}'")
+    stats = STYLES.stats(wb)
+    print(f"   Style: {stats['calls']} wywołań set_cell_style, {stats['hits']} z pamięci podręcznej, "
+          f"{stats['style_keys']} kombinacji, {stats['cell_styles']} stylów komórek w pliku")
     print("\nStruktura arkuszy:")
     print("  00_Stałe - Parametry ogólne")
     print("  01_Wejście - Dane wejściowe użytkownika")
     print("  02_Finansowanie - Analiza kredytu")
     print("  03_Tragbarkeit - Test zdolności kredytowej")
     print("  04_Cashflow - Rzeczywiste koszty miesięczne")
-    print("  05_Harmonogram_roczny - Harmonogram spłat rocznych (30 lat)")
-    print("  06_Harmonogram_miesieczny - Harmonogram spłat miesięcznych (360 miesięcy)")
+    print(f"  05_Harmonogram_roczny - Harmonogram spłat rocznych (lata 1–{args.years})")
+    print(f"  06_Harmonogram_miesieczny - Harmonogram spłat miesięcznych ({args.months} miesięcy)")
     print("  07_Analiza_ROI - Budowa equity i ROI w czasie")
     print("  08_Symulacja_wzrostu_wartości - 3 scenariusze wzrostu wartości nieruchomości")
     print("  09_Koszt_alternatywny_kapitalu - Porównanie equity z alternatywną inwestycją (ETF)")
-    print("  10_Rent_vs_Buy_30lat - Porównanie kupna vs wynajmu w horyzoncie 30 lat")
+    print(f"  10_Rent_vs_Buy_30lat - Porównanie kupna vs wynajmu {horizon(args.years, 'przez')}")
     print("  11_Stress_test - Szok stóp procentowych a koszty i Tragbarkeit")
-    print("  12_Analiza_sprzedaży_po_X_latach - Analiza wyniku sprzedaży po X latach, z uwzględnieniem spłaty kredytu")
+    print(f"  12_Analiza_sprzedazy_X_lat - Analiza wyniku sprzedaży po X latach, z uwzględnieniem spłaty kredytu, i tabela dla X = 1…{args.years}")
     print("  13_Analiza_PRD - Price-to-Rent Ratio, yield i interpretacja wyceny")
     print("  14_Nowa_nieruchomosc_X_lat - Analiza maksymalnej ceny nowej nieruchomości po sprzedaży obecnej")
     print("  15_Planowanie_rodziny - Symulacja zmian dochodu po narodzinach dzieci")
@@ -3753,9 +5422,9 @@ def main():
     print("6. W arkuszu 09_Koszt_alternatywny wpisz stopę zwrotu ETF")
     print("7. W arkuszu 10_Rent_vs_Buy wpisz wzrost czynszu i kosztów")
     print("8. Arkusz 11_Stress_test pokazuje wpływ wzrostu stóp procentowych")
-    print("9. W arkuszu 12_Analiza_sprzedaży wpisz horyzont sprzedaży i wzrost wartości")
+    print("9. W arkuszu 12_Analiza_sprzedazy_X_lat wpisz horyzont sprzedaży i wzrost wartości")
     print("10. Arkusz 13_Analiza_PRD pokazuje wskaźniki wyceny i yield")
-    print("11. W arkuszu 14_Nowa_nieruchomosc_X_lat wpisz parametry przyszłego zakupu (wzrost dochodu, oszczędności, cenę testową)")
+    print("11. W arkuszu 14_Nowa_nieruchomosc_X_lat wpisz parametry przyszłego zakupu (wzrost dochodu, oszczędności, cenę testową) – maksymalną cenę pokazuje B33")
     print("12. W arkuszu 15_Planowanie_rodziny wpisz dane o dzieciach, etatach i kosztach opieki")
     print("13. W arkuszu 16_Renowacje zaplanuj remonty (rok, koszt, typ)")
     print("14. W arkuszu 17_Podatki_kantony wybierz 5 kantonów i porównaj obciążenia podatkowe")
@@ -3767,4 +5436,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
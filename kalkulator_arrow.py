@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Eksport serii czasowych silnika do plików kolumnowych (Parquet / Arrow IPC).
+
+Formuły arkusza nie nadają się do narzędzi analitycznych, więc ten moduł
+zapisuje wyniki kalkulator_silnik jako typowane tabele – po jednym pliku
+na tabelę, z kolumną client_id i stałym schematem (TABLES):
+  * yearly_schedule / monthly_schedule – arkusze 05 i 06,
+  * roi – tabela arkusza 07_Analiza_ROI,
+  * appreciation – scenariusze arkusza 08_Symulacja_wzrostu_wartości,
+  * amort_vs_etf – arkusz 19_Amortyzacja_vs_ETF,
+  * amort_vs_3a – arkusz 20_Amortyzacja_direct_vs_3a.
+
+Klienci przetwarzani są porcjami (chunk_size): każda porcja to jeden
+wektorowy przebieg silnika i jedna grupa wierszy (row group / record batch)
+w każdym pliku, więc nawet przy 100 tys. klientów w pamięci jest naraz
+tylko jedna tabela jednej porcji.
+
+pyarrow jest zależnością opcjonalną – importowaną dopiero przy eksporcie.
+
+PRZYKŁAD:
+    from kalkulator_silnik import read_clients
+    from kalkulator_arrow import export_tables
+
+    export_tables(read_clients('klienci.csv'), 'eksport', fmt='parquet')
+"""
+
+import os
+
+import numpy as np
+
+from kalkulator_silnik import (SCHEDULE_COLUMNS, SERIES_CELLS, appreciation_series, client_arrays, etf_comparison,
+                               monthly_schedule, pillar3a_comparison, roi_series, split_clients, yearly_schedule)
+
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Tabele eksportu: nazwa -> (kolumna okresu, kolumny wartości, arkusz parametrów z SERIES_CELLS).
+# Kolejność kolumn jest częścią schematu: client_id, okres, wartości (float64).
+TABLES = {
+    'yearly_schedule': ('year', SCHEDULE_COLUMNS[1:], None),
+    'monthly_schedule': ('month', SCHEDULE_COLUMNS[1:], None),
+    'roi': ('year', ['value', 'balance_h1', 'balance_h2', 'balance_total', 'equity', 'equity_change',
+                     'equity_gain', 'roi'], '07_Analiza_ROI'),
+    'appreciation': ('year', ['pessimistic', 'base', 'optimistic'], '08_Symulacja_wzrostu_wartości'),
+    'amort_vs_etf': ('year', ['value', 'balance_a', 'equity_a', 'voluntary', 'etf', 'balance_b', 'equity_b',
+                              'net_worth_b'], '19_Amortyzacja_vs_ETF'),
+    'amort_vs_3a': ('year', ['value', 'balance_a', 'equity_a', 'contribution', 'tax_relief', 'pillar3a',
+                             'balance_b', 'equity_b', 'net_worth_b'], '20_Amortyzacja_direct_vs_3a'),
+}
+
+
+def load_pyarrow():
+    """Importuje pyarrow (i pyarrow.parquet) albo zgłasza czytelny błąd."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError('Eksport kolumnowy wymaga pakietu pyarrow (pip install pyarrow)') from exc
+    return pyarrow, pyarrow.parquet
+
+
+def table_schema(pa, name):
+    """Schemat pyarrow tabeli TABLES[name]."""
+    period, columns, _ = TABLES[name]
+    fields = [pa.field('client_id', pa.string(), nullable=False), pa.field(period, pa.int32(), nullable=False)]
+    fields += [pa.field(column, pa.float64()) for column in columns]
+    return pa.schema(fields)
+
+
+def _chunk_arrays(chunk):
+    """Dane porcji klientów: (wejścia, stałe jako tablice, parametry arkuszy jako tablice)."""
+    inputs, constants, cells = split_clients(chunk)
+    params = {}
+    for sheet, sheet_params in SERIES_CELLS.items():
+        params[sheet] = {}
+        for key, (cell, default) in sheet_params.items():
+            values = [client_cells.get((sheet, cell)) for client_cells in cells]
+            params[sheet][key] = np.array([default if v is None or v == '' else float(v) for v in values])
+    return inputs, constants, params
+
+
+def _table_series(name, inputs, constants, params, years, months):
+    """Słownik tablic (klienci, okresy) tabeli name dla jednej porcji."""
+    if name == 'yearly_schedule':
+        return yearly_schedule(inputs, years, constants)
+    if name == 'monthly_schedule':
+        return monthly_schedule(inputs, months, constants)
+    sheet_params = params[TABLES[name][2]]
+    if name == 'roi':
+        return roi_series(inputs, years=years, constants=constants, **sheet_params)
+    if name == 'appreciation':
+        return appreciation_series(inputs, years=years, constants=constants, **sheet_params)
+    if name == 'amort_vs_etf':
+        return etf_comparison(inputs, years=years, constants=constants, **sheet_params)
+    return pillar3a_comparison(inputs, years=years, constants=constants, **sheet_params)
+
+
+def _record_batch(pa, name, ids, series):
+    """Spłaszcza tablice (klienci, okresy) do wierszy klient × okres (kolejno według klienta)."""
+    period, columns, _ = TABLES[name]
+    periods = series['period' if 'period' in series else 'year']
+    count = periods.shape[1]
+    arrays = [pa.array(np.repeat(ids, count), pa.string()),
+              pa.array(np.ascontiguousarray(periods, dtype=np.int32).ravel())]
+    arrays += [pa.array(np.ascontiguousarray(series[column], dtype=np.float64).ravel()) for column in columns]
+    return pa.RecordBatch.from_arrays(arrays, schema=table_schema(pa, name))
+
+
+class _TableWriter:
+    """Zapis kolejnych porcji jednej tabeli do pliku Parquet albo Arrow IPC."""
+
+    def __init__(self, pa, pq, path, schema, fmt):
+        self.path = path
+        self.rows = 0
+        self._sink = None
+        if fmt == 'parquet':
+            self._writer = pq.ParquetWriter(path, schema, compression='zstd')
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+def export_tables(clients, directory, fmt='parquet', tables=None, chunk_size=1000, years=30, months=360,
+                  on_error=None):
+    """
+    Zapisuje tabele TABLES (albo wybrane: tables) dla klientów do katalogu
+    directory jako <tabela>.parquet / <tabela>.arrow. Klienci to słowniki
+    jak z read_clients (pole 'id' = client_id, domyślnie numer kolejny).
+
+    Klient z błędnymi danymi jest pomijany: on_error(id, wyjątek) albo
+    wyjątek, gdy on_error nie podano. Zwraca {tabela: (ścieżka, liczba wierszy)}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Nieznany format eksportu: {fmt} (dostępne: {', '.join(FORMATS)})")
+    tables = list(TABLES) if tables is None else list(tables)
+    unknown = [name for name in tables if name not in TABLES]
+    if unknown:
+        raise ValueError(f"Nieznane tabele eksportu: {', '.join(unknown)}")
+    pa, pq = load_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+
+    writers = {name: _TableWriter(pa, pq, os.path.join(directory, name + FORMATS[fmt]), table_schema(pa, name), fmt)
+               for name in tables}
+    try:
+        chunk, ids = [], []
+        for idx, client in enumerate(clients, start=1):
+            chunk.append(client)
+            ids.append(str(client.get('id', f'{idx:04d}')))
+            if len(chunk) == chunk_size:
+                _write_chunk(pa, writers, chunk, ids, years, months, on_error)
+                chunk, ids = [], []
+        if chunk:
+            _write_chunk(pa, writers, chunk, ids, years, months, on_error)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {name: (writer.path, writer.rows) for name, writer in writers.items()}
+
+
+def _prepare_chunk(chunk):
+    """Dane porcji dla silnika; wejścia od razu jako tablice (client_arrays), jedna konwersja na porcję."""
+    inputs, constants, params = _chunk_arrays(chunk)
+    return client_arrays(inputs), constants, params
+
+
+def _write_chunk(pa, writers, chunk, ids, years, months, on_error):
+    """
+    Jedna porcja klientów: tabele liczone i zapisywane po kolei, żeby nie
+    trzymać wszystkich naraz. Dopiero gdy porcja zawiera błędne dane, klienci
+    sprawdzani są pojedynczo, a błędni pomijani (on_error).
+    """
+    try:
+        prepared = _prepare_chunk(chunk)
+    except Exception:
+        if on_error is None:
+            raise
+        valid = []
+        for client, client_id in zip(chunk, ids):
+            try:
+                _prepare_chunk([client])
+            except Exception as exc:
+                on_error(client_id, exc)
+                continue
+            valid.append((client, client_id))
+        if not valid:
+            return
+        chunk, ids = (list(items) for items in zip(*valid))
+        prepared = _prepare_chunk(chunk)
+
+    ids = np.asarray(ids, dtype=object)
+    for name, writer in writers.items():
+        writer.write(_record_batch(pa, name, ids, _table_series(name, *prepared, years, months)))
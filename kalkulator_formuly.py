@@ -0,0 +1,908 @@
+# -*- coding: utf-8 -*-
+"""
+Parser i ewaluator formuł arkusza kalkulacyjnego używanych przez kalkulator.
+
+Obsługuje dokładnie ten podzbiór składni, który generują funkcje
+create_*_sheet: odwołania (także między arkuszami, zakresy i całe kolumny
+typu L:L), operatory + - * / ^ & i porównania oraz funkcje IF, IFERROR,
+AND, MIN, MAX, SUM, SUMIF, SUMPRODUCT, COUNTIF, INDEX i MATCH.
+Semantyka odpowiada Excelowi/LibreOffice: pusta komórka to 0 (lub ""),
+a błędy (#DIV/0!, #VALUE!, #REF!, #N/A, #NUM!) propagują się do wyniku.
+
+Moduł nie zależy od openpyxl – operuje na słowniku komórek
+{arkusz: {(wiersz, kolumna): wartość lub '=formuła'}}. DependencyGraph
+buduje z formuł graf zależności komórek, wykrywa odwołania do
+nieistniejących arkuszy i komórek poza arkuszem i wyznacza kolejność obliczeń.
+"""
+
+import bisect
+import functools
+import math
+import re
+
+
+class CellError(Exception):
+    """Błąd formuły (#DIV/0!, #VALUE!, ...) – zarazem wartość komórki."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+    def __eq__(self, other):
+        return isinstance(other, CellError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __repr__(self):
+        return self.code
+
+
+DIV0 = CellError('#DIV/0!')
+VALUE = CellError('#VALUE!')
+REF = CellError('#REF!')
+NA = CellError('#N/A')
+NUM = CellError('#NUM!')
+
+# Rozmiar siatki arkusza (Excel/LibreOffice) – zakres całej kolumny (L:L) sięga do ostatniego wiersza
+GRID_ROWS = 1_048_576
+GRID_COLUMNS = 16_384
+
+
+# ============================================================================
+# Adresy komórek
+# ============================================================================
+
+def column_index(letters):
+    """'A' -> 1, 'AA' -> 27."""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index
+
+
+def column_letters(index):
+    """1 -> 'A', 27 -> 'AA'."""
+    letters = ''
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+_COORD = re.compile(r'^\$?([A-Z]{1,3})\$?(\d+)$')
+
+
+def split_coordinate(coordinate):
+    """'$B$4' -> (4, 2)."""
+    match = _COORD.match(coordinate)
+    if not match:
+        raise ValueError(f'Nieprawidłowy adres komórki: {coordinate}')
+    return int(match.group(2)), column_index(match.group(1))
+
+
+# ============================================================================
+# Tokenizer i parser
+# ============================================================================
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<ref>(?:(?:'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?
+            (?:\$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?
+              |\$?[A-Z]{1,3}:\$?[A-Z]{1,3}))
+  | (?P<func>[A-Z][A-Z0-9.]*)\(
+  | (?P<bool>TRUE|FALSE)\b
+  | (?P<num>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<op><=|>=|<>|[-+*/^&=<>(),%])
+""", re.VERBOSE)
+
+_PART = re.compile(r'^\$?([A-Z]{1,3})\$?(\d*)$')
+
+
+def _parse_reference(text):
+    """Zamienia tekst odwołania na węzeł ('ref', ...) lub ('range', ...)."""
+    sheet = None
+    if '!' in text:
+        sheet, text = text.rsplit('!', 1)
+        if sheet.startswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+    if ':' not in text:
+        row, col = split_coordinate(text)
+        return ('ref', sheet, row, col)
+    first, last = text.split(':')
+    m1, m2 = _PART.match(first), _PART.match(last)
+    r1 = int(m1.group(2)) if m1.group(2) else None
+    r2 = int(m2.group(2)) if m2.group(2) else None
+    return ('range', sheet, r1, column_index(m1.group(1)), r2, column_index(m2.group(1)))
+
+
+def tokenize(formula):
+    """Dzieli formułę (bez wiodącego '=') na tokeny (rodzaj, tekst)."""
+    tokens = []
+    pos = 0
+    while pos < len(formula):
+        match = _TOKEN.match(formula, pos)
+        if not match:
+            raise ValueError(f'Nieobsługiwana składnia formuły w pozycji {pos}: {formula}')
+        kind = match.lastgroup
+        if kind != 'ws':
+            tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+_REF_PART = re.compile(r'(\$?)([A-Z]{1,3})(\$?)(\d*)')
+
+
+@functools.lru_cache(maxsize=256)
+def _formula_pieces(formula):
+    """
+    Formuła podzielona raz dla translate_formula: teksty bez zmian i krotki
+    (kolumna, kolumna z '$', wiersz lub None, wiersz z '$') dla każdej
+    części odwołania (nazwa arkusza przed '!' zostaje w tekście).
+    """
+    pieces, last = [], 0
+    for match in _TOKEN.finditer(formula):
+        if match.lastgroup != 'ref':
+            continue
+        address = match.start() + match.group('ref').rfind('!') + 1
+        for part in _REF_PART.finditer(formula, address, match.end()):
+            column_fixed, letters, row_fixed, digits = part.groups()
+            pieces.append(formula[last:part.start()])
+            pieces.append((column_index(letters), bool(column_fixed), int(digits) if digits else None,
+                           bool(row_fixed)))
+            last = part.end()
+    pieces.append(formula[last:])
+    return pieces
+
+
+def translate_formula(formula, rows, cols=0):
+    """
+    Formuła przesunięta o rows wierszy i cols kolumn, jak przy kopiowaniu
+    komórki (i w formułach współdzielonych <f t="shared">): zmieniają się
+    tylko względne części odwołań, kolumny i wiersze z '$' zostają.
+    """
+    text = []
+    for piece in _formula_pieces(formula):
+        if isinstance(piece, str):
+            text.append(piece)
+            continue
+        col, column_fixed, row, row_fixed = piece
+        text.append('$' + column_letters(col) if column_fixed else column_letters(col + cols))
+        if row is not None:
+            text.append(f'${row}' if row_fixed else str(row + rows))
+    return ''.join(text)
+
+
+# Priorytety operatorów dwuargumentowych (jak w Excelu).
+_BINARY = {
+    '=': 1, '<>': 1, '<': 1, '>': 1, '<=': 1, '>=': 1,
+    '&': 2,
+    '+': 3, '-': 3,
+    '*': 4, '/': 4,
+    '^': 5,
+}
+
+
+class _Parser:
+
+    def __init__(self, formula):
+        self.formula = formula
+        self.tokens = tokenize(formula)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token[0] is None or (expected is not None and token[1] != expected):
+            raise ValueError(f'Błąd składni formuły: {self.formula}')
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.expression(0)
+        if self.pos != len(self.tokens):
+            raise ValueError(f'Błąd składni formuły: {self.formula}')
+        return node
+
+    def expression(self, min_priority):
+        node = self.unary()
+        while True:
+            kind, text = self.peek()
+            priority = _BINARY.get(text) if kind == 'op' else None
+            if priority is None or priority < min_priority:
+                return node
+            self.pos += 1
+            # '^' jest lewostronnie łączny w Excelu, tak jak pozostałe operatory.
+            node = ('bin', text, node, self.expression(priority + 1))
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == 'op' and text in '+-':
+            self.pos += 1
+            operand = self.unary()
+            return ('neg', operand) if text == '-' else operand
+        node = self.primary()
+        if self.peek() == ('op', '%'):
+            self.pos += 1
+            node = ('bin', '/', node, ('num', 100.0))
+        return node
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'num':
+            return ('num', float(text))
+        if kind == 'str':
+            return ('str', text[1:-1].replace('""', '"'))
+        if kind == 'bool':
+            return ('bool', text == 'TRUE')
+        if kind == 'ref':
+            return _parse_reference(text)
+        if kind == 'func':
+            args = []
+            if self.peek() != ('op', ')'):
+                while True:
+                    args.append(self.expression(0))
+                    if self.peek() != ('op', ','):
+                        break
+                    self.pos += 1
+            self.take(')')
+            return ('func', text, args)
+        if kind == 'op' and text == '(':
+            node = self.expression(0)
+            self.take(')')
+            return node
+        raise ValueError(f'Błąd składni formuły: {self.formula}')
+
+
+_PARSE_CACHE = {}
+
+
+def parse(formula):
+    """Parsuje formułę (z wiodącym '=' lub bez) do drzewa składniowego."""
+    if formula.startswith('='):
+        formula = formula[1:]
+    node = _PARSE_CACHE.get(formula)
+    if node is None:
+        node = _PARSE_CACHE[formula] = _Parser(formula).parse()
+    return node
+
+
+def references(node):
+    """Zwraca listę węzłów 'ref' i 'range' występujących w formule."""
+    found = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        kind = item[0]
+        if kind in ('ref', 'range'):
+            found.append(item)
+        elif kind == 'func':
+            stack.extend(item[2])
+        elif kind == 'bin':
+            stack.extend(item[2:])
+        elif kind == 'neg':
+            stack.append(item[1])
+    return found
+
+
+def _is_formula(value):
+    return isinstance(value, str) and value.startswith('=')
+
+
+def _format_cell(cell):
+    sheet, row, col = cell
+    return f"'{sheet}'!{column_letters(col)}{row}"
+
+
+class DanglingReferenceError(ValueError):
+    """Formuły odwołują się do nieistniejących arkuszy lub komórek poza arkuszem; problems: lista opisów."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        shown = '\n  '.join(problems[:20])
+        more = f'\n  … i {len(problems) - 20} więcej' if len(problems) > 20 else ''
+        super().__init__(f'Błędne odwołania w formułach ({len(problems)}):\n  {shown}{more}')
+
+
+class DependencyGraph:
+    """
+    Graf zależności komórek skoroszytu zbudowany z formuł.
+
+    cells: {arkusz: {(wiersz, kolumna): wartość}} – jak dla Evaluator.
+    Komórki, których w arkuszu nie ma, są puste (jak w Excelu: 0 albo "")
+    i są poprawnymi odwołaniami. Do problems trafiają tylko odwołania do
+    arkusza spoza cells i poza siatkę arkusza (GRID_ROWS × GRID_COLUMNS).
+
+    precedents[komórka] – komórki, od których zależy formuła,
+    dependents[komórka] – formuły, które od niej zależą.
+    Komórka to krotka (arkusz, wiersz, kolumna).
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.precedents = {}
+        self.dependents = {}
+        self.problems = []
+        self._columns = {}
+        # Zakresy w formułach: {arkusz: [(r1, c1, r2, c2, formuła)]} – dla komórek wypełnionych później (affected)
+        self._ranges = {}
+        for sheet, sheet_cells in cells.items():
+            columns = {}
+            for row, col in sheet_cells:
+                columns.setdefault(col, []).append(row)
+            for rows in columns.values():
+                rows.sort()
+            self._columns[sheet] = columns
+
+        for sheet, sheet_cells in cells.items():
+            for (row, col), value in sheet_cells.items():
+                if _is_formula(value):
+                    self._add_formula((sheet, row, col), value)
+        self._order = None
+
+    def _add_formula(self, cell, formula):
+        sheet = cell[0]
+        try:
+            node = parse(formula)
+        except ValueError as error:
+            self.problems.append(f'{_format_cell(cell)}: {error}')
+            return
+        precedents = set()
+        for ref in references(node):
+            target = ref[1] or sheet
+            if target not in self.cells:
+                self.problems.append(f'{_format_cell(cell)}: brak arkusza {target!r} ({formula})')
+                continue
+            if ref[0] == 'ref':
+                key = (target, ref[2], ref[3])
+                if ref[2] > GRID_ROWS or ref[3] > GRID_COLUMNS:
+                    self.problems.append(f'{_format_cell(cell)}: komórka poza siatką arkusza '
+                                         f'{_format_cell(key)} ({formula})')
+                    continue
+                # Komórka nieobecna w arkuszu jest pusta – zależność zostaje na wypadek jej wypełnienia
+                precedents.add(key)
+            else:
+                if (ref[4] or 0) > GRID_ROWS or ref[5] > GRID_COLUMNS:
+                    self.problems.append(f'{_format_cell(cell)}: zakres poza siatką arkusza ({formula})')
+                    continue
+                precedents.update(self._range_cells(target, *ref[2:]))
+                self._ranges.setdefault(target, []).append((*ref[2:], cell))
+        self.precedents[cell] = precedents
+        for precedent in precedents:
+            self.dependents.setdefault(precedent, set()).add(cell)
+
+    def _range_cells(self, sheet, r1, c1, r2, c2):
+        columns = self._columns[sheet]
+        for col in range(c1, c2 + 1):
+            rows = columns.get(col, ())
+            if r1 is None:
+                selected = rows
+            else:
+                selected = rows[bisect.bisect_left(rows, r1):bisect.bisect_right(rows, r2)]
+            for row in selected:
+                yield (sheet, row, col)
+
+    def _range_dependents(self, cell):
+        """Formuły, których zakresy obejmują komórkę (także pustą w chwili budowy grafu)."""
+        sheet, row, col = cell
+        return {formula for r1, c1, r2, c2, formula in self._ranges.get(sheet, ())
+                if c1 <= col <= c2 and (r1 is None or r1 <= row <= r2)}
+
+    def validate(self):
+        """Rzuca DanglingReferenceError, jeśli jakaś formuła wskazuje na nieistniejący arkusz albo poza arkusz."""
+        if self.problems:
+            raise DanglingReferenceError(self.problems)
+
+    def topological_order(self):
+        """
+        Formuły w kolejności obliczeń (każda po wszystkich, od których zależy).
+        Rzuca ValueError przy odwołaniu cyklicznym.
+        """
+        if self._order is None:
+            self._order = self._sort(self.precedents)
+        return self._order
+
+    def _sort(self, formulas):
+        # Algorytm Kahna; remaining liczy nieobliczone poprzedniki będące formułami
+        remaining = {cell: sum(1 for p in self.precedents[cell] if p in formulas) for cell in formulas}
+        ready = sorted(cell for cell, count in remaining.items() if count == 0)
+        order = []
+        while ready:
+            cell = ready.pop()
+            order.append(cell)
+            for dependent in self.dependents.get(cell, ()):
+                if dependent in remaining:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        ready.append(dependent)
+        if len(order) != len(formulas):
+            cycle = sorted(cell for cell, count in remaining.items() if count > 0)
+            raise ValueError(f'Cykliczne odwołanie: {", ".join(_format_cell(c) for c in cycle[:10])}')
+        return order
+
+    def affected(self, changed):
+        """
+        Formuły do przeliczenia po zmianie komórek changed, w kolejności
+        obliczeń – podstawa przeliczania przyrostowego.
+        """
+        changed = set(changed)
+        seen = set()
+        stack = list(changed)
+        while stack:
+            cell = stack.pop()
+            dependents = self.dependents.get(cell, set())
+            if cell in changed:
+                dependents = dependents | self._range_dependents(cell)
+            for dependent in dependents:
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return [cell for cell in self.topological_order() if cell in seen]
+
+
+# ============================================================================
+# Konwersje wartości
+# ============================================================================
+
+def _is_array(value):
+    return isinstance(value, list)
+
+
+def _scalar(value):
+    """Zakres użyty jako wartość skalarna – lewy górny element."""
+    while _is_array(value):
+        if not value or not value[0]:
+            raise VALUE
+        value = value[0][0]
+    if isinstance(value, CellError):
+        raise value
+    return value
+
+
+def _number(value):
+    value = _scalar(value)
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise VALUE from None
+
+
+def _truth(value):
+    value = _scalar(value)
+    if value is None:
+        return False
+    if isinstance(value, str):
+        if value.upper() in ('TRUE', 'FALSE'):
+            return value.upper() == 'TRUE'
+        raise VALUE
+    return bool(value)
+
+
+def _text(value):
+    value = _scalar(value)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _type_rank(value):
+    if isinstance(value, bool):
+        return 2
+    if isinstance(value, str):
+        return 1
+    return 0
+
+
+def _compare(op, a, b):
+    """Porównanie w stylu Excela: liczby < tekst < wartości logiczne."""
+    if a is None:
+        a = '' if isinstance(b, str) else (False if isinstance(b, bool) else 0.0)
+    if b is None:
+        b = '' if isinstance(a, str) else (False if isinstance(a, bool) else 0.0)
+    ra, rb = _type_rank(a), _type_rank(b)
+    if ra != rb:
+        a, b = ra, rb
+    elif ra == 1:
+        a, b = a.lower(), b.lower()
+    if op == '=':
+        return a == b
+    if op == '<>':
+        return a != b
+    if op == '<':
+        return a < b
+    if op == '>':
+        return a > b
+    if op == '<=':
+        return a <= b
+    return a >= b
+
+
+def _arith(op, a, b):
+    if op == '&':
+        return _text(a) + _text(b)
+    if op in ('=', '<>', '<', '>', '<=', '>='):
+        return _compare(op, _scalar(a), _scalar(b))
+    x, y = _number(a), _number(b)
+    if op == '+':
+        return x + y
+    if op == '-':
+        return x - y
+    if op == '*':
+        return x * y
+    if op == '/':
+        if y == 0:
+            raise DIV0
+        return x / y
+    try:
+        result = x ** y
+    except ZeroDivisionError:
+        raise DIV0 from None
+    if isinstance(result, complex) or math.isinf(result):
+        raise NUM
+    return result
+
+
+def _elementwise(op, a, b):
+    """Operator na tablicach (np. w SUMPRODUCT); błędy zostają w elementach."""
+    rows = max(len(a) if _is_array(a) else 1, len(b) if _is_array(b) else 1)
+    cols = max(len(a[0]) if _is_array(a) else 1, len(b[0]) if _is_array(b) else 1)
+
+    def item(value, r, c):
+        if not _is_array(value):
+            return value
+        row = value[r] if len(value) > 1 else value[0]
+        return row[c] if len(row) > 1 else row[0]
+
+    result = []
+    for r in range(rows):
+        line = []
+        for c in range(cols):
+            try:
+                line.append(_arith(op, item(a, r, c), item(b, r, c)))
+            except CellError as error:
+                line.append(error)
+        result.append(line)
+    return result
+
+
+def _flatten(value):
+    if _is_array(value):
+        for row in value:
+            yield from row
+    else:
+        yield value
+
+
+def _numbers(args):
+    """Liczby z argumentów MIN/MAX/SUM: w zakresach pomija tekst i puste komórki."""
+    numbers = []
+    for arg in args:
+        if _is_array(arg):
+            for item in _flatten(arg):
+                if isinstance(item, CellError):
+                    raise item
+                if isinstance(item, (int, float)) and not isinstance(item, bool):
+                    numbers.append(item)
+        else:
+            numbers.append(_number(arg))
+    return numbers
+
+
+_CRITERION = re.compile(r'^(<=|>=|<>|<|>|=)?(.*)$', re.S)
+
+
+def _criterion(criterion):
+    """Kryterium SUMIF/COUNTIF jako funkcja testująca wartość komórki."""
+    criterion = _scalar(criterion)
+    if isinstance(criterion, str):
+        op, operand = _CRITERION.match(criterion).groups()
+        op = op or '='
+        try:
+            target = float(operand)
+        except ValueError:
+            target = operand
+    else:
+        op, target = '=', criterion
+        if target is None:
+            target = 0.0
+
+    def test(value):
+        if isinstance(value, CellError):
+            return False
+        if isinstance(target, str):
+            if target == '' and op == '=':
+                return value is None or value == ''
+            return isinstance(value, str) and _compare(op, value, target)
+        if value is None or isinstance(value, (str, bool)):
+            return False
+        return _compare(op, value, target)
+
+    return test
+
+
+def _fn_if(ev, sheet, args):
+    if not 2 <= len(args) <= 3:
+        raise VALUE
+    if _truth(ev.eval(args[0], sheet)):
+        return ev.eval(args[1], sheet)
+    return ev.eval(args[2], sheet) if len(args) == 3 else False
+
+
+def _fn_iferror(ev, sheet, args):
+    try:
+        value = ev.eval(args[0], sheet)
+        if not _is_array(value):
+            _scalar(value)
+        return value
+    except CellError:
+        return ev.eval(args[1], sheet)
+
+
+def _fn_and(ev, sheet, args):
+    result = True
+    for arg in args:
+        value = ev.eval(arg, sheet)
+        items = _flatten(value) if _is_array(value) else [value]
+        for item in items:
+            if isinstance(item, CellError):
+                raise item
+            if _is_array(value) and (item is None or isinstance(item, str)):
+                continue
+            result = _truth(item) and result
+    return result
+
+
+def _fn_or(ev, sheet, args):
+    result = False
+    for arg in args:
+        value = ev.eval(arg, sheet)
+        items = _flatten(value) if _is_array(value) else [value]
+        for item in items:
+            if isinstance(item, CellError):
+                raise item
+            if _is_array(value) and (item is None or isinstance(item, str)):
+                continue
+            result = _truth(item) or result
+    return result
+
+
+def _fn_na(ev, sheet, args):
+    if args:
+        raise VALUE
+    raise NA
+
+
+def _fn_min(ev, sheet, args):
+    numbers = _numbers([ev.eval(a, sheet) for a in args])
+    return min(numbers) if numbers else 0.0
+
+
+def _fn_max(ev, sheet, args):
+    numbers = _numbers([ev.eval(a, sheet) for a in args])
+    return max(numbers) if numbers else 0.0
+
+
+def _fn_sum(ev, sheet, args):
+    return sum(_numbers([ev.eval(a, sheet) for a in args]))
+
+
+def _fn_sumif(ev, sheet, args):
+    criteria_range = ev.eval(args[0], sheet)
+    test = _criterion(ev.eval(args[1], sheet))
+    sum_range = ev.eval(args[2], sheet) if len(args) == 3 else criteria_range
+    total = 0.0
+    for value, addend in zip(_flatten(criteria_range), _flatten(sum_range)):
+        if test(value):
+            if isinstance(addend, CellError):
+                raise addend
+            if isinstance(addend, (int, float)) and not isinstance(addend, bool):
+                total += addend
+    return total
+
+
+def _fn_countif(ev, sheet, args):
+    test = _criterion(ev.eval(args[1], sheet))
+    return float(sum(1 for value in _flatten(ev.eval(args[0], sheet)) if test(value)))
+
+
+def _fn_sumproduct(ev, sheet, args):
+    arrays = [ev.eval(a, sheet) for a in args]
+    flat = [list(_flatten(a)) for a in arrays]
+    if len({len(f) for f in flat}) != 1:
+        raise VALUE
+    total = 0.0
+    for items in zip(*flat):
+        product = 1.0
+        for item in items:
+            if isinstance(item, CellError):
+                raise item
+            if isinstance(item, bool) or not isinstance(item, (int, float)):
+                item = 0.0
+            product *= item
+        total += product
+    return total
+
+
+def _fn_index(ev, sheet, args):
+    array = ev.eval(args[0], sheet)
+    if not _is_array(array):
+        array = [[array]]
+    # Zakres całych kolumn (L:L) Evaluator._range ucina na ostatnim użytym wierszu,
+    # ale sięga do końca siatki – wiersze poniżej to puste komórki, nie #REF!
+    whole_columns = args[0][0] == 'range' and args[0][2] is None
+    rows = GRID_ROWS if whole_columns else len(array)
+    row = int(_number(ev.eval(args[1], sheet)))
+    col = int(_number(ev.eval(args[2], sheet))) if len(args) == 3 else 0
+    if len(array[0]) == 1 and len(args) == 2:
+        col = 1
+    elif rows == 1 and len(args) == 2:
+        row, col = 1, row
+    if row == 0 or col == 0:
+        # Cały wiersz/kolumna – w komórce (bez formuły tablicowej) Excel zwraca #VALUE!
+        raise VALUE
+    if row < 0 or col < 0 or row > rows or col > len(array[0]):
+        raise REF
+    if row > len(array):
+        return None
+    return array[row - 1][col - 1]
+
+
+def _fn_match(ev, sheet, args):
+    lookup = _scalar(ev.eval(args[0], sheet))
+    match_type = _number(ev.eval(args[2], sheet)) if len(args) == 3 else 1
+    if lookup is None or match_type != 0:
+        raise NA
+    for position, value in enumerate(_flatten(ev.eval(args[1], sheet)), start=1):
+        if value is not None and not isinstance(value, CellError) and _compare('=', value, lookup):
+            return float(position)
+    raise NA
+
+
+FUNCTIONS = {
+    'IF': _fn_if,
+    'IFERROR': _fn_iferror,
+    'AND': _fn_and,
+    'OR': _fn_or,
+    'NA': _fn_na,
+    'MIN': _fn_min,
+    'MAX': _fn_max,
+    'SUM': _fn_sum,
+    'SUMIF': _fn_sumif,
+    'COUNTIF': _fn_countif,
+    'SUMPRODUCT': _fn_sumproduct,
+    'INDEX': _fn_index,
+    'MATCH': _fn_match,
+}
+
+
+# ============================================================================
+# Ewaluator skoroszytu
+# ============================================================================
+
+class Evaluator:
+    """
+    Liczy wartości wszystkich formuł skoroszytu.
+
+    cells: {nazwa arkusza: {(wiersz, kolumna): wartość}}, gdzie formuły są
+    tekstami zaczynającymi się od '='. Wyniki (liczby, teksty, wartości
+    logiczne lub CellError) trafiają do słownika values.
+    """
+
+    def __init__(self, cells, graph=None):
+        self.cells = cells
+        self.graph = graph
+        self.values = {}
+        self._pending = set()
+        self._max_row = {name: max((r for r, _ in sheet), default=0) for name, sheet in cells.items()}
+
+    def evaluate_all(self):
+        """
+        Liczy formuły w kolejności topologicznej grafu zależności – każda
+        formuła ma już policzone poprzedniki, więc nie ma głębokiej rekurencji
+        przy długich łańcuchach (harmonogramy). Zwraca values.
+        """
+        if self.graph is None:
+            self.graph = DependencyGraph(self.cells)
+        for cell in self.graph.topological_order():
+            self.cell_value(*cell)
+        return self.values
+
+    def recalculate(self, changes):
+        """
+        Przeliczanie przyrostowe po evaluate_all: changes = {(arkusz, wiersz,
+        kolumna): nowa wartość} (bez formuł). Liczone są tylko formuły zależne
+        od zmienionych komórek; zwraca {komórka: nowa wartość}.
+        """
+        for (sheet, row, col), value in changes.items():
+            self.cells[sheet][(row, col)] = value
+            self._max_row[sheet] = max(self._max_row[sheet], row)
+        affected = self.graph.affected(changes)
+        for cell in affected:
+            self.values.pop(cell, None)
+        return {cell: self.cell_value(*cell) for cell in affected}
+
+    def cell_value(self, sheet, row, col):
+        key = (sheet, row, col)
+        if key in self.values:
+            return self.values[key]
+        try:
+            raw = self.cells[sheet].get((row, col))
+        except KeyError:
+            raise REF from None
+        if not (isinstance(raw, str) and raw.startswith('=')):
+            return None if raw == '' else raw
+        if key in self._pending:
+            raise ValueError(f"Cykliczne odwołanie w komórce '{sheet}'!{column_letters(col)}{row}")
+        self._pending.add(key)
+        try:
+            result = _scalar(self.eval(parse(raw), sheet))
+            if result is None:
+                result = 0.0
+        except CellError as error:
+            result = error
+        finally:
+            self._pending.discard(key)
+        self.values[key] = result
+        return result
+
+    def eval(self, node, sheet):
+        kind = node[0]
+        if kind in ('num', 'str', 'bool'):
+            return node[1]
+        if kind == 'ref':
+            value = self.cell_value(node[1] or sheet, node[2], node[3])
+            if isinstance(value, CellError):
+                raise value
+            return value
+        if kind == 'range':
+            return self._range(node[1] or sheet, *node[2:])
+        if kind == 'neg':
+            value = self.eval(node[1], sheet)
+            if _is_array(value):
+                return _elementwise('-', [[0.0]], value)
+            return -_number(value)
+        if kind == 'bin':
+            a = self.eval(node[2], sheet)
+            b = self.eval(node[3], sheet)
+            if _is_array(a) or _is_array(b):
+                return _elementwise(node[1], a, b)
+            return _arith(node[1], a, b)
+        if kind == 'func':
+            function = FUNCTIONS.get(node[1])
+            if function is None:
+                raise ValueError(f'Nieobsługiwana funkcja: {node[1]}')
+            return function(self, sheet, node[2])
+        raise ValueError(f'Nieznany węzeł formuły: {kind}')
+
+    def _range(self, sheet, r1, c1, r2, c2):
+        """
+        Wartości zakresu jako lista wierszy. Całe kolumny (r1 = None) kończą
+        się na ostatnim użytym wierszu arkusza: dalsze puste komórki nie
+        zmieniają wyniku SUM, MIN/MAX, MATCH ani SUMPRODUCT, a INDEX
+        traktuje je osobno (_fn_index).
+        """
+        if sheet not in self.cells:
+            raise REF
+        if r1 is None:
+            r1, r2 = 1, max(self._max_row[sheet], 1)
+        return [[self.cell_value(sheet, r, c) for c in range(c1, c2 + 1)]
+                for r in range(r1, r2 + 1)]
+
+
+def evaluate(cells):
+    """Skrót: liczy wszystkie formuły i zwraca {(arkusz, wiersz, kolumna): wartość}."""
+    return Evaluator(cells).evaluate_all()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Magazyn harmonogramów miesięcznych całego portfela klientów na dysku (np.memmap).
+
+Raportowanie ryzyka potrzebuje sald i przepływów wszystkich klientów naraz,
+np. "łączne saldo H2 w miesiącu 60" albo "klienci z cash-outem powyżej X
+w roku 5". ScheduleStore.create liczy harmonogram miesięczny (jak arkusz
+06_Harmonogram_miesieczny) porcjami klientów i zapisuje każdą kolumnę do
+osobnego pliku .npy o kształcie (klienci, miesiące + 1); index.json trzyma
+identyfikatory klientów i opis magazynu.
+
+Otwarty magazyn mapuje pliki w pamięć (mmap), więc zapytanie o jeden
+miesiąc czy rok czyta z dysku tylko potrzebne fragmenty – bez wczytywania
+i ponownego liczenia wszystkich harmonogramów.
+
+PRZYKŁAD:
+    from kalkulator_silnik import read_clients
+    from kalkulator_magazyn import ScheduleStore
+
+    store = ScheduleStore.create('portfel', read_clients('klienci.csv'))
+    store.month('close_h2', 60).sum()                 # saldo H2 po 60 miesiącach
+    store.ids_where(store.year('cash_out', 5) > 60_000)
+"""
+
+import json
+import os
+
+import numpy as np
+
+from kalkulator_silnik import client_arrays, monthly_schedule, split_clients
+
+
+class ScheduleStore:
+    """
+    Harmonogramy miesięczne klientów w plikach .npy mapowanych w pamięć.
+
+    Kolumny (COLUMNS) to tablice (klienci, miesiące + 1) – miesiąc 0 to saldo
+    początkowe, jak wiersz 19 arkusza 06. Sumy H1 + H2 (open_total,
+    interest_total, amort_total, close_total) liczone są z kolumn H1/H2
+    dopiero w zapytaniu.
+    """
+
+    VERSION = 1
+    COLUMNS = ['open_h1', 'open_h2', 'interest_h1', 'interest_h2', 'amort_h1', 'amort_h2',
+               'close_h1', 'close_h2', 'cash_out']
+    TOTALS = {
+        'open_total': ('open_h1', 'open_h2'),
+        'interest_total': ('interest_h1', 'interest_h2'),
+        'amort_total': ('amort_h1', 'amort_h2'),
+        'close_total': ('close_h1', 'close_h2'),
+    }
+    # Salda: wartość roku = stan na koniec jego ostatniego miesiąca; pozostałe kolumny to przepływy (suma).
+    BALANCES = {'open_h1', 'open_h2', 'open_total', 'close_h1', 'close_h2', 'close_total'}
+
+    def __init__(self, directory, mode='r'):
+        """Otwiera istniejący magazyn; mode jak w np.load (np. 'r' albo 'r+')."""
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != self.VERSION:
+            raise ValueError(f"Nieobsługiwana wersja magazynu harmonogramów: {meta.get('version')}")
+        self.months = meta['months']
+        self.ids = meta['ids']
+        self.index = {client_id: row for row, client_id in enumerate(self.ids)}
+        self._columns = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode)
+                         for name in meta['columns']}
+
+    @classmethod
+    def create(cls, directory, clients, months=360, constants=None, chunk_size=2000, on_error=None):
+        """
+        Liczy harmonogramy klientów (słowniki jak z read_clients) porcjami po
+        chunk_size i zapisuje je do katalogu directory. W pamięci jest naraz
+        tylko harmonogram jednej porcji.
+
+        Klient z błędnymi danymi jest pomijany: on_error(id, wyjątek) albo
+        wyjątek, gdy on_error nie podano. Zwraca otwarty magazyn.
+        """
+        ids, valid = _valid_clients(list(clients), constants, chunk_size, on_error)
+        if len(set(ids)) != len(ids):
+            raise ValueError('Identyfikatory klientów w magazynie muszą być unikalne')
+
+        os.makedirs(directory, exist_ok=True)
+        shape = (len(valid), months + 1)
+        columns = {name: np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+',
+                                                   dtype=np.float64, shape=shape)
+                   for name in cls.COLUMNS}
+        for start in range(0, len(valid), chunk_size):
+            inputs, chunk_constants = _engine_args(valid[start:start + chunk_size], constants)
+            schedule = monthly_schedule(inputs, months, chunk_constants)
+            for name, column in columns.items():
+                column[start:start + len(inputs)] = schedule[name]
+        for column in columns.values():
+            column.flush()
+        del columns
+
+        with open(os.path.join(directory, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': cls.VERSION, 'months': months, 'columns': cls.COLUMNS, 'ids': ids}, f,
+                      ensure_ascii=False)
+        return cls(directory)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, name):
+        """Cała kolumna (klienci, miesiące + 1) – memmap albo, dla sum H1 + H2, obliczona tablica."""
+        if name in self.TOTALS:
+            h1, h2 = self.TOTALS[name]
+            return self._columns[h1] + self._columns[h2]
+        return self._columns[name]
+
+    def month(self, name, month):
+        """Wartości kolumny w miesiącu month (0..months) dla wszystkich klientów."""
+        if not 0 <= month <= self.months:
+            raise IndexError(f'Miesiąc spoza magazynu: {month} (0..{self.months})')
+        if name in self.TOTALS:
+            h1, h2 = self.TOTALS[name]
+            return self._columns[h1][:, month] + self._columns[h2][:, month]
+        return np.array(self._columns[name][:, month])
+
+    def year(self, name, year):
+        """
+        Wartości kolumny w roku year (1..months // 12) dla wszystkich klientów:
+        dla sald – stan na koniec roku (open_* – na początku), dla przepływów –
+        suma dwunastu miesięcy (odsetki liczone od sald miesięcznych, więc
+        nieco niższe niż w rocznym arkuszu 05).
+        """
+        if not 1 <= year <= self.months // 12:
+            raise IndexError(f'Rok spoza magazynu: {year} (1..{self.months // 12})')
+        first, last = 12 * (year - 1) + 1, 12 * year
+        if name in self.BALANCES:
+            return self.month(name, first if name.startswith('open') else last)
+        parts = self.TOTALS.get(name, (name,))
+        return sum(np.asarray(self._columns[part][:, first:last + 1]).sum(axis=1) for part in parts)
+
+    def client(self, client_id):
+        """Pełny harmonogram jednego klienta: {kolumna: tablica miesięcy}."""
+        row = self.index[client_id]
+        series = {name: np.array(column[row]) for name, column in self._columns.items()}
+        for name, (h1, h2) in self.TOTALS.items():
+            series[name] = series[h1] + series[h2]
+        return series
+
+    def ids_where(self, mask):
+        """Identyfikatory klientów, dla których mask (tablica logiczna po klientach) jest prawdą."""
+        return [self.ids[row] for row in np.flatnonzero(mask)]
+
+    def total(self, name, month):
+        """Suma kolumny po wszystkich klientach w miesiącu month, np. łączne saldo H2."""
+        return float(self.month(name, month).sum())
+
+
+def _valid_clients(clients, constants, chunk_size, on_error):
+    """
+    (identyfikatory, klienci) z poprawnymi danymi. Porcje sprawdzane są
+    w całości (client_arrays), a pojedynczo dopiero porcja z błędem.
+    """
+    ids, valid = [], []
+    for start in range(0, len(clients), chunk_size):
+        chunk = clients[start:start + chunk_size]
+        chunk_ids = [str(client.get('id', f'{idx:04d}')) for idx, client in enumerate(chunk, start=start + 1)]
+        try:
+            client_arrays(_engine_args(chunk, constants)[0])
+        except Exception:
+            if on_error is None:
+                raise
+            for client_id, client in zip(chunk_ids, chunk):
+                try:
+                    client_arrays(_engine_args([client], constants)[0])
+                except Exception as exc:
+                    on_error(client_id, exc)
+                    continue
+                ids.append(client_id)
+                valid.append(client)
+            continue
+        ids.extend(chunk_ids)
+        valid.extend(chunk)
+    return ids, valid
+
+
+def _engine_args(clients, constants=None):
+    """Dane klientów i stałe (wspólne constants nadpisane polami 00_Stałe klientów) dla silnika."""
+    inputs, client_constants, _ = split_clients(clients)
+    merged = dict(constants or {})
+    merged.update(client_constants)
+    return inputs, merged
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Pamięć podręczna wyników adresowana treścią (skoroszyty i wyniki silnika).
+
+Wielu klientów ma identyczne dane wejściowe – te same domyślne stałe i te
+same kombinacje ceny, wkładu i stóp ze standardowych ofert. OutputCache
+trzyma gotowy wynik (bajty skoroszytu albo JSON wyników) w pliku nazwanym
+skrótem SHA-256 znormalizowanych danych i wersji modelu (OutputCache.key),
+więc identyczne żądanie dostaje zapisany plik zamiast ponownego budowania.
+
+Rozmiar pamięci jest ograniczony (max_bytes): po przekroczeniu usuwane są
+najdawniej używane pliki (LRU według czasu modyfikacji, odświeżanego przy
+każdym trafieniu). Liczniki trafień, chybień i usunięć zwraca stats().
+
+PRZYKŁAD:
+    from kalkulator_pamiec import OutputCache
+
+    cache = OutputCache('wyniki', max_bytes=256 * 2**20)
+    key = OutputCache.key('workbook', cells, version)
+    data = cache.get(key)
+    if data is None:
+        data = render(cells)
+        cache.put(key, data, '.xlsx')
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+
+class OutputCache:
+    """
+    Wyniki w katalogu directory jako <kk>/<klucz><rozszerzenie>, gdzie kk
+    to dwa pierwsze znaki klucza. Zapis jest atomowy (plik tymczasowy
+    i os.replace), więc z jednego katalogu mogą korzystać równolegle różne
+    procesy; plik usunięty przez inny proces to po prostu chybienie.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        # {klucz: (ścieżka, rozmiar)} w kolejności od najdawniej używanego
+        self._entries = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+        self._evict()  # limit mógł się zmniejszyć od poprzedniego uruchomienia
+
+    @staticmethod
+    def key(kind, inputs, version, options=None):
+        """
+        Klucz wyniku: rodzaj (np. 'workbook', 'kpi'), znormalizowane dane
+        (struktura JSON w ustalonej kolejności), wersja modelu i opcje.
+        """
+        payload = json.dumps([kind, version, inputs, options or {}], sort_keys=True, ensure_ascii=False,
+                             separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _scan(self):
+        """Indeks plików z poprzednich uruchomień, od najdawniej używanego."""
+        found = []
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir() or len(bucket.name) != 2:
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.tmp') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name.split('.', 1)[0], entry.path, stat.st_size))
+        for _, key, path, size in sorted(found):
+            self._entries[key] = (path, size)
+            self.size += size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Zapisany wynik (bytes) albo None; trafienie odświeża pozycję w kolejce LRU."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            path, size = entry
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                # Plik usunięty z zewnątrz (np. przez inny proces) – zapominamy go
+                del self._entries[key]
+                self.size -= size
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return data
+        self.misses += 1
+        return None
+
+    def put(self, key, data, suffix=''):
+        """Zapisuje wynik pod kluczem key i usuwa najdawniej używane pliki ponad max_bytes."""
+        if len(data) > self.max_bytes:
+            return
+        bucket = os.path.join(self.directory, key[:2])
+        os.makedirs(bucket, exist_ok=True)
+        path = os.path.join(bucket, key + suffix)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+            if old[0] != path:
+                self._remove(old[0])
+        self._entries[key] = (path, len(data))
+        self.size += len(data)
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            _, (path, size) = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        """Liczniki pamięci: wpisy, bajty, trafienia, chybienia, usunięcia i skuteczność."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
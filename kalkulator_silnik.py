@@ -0,0 +1,970 @@
+# -*- coding: utf-8 -*-
+"""
+Silnik obliczeniowy kalkulatora nieruchomości w Szwajcarii (NumPy).
+
+Liczy te same wielkości co arkusze 02_Finansowanie, 05_Harmonogram_roczny
+i 06_Harmonogram_miesieczny, ale bez arkusza kalkulacyjnego – bezpośrednio
+w Pythonie i dla wielu klientów naraz (wektorowo). simulate_rates rozszerza
+arkusz 11_Stress_test o symulację Monte Carlo losowych ścieżek stóp
+(stress_surface – o siatkę niezależnych szoków H1 × H2, backtest –
+o historyczne serie stóp), a renovation_scenarios liczy arkusz 16_Renowacje
+dla wszystkich scenariuszy wzrostu wartości i planów remontów naraz.
+roi_series, appreciation_series, etf_comparison i pillar3a_comparison
+to serie roczne arkuszy 07, 08, 19 i 20. sensitivity liczy wykres
+tornado dla wszystkich parametrów 00_Stałe i pól 01_Wejście jednym
+wektorowym przebiegiem, sale_sweep – wynik
+sprzedaży dla każdego horyzontu X naraz, a max_affordable_price
+wyznacza w postaci zamkniętej maksymalną cenę nowej nieruchomości
+(arkusz 14_Nowa_nieruchomosc_X_lat).
+
+PRZYKŁAD:
+    from kalkulator_silnik import yearly_schedule
+
+    klienci = [
+        {'price': 1_000_000, 'cash': 150_000, 'pillar2': 50_000,
+         'rate_h1': 0.018, 'rate_h2': 0.022, 'amort_type': 'D',
+         'voluntary_h1': 5_000},
+    ]
+    harmonogram = yearly_schedule(klienci)
+    print(harmonogram['close_total'][0])
+
+Klienci mogą być podani jako lista słowników (wiersze) albo jako słownik
+kolumn (np. tablic NumPy). Brakujące pola traktowane są jak puste komórki
+arkusza, czyli 0 (lub '' dla rodzaju amortyzacji).
+"""
+
+import csv
+import json
+
+import numpy as np
+
+
+# Pola arkusza 01_Wejście wypełniane przez użytkownika (niebieskie komórki).
+INPUT_CELLS = {
+    'price': 'B4',
+    'cash': 'B8',
+    'pillar2': 'B9',
+    'pillar3': 'B10',
+    'rate_h1': 'B19',
+    'rate_h2': 'B20',
+    'amort_type': 'B21',
+    'income': 'B24',
+    'voluntary_h1': 'B25',
+    'hoa': 'B26',
+    'rent': 'B27',
+}
+
+# Pola arkusza 12_Analiza_sprzedazy_X_lat wypełniane przez użytkownika.
+SALE_CELLS = {
+    'sale_years': 'B7',
+    'growth': 'B8',
+    'sale_costs': 'B9',
+}
+
+# Pola arkusza 14_Nowa_nieruchomosc_X_lat wypełniane przez użytkownika.
+NEW_PROPERTY_CELLS = {
+    'income_growth': 'B22',
+    'savings': 'B23',
+    'sale_share': 'B24',
+}
+
+# Scenariusze wzrostu wartości arkusza 08_Symulacja_wzrostu_wartości (kolejność jak 1/2/3 w 16_Renowacje!B7).
+APPRECIATION_CELLS = {
+    'pessimistic': 'B6',
+    'base': 'B7',
+    'optimistic': 'B8',
+}
+
+# Pola wejściowe arkuszy z seriami rocznymi: {arkusz: {parametr: (adres, wartość domyślna)}}.
+# Wartości domyślne jak w arkuszu (puste pole = 0).
+SERIES_CELLS = {
+    '07_Analiza_ROI': {'growth': ('B10', 0.0)},
+    '08_Symulacja_wzrostu_wartości': {key: (cell, 0.0) for key, cell in APPRECIATION_CELLS.items()},
+    '19_Amortyzacja_vs_ETF': {'growth': ('B11', 0.02), 'etf_return': ('B12', 0.06)},
+    '20_Amortyzacja_direct_vs_3a': {'growth': ('B9', 0.02), 'return_3a': ('B10', 0.03), 'tax_rate': ('B11', 0.20)},
+}
+
+# Parametry arkusza 00_Stałe: (klucz, parametr, wartość domyślna, opis).
+# Kolejność odpowiada wierszom 2, 3, 4, ... arkusza.
+CONSTANTS = [
+    ('min_down_total', 'Min. wkład własny ogółem', 0.20, 'Minimum 20% wartości nieruchomości'),
+    ('min_down_cash', 'Min. wkład własny gotówkowy', 0.10, 'Minimum 10% z gotówki (nie z filarów)'),
+    ('target_ltv', 'LTV docelowe po amortyzacji', 0.65, 'Loan-to-Value po spłacie Hypoteki 2'),
+    ('amort_years', 'Lata amortyzacji do 65%', 15, 'Liczba lat na amortyzację'),
+    ('test_rate', 'Oprocentowanie testowe (bank)', 0.05, 'Stopa używana przez bank do testu zdolności'),
+    ('maintenance', 'Roczne koszty utrzymania (test)', 0.01, '1% wartości nieruchomości rocznie'),
+    ('max_tragbarkeit', 'Max. Tragbarkeit (udział dochodu)', 0.33, 'Maksymalny udział kosztów w dochodzie'),
+    ('chf_pln', 'Kurs CHF/PLN', 4.60, 'Aktualny kurs franka szwajcarskiego'),
+    ('transaction_costs', 'Procent kosztów transakcyjnych (notariusz itd.)', 0.016, 'Szacunkowe koszty notarialne i opłaty'),
+]
+
+CONSTANT_CELLS = {key: f'B{idx}' for idx, (key, _, _, _) in enumerate(CONSTANTS, start=2)}
+
+DEFAULT_CONSTANTS = {key: value for key, _, value, _ in CONSTANTS}
+
+# Kolumny harmonogramu w kolejności kolumn A–N arkuszy 05 i 06.
+SCHEDULE_COLUMNS = [
+    'period', 'open_h1', 'open_h2', 'open_total',
+    'interest_h1', 'interest_h2', 'interest_total',
+    'amort_h2', 'amort_h1', 'amort_total', 'cash_out',
+    'close_h1', 'close_h2', 'close_total',
+]
+
+
+def _parse_field(value):
+    """Wartość pola z pliku klientów: liczba, tekst albo None dla pustego pola."""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value == '':
+        return None
+    try:
+        # Dopuszczamy przecinek dziesiętny (CSV z polskiego Excela/LibreOffice)
+        return float(value.replace(',', '.') if ',' in value and '.' not in value else value)
+    except ValueError:
+        return value
+
+
+def read_clients(path):
+    """
+    Wczytuje dane klientów z pliku CSV (nagłówek = nazwy pól) lub JSON
+    (lista obiektów). Zwraca listę słowników; puste pola są pomijane.
+
+    Nazwy pól to klucze INPUT_CELLS / CONSTANT_CELLS albo adresy w postaci
+    'Arkusz!B4'; pole 'id' służy do nazwania pliku klienta.
+    """
+    if str(path).lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = rows.get('clients', [rows])
+    else:
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t') if sample else csv.excel
+            rows = list(csv.DictReader(f, dialect=dialect))
+
+    clients = []
+    for row in rows:
+        client = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            key = key.strip()
+            value = _parse_field(value) if key != 'id' else value
+            if value is not None and value != '':
+                client[key] = value
+        clients.append(client)
+    return clients
+
+
+def write_clients(path, clients, fields=None):
+    """
+    Zapisuje klientów w formacie read_clients: JSON (lista obiektów) dla
+    .json, inaczej CSV z nagłówkiem fields (domyślnie pola w kolejności
+    pierwszego wystąpienia). Brakujące i puste wartości to puste pola.
+    """
+    clients = list(clients)
+    if fields is None:
+        fields = list(dict.fromkeys(key for client in clients for key in client))
+    if str(path).lower().endswith('.json'):
+        rows = [{key: client[key] for key in fields if client.get(key) not in (None, '')} for client in clients]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+        return
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for client in clients:
+            writer.writerow({key: '' if client.get(key) is None else client[key] for key in fields})
+
+
+def client_fields(client):
+    """
+    Rozdziela pola klienta z read_clients na dane 01_Wejście (klucze
+    INPUT_CELLS), stałe 00_Stałe (klucze CONSTANT_CELLS) i pozostałe komórki
+    {(arkusz, adres): wartość}; adresy 'Arkusz!B4' wskazujące pola
+    01_Wejście/00_Stałe trafiają do dwóch pierwszych.
+    """
+    inputs, constants, cells = {}, {}, {}
+    input_keys = {cell: key for key, cell in INPUT_CELLS.items()}
+    constant_keys = {cell: key for key, cell in CONSTANT_CELLS.items()}
+    for key, value in client.items():
+        if key == 'id':
+            continue
+        if key in INPUT_CELLS:
+            inputs[key] = value
+        elif key in CONSTANT_CELLS:
+            constants[key] = value
+        elif '!' in key:
+            sheet, coordinate = key.rsplit('!', 1)
+            sheet, coordinate = sheet.strip("'"), coordinate.replace('$', '').upper()
+            if sheet == '01_Wejście' and coordinate in input_keys:
+                inputs[input_keys[coordinate]] = value
+            elif sheet == '00_Stałe' and coordinate in constant_keys:
+                constants[constant_keys[coordinate]] = value
+            else:
+                cells[(sheet, coordinate)] = value
+        else:
+            raise ValueError(f'Nieznane pole danych klienta: {key}')
+    return inputs, constants, cells
+
+
+def split_clients(clients):
+    """
+    client_fields dla listy klientów: (lista danych 01_Wejście, stałe jako
+    tablice po jednej wartości na klienta – brak = wartość domyślna, lista
+    pozostałych komórek). Wynik można przekazać wprost do funkcji silnika.
+    """
+    fields = [client_fields(client) for client in clients]
+    constants = {}
+    for key in sorted({key for _, client_constants, _ in fields for key in client_constants}):
+        constants[key] = np.array([float(client_constants.get(key, DEFAULT_CONSTANTS[key]))
+                                   for _, client_constants, _ in fields])
+    return [inputs for inputs, _, _ in fields], constants, [cells for _, _, cells in fields]
+
+
+def sale_parameters(cells):
+    """
+    Parametry sprzedaży z pól '12_Analiza_sprzedazy_X_lat!B7..B9' komórek
+    klienta ({(arkusz, adres): wartość}, jak z client_fields) jako argumenty
+    sale_years/growth/sale_costs funkcji silnika. Puste pole = 0, tak jak
+    w arkuszu (B10 = 13+$B$7, więc bez B7 sprzedaż następuje w roku 0).
+    """
+    params = {}
+    for key, cell in SALE_CELLS.items():
+        value = cells.get(('12_Analiza_sprzedazy_X_lat', cell))
+        params[key] = 0.0 if value is None or value == '' else float(value)
+    params['sale_years'] = int(params['sale_years'])
+    return params
+
+
+def client_arrays(clients):
+    """Zamienia listę klientów (lub słownik kolumn) na słownik tablic NumPy."""
+    if isinstance(clients, dict):
+        columns = clients
+        n = max((np.size(v) for v in columns.values()), default=1)
+    else:
+        clients = list(clients)
+        n = len(clients)
+        columns = {key: [c.get(key) for c in clients] for key in INPUT_CELLS}
+
+    arrays = {}
+    for key in INPUT_CELLS:
+        raw = columns.get(key)
+        if key == 'amort_type':
+            if raw is None:
+                raw = [''] * n
+            values = np.asarray(['' if v is None else str(v).strip().upper() for v in np.ravel(raw)])
+            arrays[key] = np.broadcast_to(values, (n,)) if values.size == 1 else values
+            continue
+        if raw is None:
+            arrays[key] = np.zeros(n)
+            continue
+        values = np.asarray(raw, dtype=object).ravel()
+        values = np.array([0.0 if v is None or v == '' else float(v) for v in values])
+        arrays[key] = np.broadcast_to(values, (n,)) if values.size == 1 else values
+    return arrays
+
+
+def _constants(constants):
+    merged = dict(DEFAULT_CONSTANTS)
+    if constants:
+        merged.update(constants)
+    return merged
+
+
+def financing(clients, constants=None):
+    """Odpowiednik arkusza 02_Finansowanie – podział kredytu na H1/H2 i amortyzację."""
+    c = _constants(constants)
+    x = client_arrays(clients)
+
+    price = x['price']
+    equity = x['cash'] + x['pillar2'] + x['pillar3']
+    loan = price - equity
+    h1 = np.minimum(loan, price * c['target_ltv'])
+    h2 = loan - h1
+    amort_h2 = h2 / c['amort_years']
+
+    return {
+        'price': price,
+        'equity': equity,
+        'loan': loan,
+        'h1': h1,
+        'h2': h2,
+        'rate_h1': x['rate_h1'],
+        'rate_h2': x['rate_h2'],
+        'direct': x['amort_type'] == 'D',
+        'amort_h2_yearly': amort_h2,
+        'voluntary_h1_yearly': x['voluntary_h1'],
+    }
+
+
+def _closing_balances(start, installment, t):
+    """Salda końcowe MAX(0, saldo - MIN(rata, saldo)) dla okresów t (okres 0 = saldo startowe)."""
+    first = np.maximum(0.0, start - np.minimum(installment, start))
+    closing = np.maximum(0.0, first - (t - 1) * installment)
+    closing[:, :1] = start
+    return closing
+
+
+def schedule(clients, periods, periods_per_year=1, constants=None):
+    """
+    Harmonogram spłat H1/H2 dla wszystkich klientów naraz.
+
+    Zwraca słownik tablic o kształcie (liczba klientów, periods + 1) z kluczami
+    SCHEDULE_COLUMNS; okres 0 to saldo początkowe (jak wiersz 13/19 arkusza).
+
+    Rekurencja arkusza (MIN($B$8,C) dla H2 przy typie "D", MIN($B$9,B) dla H1,
+    MAX(0,…) dla sald końcowych) przy stałych ratach amortyzacji daje salda
+    w postaci zamkniętej: saldo_t = MAX(0, saldo_1 - (t-1)·rata). Dzięki temu
+    cały harmonogram liczony jest jednym broadcastem, bez pętli po okresach.
+    """
+    f = financing(clients, constants)
+    n = f['price'].shape[0]
+
+    rate_h1 = (f['rate_h1'] / periods_per_year)[:, None]
+    rate_h2 = (f['rate_h2'] / periods_per_year)[:, None]
+    amort_h2 = np.where(f['direct'], f['amort_h2_yearly'] / periods_per_year, 0.0)[:, None]
+    amort_h1 = (f['voluntary_h1_yearly'] / periods_per_year)[:, None]
+    h1 = f['h1'][:, None]
+    h2 = f['h2'][:, None]
+
+    t = np.arange(periods + 1)[None, :]
+    close_h1 = _closing_balances(h1, amort_h1, t)
+    close_h2 = _closing_balances(h2, amort_h2, t)
+
+    open_h1 = np.empty_like(close_h1)
+    open_h2 = np.empty_like(close_h2)
+    open_h1[:, 0] = h1[:, 0]
+    open_h2[:, 0] = h2[:, 0]
+    open_h1[:, 1:] = close_h1[:, :-1]
+    open_h2[:, 1:] = close_h2[:, :-1]
+
+    interest_h1 = open_h1 * rate_h1
+    interest_h2 = open_h2 * rate_h2
+    paid_h2 = np.minimum(amort_h2, open_h2)
+    paid_h1 = np.minimum(amort_h1, open_h1)
+    for flow in (interest_h1, interest_h2, paid_h2, paid_h1):
+        flow[:, 0] = 0.0
+
+    interest_total = interest_h1 + interest_h2
+    amort_total = paid_h2 + paid_h1
+
+    return {
+        'period': np.broadcast_to(t, (n, periods + 1)),
+        'open_h1': open_h1,
+        'open_h2': open_h2,
+        'open_total': open_h1 + open_h2,
+        'interest_h1': interest_h1,
+        'interest_h2': interest_h2,
+        'interest_total': interest_total,
+        'amort_h2': paid_h2,
+        'amort_h1': paid_h1,
+        'amort_total': amort_total,
+        'cash_out': interest_total + amort_total,
+        'close_h1': close_h1,
+        'close_h2': close_h2,
+        'close_total': close_h1 + close_h2,
+    }
+
+
+def yearly_schedule(clients, years=30, constants=None):
+    """Odpowiednik arkusza 05_Harmonogram_roczny."""
+    return schedule(clients, years, 1, constants)
+
+
+def monthly_schedule(clients, months=360, constants=None):
+    """Odpowiednik arkusza 06_Harmonogram_miesieczny."""
+    return schedule(clients, months, 12, constants)
+
+
+def _monthly_balances_and_costs(client, months, constants=None):
+    """
+    Salda początkowe H1/H2 miesięcy 1..months (z harmonogramu miesięcznego
+    – nie zależą od stóp) i część miesięcznego cash-outu niezależna od stóp:
+    utrzymanie + HOA + amortyzacja H2 w okresie amortyzacji (także pośrednia
+    przez 3a, jak 11_Stress_test!B10) + dobrowolna amortyzacja H1.
+    """
+    c = _constants(constants)
+    x = client_arrays([client])
+    f = financing([client], constants)
+    s = schedule([client], months, 12, constants)
+
+    t = np.arange(1, months + 1)
+    amort_h2 = f['amort_h2_yearly'][0] / 12 * (t <= c['amort_years'] * 12)
+    fixed = (f['price'][0] * c['maintenance'] + x['hoa'][0]) / 12 + amort_h2 + s['amort_h1'][0, 1:]
+    return s['open_h1'][0, 1:], s['open_h2'][0, 1:], fixed
+
+
+def simulate_rates(client, paths=20_000, years=30, volatility=0.01, reversion=0.1, drift=0.0, floor=0.0,
+                   percentiles=(5, 25, 50, 75, 95), seed=None, constants=None):
+    """
+    Monte Carlo stóp procentowych – rozszerzenie arkusza 11_Stress_test.
+
+    Zamiast pięciu stałych szoków stopy H1 i H2 przesuwane są równolegle
+    o losowe przesunięcie x (proces Ornsteina–Uhlenbecka, krok miesięczny):
+
+        x_t = x_(t-1) + reversion·(drift - x_(t-1))/12 + volatility·√(1/12)·ε_t
+        stopa_t = MAX(floor, stopa aktualna + x_t)
+
+    Salda H1/H2 pochodzą z harmonogramu miesięcznego (amortyzacja nie zależy
+    od stóp). Miesięczny cash-out liczony jest jak w kolumnie E arkusza 11:
+    odsetki + utrzymanie + HOA + amortyzacja H2 (w okresie amortyzacji,
+    także pośrednia przez 3a) + dobrowolna amortyzacja H1, a Tragbarkeit
+    jak w kolumnie G: roczny cash-out / dochód.
+
+    Obliczenia są wektorowe po ścieżkach – pętla idzie tylko po miesiącach,
+    a w pamięci trzymane są sumy roczne (paths × years), nie całe ścieżki.
+
+    Zwraca słownik:
+      year              – lata 1..years,
+      monthly_cost      – {percentyl: tablica (years,)} średniego miesięcznego cash-outu w roku,
+      tragbarkeit       – {percentyl: tablica (years,)} udziału kosztów w dochodzie,
+      monthly_cost_mean, tragbarkeit_mean – średnie po ścieżkach,
+      breach_probability – P(Tragbarkeit >= limit 00_Stałe) w każdym roku,
+      breach_any        – P(przekroczenia limitu choć w jednym roku),
+      limit, paths.
+    """
+    c = _constants(constants)
+    x = client_arrays([client])
+    f = financing([client], constants)
+    months = years * 12
+    open_h1, open_h2, fixed = _monthly_balances_and_costs(client, months, constants)
+    # Część cash-outu niezależna od stóp – suma w każdym roku
+    fixed_yearly = fixed.reshape(years, 12).sum(axis=1)
+
+    rate_h1 = f['rate_h1'][0]
+    rate_h2 = f['rate_h2'][0]
+    step = volatility * np.sqrt(1 / 12)
+    decay = reversion / 12
+
+    rng = np.random.default_rng(seed)
+    shift = np.zeros(paths)
+    interest = np.empty((paths, years))
+    for year in range(years):
+        shocks = rng.standard_normal((12, paths))
+        total = np.zeros(paths)
+        for month in range(12):
+            shift += decay * (drift - shift) + step * shocks[month]
+            k = year * 12 + month
+            total += open_h1[k] * np.maximum(floor, rate_h1 + shift) + open_h2[k] * np.maximum(floor, rate_h2 + shift)
+        interest[:, year] = total / 12
+
+    yearly_cost = interest + fixed_yearly
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = yearly_cost / x['income'][0]
+    breach = ratio >= c['max_tragbarkeit']
+    monthly_cost = yearly_cost / 12
+
+    return {
+        'year': np.arange(1, years + 1),
+        'monthly_cost': dict(zip(percentiles, np.percentile(monthly_cost, percentiles, axis=0))),
+        'tragbarkeit': dict(zip(percentiles, np.percentile(ratio, percentiles, axis=0))),
+        'monthly_cost_mean': monthly_cost.mean(axis=0),
+        'tragbarkeit_mean': ratio.mean(axis=0),
+        'breach_probability': breach.mean(axis=0),
+        'breach_any': breach.any(axis=1).mean(),
+        'limit': c['max_tragbarkeit'],
+        'paths': paths,
+    }
+
+
+def key_outputs(clients, constants=None, sale_years=10, growth=0.0, sale_costs=0.0):
+    """
+    Główne wyniki arkuszy dla wszystkich klientów naraz:
+      tragbarkeit       – 03_Tragbarkeit!B11 (test banku: stopa testowa, utrzymanie, amortyzacja H2),
+      monthly_cash_out  – 04_Cashflow!B8 (odsetki, amortyzacja, utrzymanie, HOA),
+      net_sale_proceeds – 12_Analiza_sprzedazy_X_lat!B30 (środki po sprzedaży po sale_years latach
+                          i spłacie sald z harmonogramu rocznego).
+
+    Wartości constants, growth i sale_costs mogą być tablicami (po jednej
+    wartości na klienta) – tak sensitivity liczy wszystkie warianty naraz.
+    """
+    c = _constants(constants)
+    x = client_arrays(clients)
+    f = financing(clients, constants)
+
+    bank_costs = f['loan'] * c['test_rate'] + f['price'] * c['maintenance'] + f['amort_h2_yearly']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Bez dochodu arkusz pokazuje #DIV/0! – tu NaN
+        tragbarkeit = np.where(x['income'] > 0, bank_costs / x['income'], np.nan)
+
+    interest = (f['h1'] * f['rate_h1'] + f['h2'] * f['rate_h2']) / 12
+    amortization = np.where(f['direct'], f['amort_h2_yearly'] / 12, 0.0) + f['voluntary_h1_yearly'] / 12
+    monthly_cash_out = interest + amortization + (f['price'] * c['maintenance'] + x['hoa']) / 12
+
+    balance = yearly_schedule(clients, sale_years, constants)['close_total'][:, sale_years]
+    sale_price = f['price'] * (1 + np.asarray(growth)) ** sale_years
+    net_sale_proceeds = sale_price * (1 - np.asarray(sale_costs)) - balance
+
+    return {
+        'tragbarkeit': tragbarkeit,
+        'monthly_cash_out': monthly_cash_out,
+        'net_sale_proceeds': net_sale_proceeds,
+    }
+
+
+def sensitivity(client, bump=0.1, constants=None, sale_years=10, growth=0.0, sale_costs=0.0):
+    """
+    Analiza wrażliwości (tornado) wyników key_outputs.
+
+    Każdy parametr 00_Stałe, każde liczbowe pole 01_Wejście oraz wzrost
+    wartości i koszty sprzedaży z arkusza 12 zmieniane są o ±bump (względnie,
+    domyślnie ±10%) przy pozostałych bez zmian. Wszystkie 2·N + 1 wariantów
+    (z bazowym) liczone są jednym wywołaniem key_outputs – każdy wariant to
+    osobny „klient” w tablicach silnika.
+
+    Zwraca {wynik: lista wierszy posortowana malejąco po rozpiętości}, wiersz:
+    {'parameter', 'base_input', 'low_input', 'high_input', 'base', 'low', 'high', 'swing'},
+    gdzie low/high to wynik przy parametrze zmniejszonym/zwiększonym.
+    """
+    base_inputs = {key: float(client.get(key) or 0.0) for key in INPUT_CELLS if key != 'amort_type'}
+    base_constants = _constants(constants)
+    base_sale = {'growth': float(growth), 'sale_costs': float(sale_costs)}
+    parameters = [(key, value) for group in (base_constants, base_inputs, base_sale) for key, value in group.items()]
+
+    n = 2 * len(parameters) + 1
+    variants = {key: np.full(n, value) for key, value in parameters}
+    for idx, (key, value) in enumerate(parameters):
+        variants[key][1 + 2 * idx] = value * (1 - bump)
+        variants[key][2 + 2 * idx] = value * (1 + bump)
+
+    columns = {key: variants[key] for key in base_inputs}
+    columns['amort_type'] = client.get('amort_type', '')
+    outputs = key_outputs(columns, constants={key: variants[key] for key in base_constants},
+                          sale_years=sale_years, growth=variants['growth'], sale_costs=variants['sale_costs'])
+
+    tornado = {}
+    for name, values in outputs.items():
+        rows = []
+        for idx, (key, value) in enumerate(parameters):
+            low, high = values[1 + 2 * idx], values[2 + 2 * idx]
+            rows.append({
+                'parameter': key,
+                'base_input': value,
+                'low_input': value * (1 - bump),
+                'high_input': value * (1 + bump),
+                'base': values[0],
+                'low': low,
+                'high': high,
+                'swing': abs(high - low),
+            })
+        # NaN (np. brak dochodu) na końcu listy
+        rows.sort(key=lambda row: -row['swing'] if row['swing'] == row['swing'] else float('inf'))
+        tornado[name] = rows
+    return tornado
+
+
+def max_affordable_price(equity, income, constants=None):
+    """
+    Najwyższa cena nieruchomości, przy której przechodzą oba testy arkusza
+    14_Nowa_nieruchomosc_X_lat: wkład własny (equity >= cena·min_down_total)
+    i Tragbarkeit (koszty banku <= max_tragbarkeit·income).
+
+    Koszty banku przy cenie P i wkładzie E (wiersze 38–44 arkusza):
+        C(P) = MAX(0, P·(1-ltv) - E)/lata + (P - E)·stopa_testowa + P·utrzymanie
+    to maksimum dwóch rosnących funkcji liniowych (bez H2 / z H2), więc
+    C(P) <= K zachodzi dokładnie dla P nie większego od obu pierwiastków:
+        P1 = (K + E·r) / (r + m)
+        P2 = (K + E/lata + E·r) / ((1-ltv)/lata + r + m)
+    Wynik to MIN(P1, P2, E/min_down_total) – bez iteracji, wektorowo dla
+    dowolnej liczby klientów. Brak dochodu lub wkładu daje 0.
+    """
+    c = _constants(constants)
+    equity = np.asarray(equity, dtype=float)
+    income = np.asarray(income, dtype=float)
+    limit = c['max_tragbarkeit'] * income
+    r, m, years, ltv = c['test_rate'], c['maintenance'], c['amort_years'], c['target_ltv']
+
+    without_h2 = (limit + equity * r) / (r + m)
+    with_h2 = (limit + equity / years + equity * r) / ((1 - ltv) / years + r + m)
+    with np.errstate(divide='ignore'):
+        down_payment = equity / c['min_down_total']
+    price = np.minimum(np.minimum(without_h2, with_h2), down_payment)
+    return np.where((income > 0) & (equity > 0), price, 0.0)
+
+
+def new_property_position(clients, constants=None, sale_years=10, growth=0.0, sale_costs=0.0,
+                          income_growth=0.0, savings=0.0, sale_share=1.0):
+    """
+    Wkład własny (14!B32) i dochód (14!B29) w chwili zakupu nowej
+    nieruchomości po sprzedaży obecnej oraz maksymalna cena
+    (max_affordable_price) – dla wszystkich klientów naraz.
+    """
+    x = client_arrays(clients)
+    proceeds = key_outputs(clients, constants, sale_years, growth, sale_costs)['net_sale_proceeds']
+    equity = np.asarray(savings) * sale_years + proceeds * np.asarray(sale_share)
+    income = x['income'] * (1 + np.asarray(income_growth)) ** sale_years
+    return {
+        'equity': equity,
+        'income': income,
+        'max_price': max_affordable_price(equity, income, constants),
+    }
+
+
+def sale_sweep(clients, years=30, growth=0.0, sale_costs=0.0, constants=None):
+    """
+    Arkusz 12_Analiza_sprzedazy_X_lat dla każdego horyzontu X = 1..years
+    naraz (tabela A44:H(44+years) arkusza): jeden harmonogram roczny i broadcast
+    po latach zamiast przeliczania arkusza dla każdego X.
+
+    Zwraca słownik tablic (liczba klientów, years) z kluczami year, value,
+    costs, balance, net_proceeds, profit, roi, cagr oraz best_year
+    (liczba klientów,) – rok o najwyższym CAGR (0, gdy brak wkładu własnego).
+    """
+    f = financing(clients, constants)
+    x = np.arange(1, years + 1)[None, :]
+    balance = yearly_schedule(clients, years, constants)['close_total'][:, 1:]
+
+    value = f['price'][:, None] * (1 + np.asarray(growth, dtype=float).reshape(-1, 1)) ** x
+    costs = value * np.asarray(sale_costs, dtype=float).reshape(-1, 1)
+    net_proceeds = value - costs - balance
+    equity = f['equity'][:, None]
+    profit = net_proceeds - equity
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = np.where(equity > 0, profit / equity, np.nan)
+        cagr = np.where(1 + roi > 0, (1 + roi) ** (1 / x), np.nan) - 1
+
+    has_cagr = ~np.isnan(cagr).all(axis=1)
+    best_year = np.where(has_cagr, np.nanargmax(np.where(np.isnan(cagr), -np.inf, cagr), axis=1) + 1, 0)
+    return {
+        'year': np.broadcast_to(x, value.shape),
+        'value': value,
+        'costs': costs,
+        'balance': balance,
+        'net_proceeds': net_proceeds,
+        'profit': profit,
+        'roi': roi,
+        'cagr': cagr,
+        'best_year': best_year,
+    }
+
+
+def stress_surface(client, h1_shocks, h2_shocks, test_rate_shocks=(0.0,), constants=None):
+    """
+    Powierzchnia szoków arkusza 11_Stress_test: niezależne przesunięcia stóp
+    H1 (wiersze) i H2 (kolumny) oraz szok stopy testowej banku – jednym
+    broadcastem NumPy zamiast przeliczania arkusza dla każdej pary.
+
+    Cash-out jak w kolumnie E arkusza 11 (stopy nie spadają poniżej 0),
+    Tragbarkeit jak w kolumnie G; bank_tragbarkeit to test z 03_Tragbarkeit
+    przy stopie testowej + szok. breach ma kształt
+    (len(test_rate_shocks), len(h1_shocks), len(h2_shocks)) i oznacza
+    przekroczenie limitu w którymkolwiek z testów.
+    """
+    c = _constants(constants)
+    x = client_arrays([client])
+    f = financing([client], constants)
+    h1_shocks = np.asarray(h1_shocks, dtype=float)[:, None]
+    h2_shocks = np.asarray(h2_shocks, dtype=float)[None, :]
+    test_rate_shocks = np.asarray(test_rate_shocks, dtype=float)
+
+    interest = (f['h1'][0] * np.maximum(0.0, f['rate_h1'][0] + h1_shocks)
+                + f['h2'][0] * np.maximum(0.0, f['rate_h2'][0] + h2_shocks)) / 12
+    fixed = ((f['price'][0] * c['maintenance'] + x['hoa'][0]) / 12
+             + f['amort_h2_yearly'][0] / 12 + f['voluntary_h1_yearly'][0] / 12)
+    monthly_cash_out = interest + fixed
+    bank_costs = (f['loan'][0] * (c['test_rate'] + test_rate_shocks) + f['price'][0] * c['maintenance']
+                  + f['amort_h2_yearly'][0])
+
+    income = x['income'][0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tragbarkeit = monthly_cash_out * 12 / income if income > 0 else np.full(monthly_cash_out.shape, np.nan)
+        bank_tragbarkeit = bank_costs / income if income > 0 else np.full(bank_costs.shape, np.nan)
+    limit = c['max_tragbarkeit']
+    breach = (tragbarkeit >= limit)[None, :, :] | (bank_tragbarkeit > limit)[:, None, None]
+
+    return {
+        'h1_shocks': h1_shocks[:, 0],
+        'h2_shocks': h2_shocks[0],
+        'test_rate_shocks': test_rate_shocks,
+        'monthly_cash_out': monthly_cash_out,
+        'tragbarkeit': tragbarkeit,
+        'bank_tragbarkeit': bank_tragbarkeit,
+        'breach': breach,
+        'limit': limit,
+    }
+
+
+def read_rate_history(path):
+    """
+    Wczytuje historyczne miesięczne stopy z pliku CSV: kolumna daty ('date'
+    lub pierwsza kolumna) oraz jedna kolumna stopy (dla H1 i H2) albo
+    kolumny rate_h1 i rate_h2. Stopy w procentach (np. 2,5) są zamieniane
+    na ułamki. Zwraca (lista dat, {'rate_h1': tablica, 'rate_h2': tablica}).
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t') if sample else csv.excel
+        reader = csv.DictReader(f, dialect=dialect)
+        fields = [name.strip() for name in reader.fieldnames or []]
+        rows = [{key.strip(): value for key, value in row.items() if key is not None} for row in reader]
+
+    date_field = 'date' if 'date' in fields else fields[0] if fields else None
+    rate_fields = [name for name in fields if name != date_field]
+    if {'rate_h1', 'rate_h2'} <= set(rate_fields):
+        columns = {'rate_h1': 'rate_h1', 'rate_h2': 'rate_h2'}
+    elif len(rate_fields) == 1:
+        columns = {'rate_h1': rate_fields[0], 'rate_h2': rate_fields[0]}
+    else:
+        raise ValueError(f'{path}: oczekiwano kolumny daty i jednej kolumny stopy '
+                         f'albo kolumn rate_h1 i rate_h2, są: {", ".join(fields)}')
+
+    rows = [row for row in rows if any((value or '').strip() for value in row.values())]
+    dates = [(row.get(date_field) or '').strip() for row in rows]
+    rates = {}
+    for key, field in columns.items():
+        values = np.array([_parse_field(row.get(field) or '') for row in rows], dtype=float)
+        if np.isnan(values).any():
+            raise ValueError(f'{path}: brakujące wartości w kolumnie {field}')
+        rates[key] = values / 100 if np.abs(values).max(initial=0) > 1 else values
+    return dates, rates
+
+
+def backtest(client, dates, rates, months=360, relative=False, constants=None):
+    """
+    Backtest harmonogramu miesięcznego (06_Harmonogram_miesieczny) na
+    historycznych stopach: każdy miesiąc historii, od którego mieści się
+    pełne okno months miesięcy, jest osobnym startem kredytu.
+
+    Stopa w miesiącu t okna to stopa historyczna z tego miesiąca albo, przy
+    relative=True, stopa klienta + zmiana stopy historycznej od startu okna
+    (zachowuje marżę klienta). Salda nie zależą od stóp, więc odsetki
+    wszystkich okien to jedno mnożenie macierzy okien (sliding_window_view)
+    przez wektor sald.
+
+    Zwraca słownik: start (daty startów), total_interest i peak_cash_out
+    (tablice po startach), monthly_cash_out (starty × months) oraz
+    summary {'best', 'median', 'worst'} – start z najmniejszymi, medianowymi
+    i największymi łącznymi odsetkami.
+    """
+    rate_h1 = np.asarray(rates['rate_h1'], dtype=float)
+    rate_h2 = np.asarray(rates['rate_h2'], dtype=float)
+    if len(rate_h1) < months:
+        raise ValueError(f'Historia stóp ma {len(rate_h1)} miesięcy – za mało dla okna {months} miesięcy')
+
+    windows_h1 = np.lib.stride_tricks.sliding_window_view(rate_h1, months)
+    windows_h2 = np.lib.stride_tricks.sliding_window_view(rate_h2, months)
+    if relative:
+        f = financing([client], constants)
+        windows_h1 = f['rate_h1'][0] + windows_h1 - windows_h1[:, :1]
+        windows_h2 = f['rate_h2'][0] + windows_h2 - windows_h2[:, :1]
+
+    open_h1, open_h2, fixed = _monthly_balances_and_costs(client, months, constants)
+    interest = (windows_h1 * open_h1 + windows_h2 * open_h2) / 12
+    monthly_cash_out = interest + fixed
+    total_interest = interest.sum(axis=1)
+    peak_cash_out = monthly_cash_out.max(axis=1)
+
+    starts = list(dates[:len(total_interest)])
+    order = np.argsort(total_interest, kind='stable')
+    summary = {}
+    for name, idx in (('best', order[0]), ('median', order[len(order) // 2]), ('worst', order[-1])):
+        summary[name] = {
+            'start': starts[idx],
+            'total_interest': total_interest[idx],
+            'peak_cash_out': peak_cash_out[idx],
+        }
+    return {
+        'start': starts,
+        'total_interest': total_interest,
+        'peak_cash_out': peak_cash_out,
+        'monthly_cash_out': monthly_cash_out,
+        'summary': summary,
+    }
+
+
+def _raises_standard(value):
+    """Flaga 'raises_standard' remontu (kolumna D 16_Renowacje): 1, '1' albo true z pliku planów."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', '1.0', 'true')
+    return value == 1
+
+
+def renovation_scenarios(client, growth, plans, years=30, investment_share=0.7):
+    """
+    Kostka wyników arkusza 16_Renowacje: scenariusz wzrostu × plan remontów × rok.
+
+    growth – roczne wzrosty wartości scenariuszy (jak 08_Symulacja_wzrostu_wartości!B6:B8),
+    plans – lista planów; plan to lista remontów {'year', 'cost', 'raises_standard'}
+    (kolumny C, D, E tabeli A17:F26); investment_share – część kosztów remontów
+    podnoszących standard, która zwiększa wartość (B8), jedna lub osobna dla
+    każdego planu.
+
+    Zamiast przełączać B7 i przeliczać arkusz, wszystkie kombinacje liczone
+    są jednym broadcastem. Zwraca tablice (scenariusze, plany, years + 1)
+    dla lat 0..years:
+      value       – wartość po remontach (kolumna J),
+      cost        – skumulowany koszt remontów (kolumna E),
+      added_value – dodatkowa wartość dzięki remontom (kolumna K),
+      net_effect  – efekt netto przy sprzedaży w danym roku (B76 = K - E)
+    oraz scenario_value (scenariusze, years + 1) – wartość wg scenariusza (kolumna H).
+    Jak w arkuszu, remonty spoza lat 1..years są pomijane, a efekt remontów
+    nie zależy od scenariusza – od niego zależy tylko wartość.
+    """
+    price = client_arrays([client])['price'][0]
+    growth = np.asarray(growth, dtype=float)
+    shares = np.broadcast_to(np.asarray(investment_share, dtype=float), (len(plans),))
+
+    costs = np.zeros((len(plans), years + 1))
+    invested = np.zeros((len(plans), years + 1))
+    for p, plan in enumerate(plans):
+        for item in plan:
+            year = item.get('year')
+            if year is None or year == '' or not float(year).is_integer():
+                continue
+            year = int(float(year))
+            if not 1 <= year <= years:
+                continue
+            cost = float(item.get('cost') or 0.0)
+            costs[p, year] += cost
+            if _raises_standard(item.get('raises_standard')):
+                invested[p, year] += cost * shares[p]
+
+    cumulative_cost = np.cumsum(costs, axis=1)
+    added_value = np.cumsum(invested, axis=1)
+    scenario_value = price * (1 + growth[:, None]) ** np.arange(years + 1)[None, :]
+    shape = (len(growth), len(plans), years + 1)
+
+    return {
+        'year': np.arange(years + 1),
+        'scenario_value': scenario_value,
+        'value': scenario_value[:, None, :] + added_value[None, :, :],
+        'cost': np.broadcast_to(cumulative_cost[None, :, :], shape),
+        'added_value': np.broadcast_to(added_value[None, :, :], shape),
+        'net_effect': np.broadcast_to((added_value - cumulative_cost)[None, :, :], shape),
+    }
+
+
+def _per_client(value):
+    """Parametr skalarny albo tablica (po jednej wartości na klienta) jako kolumna (n, 1)."""
+    return np.asarray(value, dtype=float).reshape(-1, 1)
+
+
+def _future_value_of_payments(payment, rate, t):
+    """Wartość wpłat rocznych po t latach przy rekurencji S_t = S_(t-1)·(1 + rate) + wpłata."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.where(rate != 0, ((1 + rate) ** t - 1) / rate, t)
+    return payment * factor
+
+
+def roi_series(clients, growth=0.0, years=30, constants=None):
+    """
+    Odpowiednik tabeli A15:I(16+years) arkusza 07_Analiza_ROI (lata 0..years).
+
+    Zwraca słownik tablic (liczba klientów, years + 1) z kluczami year, value,
+    balance_h1, balance_h2, balance_total, equity, equity_change, equity_gain
+    i roi (equity / wkład własny; NaN bez wkładu, arkusz pokazuje #DIV/0!).
+    """
+    f = financing(clients, constants)
+    s = yearly_schedule(clients, years, constants)
+    t = np.arange(years + 1)[None, :]
+
+    value = f['price'][:, None] * (1 + _per_client(growth)) ** t
+    balance_total = s['close_h1'] + s['close_h2']
+    equity = value - balance_total
+    equity_change = np.zeros_like(equity)
+    equity_change[:, 1:] = np.diff(equity, axis=1)
+    own_funds = f['equity'][:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = np.where(own_funds != 0, equity / own_funds, np.nan)
+
+    return {
+        'year': np.broadcast_to(t, value.shape),
+        'value': value,
+        'balance_h1': s['close_h1'],
+        'balance_h2': s['close_h2'],
+        'balance_total': balance_total,
+        'equity': equity,
+        'equity_change': equity_change,
+        'equity_gain': np.cumsum(equity_change, axis=1),
+        'roi': roi,
+    }
+
+
+def appreciation_series(clients, pessimistic=0.0, base=0.0, optimistic=0.0, years=30, constants=None):
+    """
+    Odpowiednik tabeli A12:D(13+years) arkusza 08_Symulacja_wzrostu_wartości:
+    wartość nieruchomości w latach 0..years dla trzech scenariuszy wzrostu
+    (klucze year i APPRECIATION_CELLS, tablice (liczba klientów, years + 1)).
+    """
+    price = financing(clients, constants)['price'][:, None]
+    t = np.arange(years + 1)[None, :]
+    series = {'year': np.broadcast_to(t, (price.shape[0], years + 1))}
+    for key, growth in zip(APPRECIATION_CELLS, (pessimistic, base, optimistic)):
+        series[key] = price * (1 + _per_client(growth)) ** t
+    return series
+
+
+def etf_comparison(clients, growth=0.02, etf_return=0.06, years=30, constants=None):
+    """
+    Odpowiednik tabel A20:K51 arkusza 19_Amortyzacja_vs_ETF (lata 0..years):
+    scenariusz A – pełna amortyzacja (value, balance_a, equity_a), scenariusz
+    B – dobrowolna amortyzacja H1 wpłacana co roku do ETF (voluntary, etf,
+    balance_b, equity_b, net_worth_b). Jak w arkuszu saldo B to saldo A
+    powiększone o skumulowaną dobrowolną amortyzację, a equity B w roku 0
+    (J21 = $B$21) to cała wartość nieruchomości.
+    """
+    f = financing(clients, constants)
+    s = yearly_schedule(clients, years, constants)
+    t = np.arange(years + 1)[None, :]
+
+    value = f['price'][:, None] * (1 + _per_client(growth)) ** t
+    balance_a = s['close_total']
+    voluntary = np.where(t > 0, f['voluntary_h1_yearly'][:, None], 0.0)
+    etf = _future_value_of_payments(f['voluntary_h1_yearly'][:, None], _per_client(etf_return), t)
+    balance_b = balance_a + np.cumsum(voluntary, axis=1)
+    equity_b = value - balance_b
+    equity_b[:, 0] = value[:, 0]
+
+    return {
+        'year': np.broadcast_to(t, value.shape),
+        'value': value,
+        'balance_a': balance_a,
+        'equity_a': value - balance_a,
+        'voluntary': voluntary,
+        'etf': etf,
+        'balance_b': balance_b,
+        'equity_b': equity_b,
+        'net_worth_b': equity_b + etf,
+    }
+
+
+def pillar3a_comparison(clients, growth=0.02, return_3a=0.03, tax_rate=0.20, years=30, constants=None):
+    """
+    Odpowiednik tabel A22:N52 arkusza 20_Amortyzacja_direct_vs_3a (lata 1..years):
+    scenariusz A – amortyzacja bezpośrednia (value, balance_a, equity_a),
+    scenariusz B – dobrowolna amortyzacja wpłacana do Säule 3a z ulgą
+    podatkową (contribution, tax_relief, pillar3a, balance_b, equity_b,
+    net_worth_b).
+
+    Jak w arkuszu saldo A w roku t to saldo H1 z wiersza 12 + t harmonogramu
+    rocznego (INDEX(…!$L:$L, 12 + t)), czyli saldo H1 z końca roku t - 1.
+    """
+    f = financing(clients, constants)
+    s = yearly_schedule(clients, years, constants)
+    t = np.arange(1, years + 1)[None, :]
+
+    value = f['price'][:, None] * (1 + _per_client(growth)) ** t
+    balance_a = s['close_h1'][:, :-1]
+    contribution = np.broadcast_to(f['voluntary_h1_yearly'][:, None], value.shape)
+    tax_relief = contribution * _per_client(tax_rate)
+    pillar3a = _future_value_of_payments(contribution + tax_relief, _per_client(return_3a), t)
+    balance_b = balance_a + np.cumsum(contribution, axis=1)
+    equity_b = value - balance_b
+
+    return {
+        'year': np.broadcast_to(t, value.shape),
+        'value': value,
+        'balance_a': balance_a,
+        'equity_a': value - balance_a,
+        'contribution': contribution,
+        'tax_relief': tax_relief,
+        'pillar3a': pillar3a,
+        'balance_b': balance_b,
+        'equity_b': equity_b,
+        'net_worth_b': equity_b + pillar3a,
+    }
@@ -0,0 +1,625 @@
+# -*- coding: utf-8 -*-
+"""
+Operacje na gotowym pakiecie .xlsx (archiwum zip z częściami XML).
+
+Funkcje działają na bajtach zapisanych przez openpyxl, bez ponownego
+budowania skoroszytu:
+  * read_package / write_package – rozpakowanie i spakowanie części,
+  * read_sheet_cells – odczyt wartości i formuł arkusza,
+  * check_references – kontrola odwołań między arkuszami i komórkami,
+  * add_cached_values – dopisanie obliczonych wartości obok formuł,
+  * WorkbookTemplate – szybkie klonowanie gotowego pakietu z innymi
+    wartościami kilku komórek (bez budowania skoroszytu w openpyxl).
+"""
+
+import io
+import re
+import struct
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+
+from kalkulator_formuly import (CellError, DependencyGraph, Evaluator, column_index, column_letters,
+                                split_coordinate, translate_formula)
+
+
+def _escape(text):
+    """
+    &, < i > jak xml.sax.saxutils.escape – bez importu xml.sax, który
+    pociąga za sobą urllib (połowa czasu importu tego modułu).
+    """
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_C = f'{{{NS_MAIN}}}c'
+_F = f'{{{NS_MAIN}}}f'
+_V = f'{{{NS_MAIN}}}v'
+_T = f'{{{NS_MAIN}}}t'
+_IS = f'{{{NS_MAIN}}}is'
+
+
+def read_package(data):
+    """Zwraca listę (ZipInfo, bajty) wszystkich części pakietu w oryginalnej kolejności."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return [(info, zf.read(info)) for info in zf.infolist()]
+
+
+def write_package(parts, replacements=None):
+    """Pakuje części z powrotem do .xlsx; replacements: {nazwa części: nowe bajty}."""
+    replacements = replacements or {}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for info, content in parts:
+            zf.writestr(info, replacements.get(info.filename, content))
+    return buffer.getvalue()
+
+
+def sheet_part_names(parts):
+    """Zwraca listę (nazwa arkusza, nazwa części XML) w kolejności skoroszytu."""
+    content = dict((info.filename, data) for info, data in parts)
+    rels = ET.fromstring(content['xl/_rels/workbook.xml.rels'])
+    targets = {}
+    for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+        target = rel.get('Target')
+        targets[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else 'xl/' + target
+    workbook = ET.fromstring(content['xl/workbook.xml'])
+    return [(sheet.get('name'), targets[sheet.get(f'{{{NS_REL}}}id')])
+            for sheet in workbook.iter(f'{{{NS_MAIN}}}sheet')]
+
+
+def _shared_strings(content):
+    data = content.get('xl/sharedStrings.xml')
+    if data is None:
+        return []
+    root = ET.fromstring(data)
+    return [''.join(t.text or '' for t in si.iter(_T)) for si in root.iter(f'{{{NS_MAIN}}}si')]
+
+
+def read_sheet_cells(xml, shared_strings=()):
+    """
+    Odczytuje komórki arkusza jako {(wiersz, kolumna): wartość}.
+
+    Formuły zwracane są jako teksty z wiodącym '=' (formuły współdzielone
+    <f t="shared"> – przesunięte z komórki głównej), komórki bez wartości
+    (np. tylko sformatowane pola do wypełnienia) mają wartość None.
+    """
+    cells = {}
+    shared = {}
+    for c in ET.fromstring(xml).iter(_C):
+        key = split_coordinate(c.get('r'))
+        cells[key] = None
+        f = c.find(_F)
+        if f is not None and f.get('t') == 'shared':
+            if f.text:
+                shared[f.get('si')] = (key, f.text)
+            elif f.get('si') in shared:
+                (row, col), text = shared[f.get('si')]
+                cells[key] = '=' + translate_formula(text, key[0] - row, key[1] - col)
+                continue
+        if f is not None and f.text:
+            cells[key] = '=' + f.text
+            continue
+        kind = c.get('t', 'n')
+        if kind == 'inlineStr':
+            node = c.find(_IS)
+            if node is not None:
+                cells[key] = ''.join(t.text or '' for t in node.iter(_T))
+            continue
+        v = c.find(_V)
+        if v is None or v.text is None:
+            continue
+        if kind == 's':
+            cells[key] = shared_strings[int(v.text)]
+        elif kind == 'b':
+            cells[key] = v.text == '1'
+        elif kind in ('str', 'e'):
+            cells[key] = v.text
+        else:
+            number = float(v.text)
+            cells[key] = int(number) if number.is_integer() else number
+    return cells
+
+
+def read_workbook_cells(parts):
+    """Komórki wszystkich arkuszy pakietu: {nazwa arkusza: {(wiersz, kolumna): wartość}}."""
+    content = dict((info.filename, data) for info, data in parts)
+    strings = _shared_strings(content)
+    return {name: read_sheet_cells(content[part], strings)
+            for name, part in sheet_part_names(parts)}
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _cached_value(value):
+    """Zwraca (atrybut t, tekst <v>) dla obliczonej wartości formuły."""
+    if isinstance(value, CellError):
+        return ' t="e"', value.code
+    if isinstance(value, bool):
+        return ' t="b"', '1' if value else '0'
+    if isinstance(value, str):
+        return ' t="str"', _escape(value)
+    return '', _format_number(value)
+
+
+# Komórka z formułą bez wartości; grupa 4 to cały element <f> (także <f t="shared" si="0"/>).
+_FORMULA_CELL = re.compile(rb'<c r="([A-Z]+)(\d+)"([^>]*)>(<f(?:\s[^>]*?)?(?:/>|>.*?</f>))<v\s*/></c>', re.S)
+
+
+def _inject_values(xml, sheet, values):
+    def replace(match):
+        key = (sheet, int(match.group(2)), column_index(match.group(1).decode()))
+        if key not in values:
+            return match.group(0)
+        kind, text = _cached_value(values[key])
+        return (b'<c r="' + match.group(1) + match.group(2) + b'"' + match.group(3) + kind.encode()
+                + b'>' + match.group(4) + b'<v>' + text.encode('utf-8') + b'</v></c>')
+
+    return _FORMULA_CELL.sub(replace, xml)
+
+
+def check_references(data):
+    """
+    Buduje graf zależności formuł pakietu i rzuca DanglingReferenceError,
+    jeśli któraś formuła wskazuje na nieistniejący arkusz albo komórkę poza arkuszem
+    (puste komórki są poprawnymi odwołaniami).
+    Zwraca graf (z kolejnością obliczeń do ponownego użycia).
+    """
+    graph = DependencyGraph(read_workbook_cells(read_package(data)))
+    graph.validate()
+    return graph
+
+
+def add_cached_values(data, check=False):
+    """
+    Liczy wszystkie formuły pakietu i zapisuje wyniki jako wartości <v>.
+
+    Dzięki temu arkusz otwiera się bez przeliczania, a czytniki
+    (pandas, openpyxl z data_only=True) widzą liczby zamiast formuł.
+    check=True najpierw sprawdza odwołania (jak check_references).
+    """
+    parts = read_package(data)
+    cells = read_workbook_cells(parts)
+    graph = DependencyGraph(cells)
+    if check:
+        graph.validate()
+    values = Evaluator(cells, graph).evaluate_all()
+    content = dict((info.filename, xml) for info, xml in parts)
+    replacements = {part: _inject_values(content[part], name, values)
+                    for name, part in sheet_part_names(parts)}
+    return write_package(parts, replacements)
+
+
+# ============================================================================
+# Szablon pakietu – klonowanie z podmianą wartości komórek
+# ============================================================================
+
+_ROW = re.compile(r'<row r="(\d+)"[^>]*?(?:/>|>(.*?)</row>)', re.S)
+_CELL = re.compile(r'<c r="([A-Z]+)(\d+)"([^>]*?)(?:/>|>.*?</c>)', re.S)
+_STYLE = re.compile(r' s="(\d+)"')
+
+
+def _cell_xml(row, col, style, value):
+    """Element <c> z wartością wpisaną przez użytkownika (liczba, tekst, formuła lub pusta)."""
+    ref = f'<c r="{column_letters(col)}{row}"{style}'
+    if value is None:
+        return ref + ' />'
+    if isinstance(value, bool):
+        return f'{ref} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'{ref} t="n"><v>{_format_number(float(value))}</v></c>'
+    text = str(value)
+    if text.startswith('='):
+        return f'{ref}><f>{_escape(text[1:])}</f><v /></c>'
+    return f'{ref} t="inlineStr"><is><t>{_escape(text)}</t></is></c>'
+
+
+def _set_row_cells(row, body, values):
+    """Podmienia/wstawia komórki jednego wiersza; values: {kolumna: wartość}."""
+    cells = []
+    for match in _CELL.finditer(body or ''):
+        cells.append([column_index(match.group(1)), match.group(0), match.group(3)])
+    existing = {cell[0]: cell for cell in cells}
+    for col, value in values.items():
+        if col in existing:
+            style = _STYLE.search(existing[col][2])
+            existing[col][1] = _cell_xml(row, col, style.group(0) if style else '', value)
+        else:
+            cells.append([col, _cell_xml(row, col, '', value), ''])
+    cells.sort(key=lambda cell: cell[0])
+    return ''.join(cell[1] for cell in cells)
+
+
+def set_sheet_values(xml, values):
+    """
+    Wpisuje wartości do XML arkusza: values = {(wiersz, kolumna): wartość}.
+
+    Styl istniejącej komórki jest zachowany; brakujące komórki i wiersze
+    są wstawiane w odpowiednie miejsce (kolejność wymagana przez Excel).
+    """
+    text = xml.decode('utf-8')
+    by_row = {}
+    for (row, col), value in values.items():
+        by_row.setdefault(row, {})[col] = value
+
+    def replace(match):
+        row = int(match.group(1))
+        if row not in by_row:
+            return match.group(0)
+        head = match.group(0)[:match.group(0).index('>')].rstrip('/').rstrip()
+        return f'{head}>{_set_row_cells(row, match.group(2), by_row.pop(row))}</row>'
+
+    text = _ROW.sub(replace, text)
+
+    if by_row:
+        # Wiersze, których w arkuszu nie było – wstawiamy przed pierwszym wierszem o większym numerze
+        for row in sorted(by_row):
+            new_row = f'<row r="{row}">{_set_row_cells(row, "", by_row[row])}</row>'
+            following = next((m for m in _ROW.finditer(text) if int(m.group(1)) > row), None)
+            if following is not None:
+                text = text[:following.start()] + new_row + text[following.start():]
+            elif '<sheetData />' in text or '<sheetData/>' in text:
+                text = re.sub(r'<sheetData\s*/>', f'<sheetData>{new_row}</sheetData>', text, count=1)
+            else:
+                text = text.replace('</sheetData>', new_row + '</sheetData>', 1)
+    return text.encode('utf-8')
+
+
+# Nagłówki zip (bez zip64 – części skoroszytu są małe)
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+
+
+def _raw_parts(data):
+    """Części pakietu jako (ZipInfo, skompresowane bajty) – do kopiowania bez ponownej kompresji."""
+    parts = []
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            header = _LOCAL_HEADER.unpack_from(data, info.header_offset)
+            start = info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+            parts.append((info, data[start:start + info.compress_size]))
+    return parts
+
+
+def _dos_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _write_raw_package(entries):
+    """Składa archiwum zip z gotowych wpisów (nazwa, metoda, crc, rozmiar, skompresowane bajty, data)."""
+    out = io.BytesIO()
+    central = []
+    for name, method, crc, size, compressed, date_time in entries:
+        encoded = name.encode('utf-8')
+        flags = 0x800 if not name.isascii() else 0
+        dos_time, dos_date = _dos_time(date_time)
+        offset = out.tell()
+        out.write(_LOCAL_HEADER.pack(0x04034b50, 20, flags, method, dos_time, dos_date,
+                                     crc, len(compressed), size, len(encoded), 0))
+        out.write(encoded)
+        out.write(compressed)
+        central.append(_CENTRAL_HEADER.pack(0x02014b50, 20, 20, flags, method, dos_time, dos_date,
+                                            crc, len(compressed), size, len(encoded), 0, 0, 0, 0, 0, offset)
+                       + encoded)
+    directory_offset = out.tell()
+    for header in central:
+        out.write(header)
+    out.write(_END_RECORD.pack(0x06054b50, 0, 0, len(central), len(central),
+                               out.tell() - directory_offset, directory_offset, 0))
+    return out.getvalue()
+
+
+class WorkbookTemplate:
+    """
+    Gotowy pakiet .xlsx trzymany w pamięci jako skompresowane części.
+
+    render() wpisuje wartości kilku komórek (np. danych klienta w 01_Wejście
+    i 00_Stałe) do XML tylko tych arkuszy, których dotyczą; pozostałe części
+    kopiowane są bajt w bajt, bez dekompresji i ponownej kompresji.
+    """
+
+    def __init__(self, data):
+        self._parts = _raw_parts(data)
+        self._sheets = dict(sheet_part_names(read_package(data)))
+        self._xml = {}
+
+    @property
+    def sheetnames(self):
+        return list(self._sheets)
+
+    def _part_xml(self, part):
+        xml = self._xml.get(part)
+        if xml is None:
+            info, compressed = next(p for p in self._parts if p[0].filename == part)
+            xml = zlib.decompress(compressed, -15) if info.compress_type == zipfile.ZIP_DEFLATED else compressed
+            self._xml[part] = xml
+        return xml
+
+    def render(self, cells, cached_values=False):
+        """
+        Zwraca bajty nowego pakietu; cells = {(arkusz, adres): wartość}.
+
+        cached_values=True dodatkowo liczy formuły (add_cached_values) –
+        wolniej, ale plik otwiera się bez przeliczania.
+        """
+        values = {}
+        for (sheet, coordinate), value in cells.items():
+            if sheet not in self._sheets:
+                raise ValueError(f'Brak arkusza w szablonie: {sheet}')
+            values.setdefault(self._sheets[sheet], {})[split_coordinate(coordinate)] = value
+
+        replacements = {part: set_sheet_values(self._part_xml(part), part_values)
+                        for part, part_values in values.items()}
+        if cached_values:
+            workbook = self._part_xml('xl/workbook.xml')
+            replacements['xl/workbook.xml'] = workbook.replace(b' fullCalcOnLoad="1"', b'')
+
+        entries = []
+        for info, compressed in self._parts:
+            content = replacements.get(info.filename)
+            if content is None:
+                entries.append((info.filename, info.compress_type, info.CRC, info.file_size,
+                                compressed, info.date_time))
+            else:
+                packer = zlib.compressobj(6, zlib.DEFLATED, -15)
+                entries.append((info.filename, zipfile.ZIP_DEFLATED, zlib.crc32(content), len(content),
+                                packer.compress(content) + packer.flush(), info.date_time))
+        data = _write_raw_package(entries)
+        return add_cached_values(data) if cached_values else data
+
+
+# ============================================================================
+# Fragmenty arkuszy – XML arkusza z jednego pakietu wklejany do innego
+# ============================================================================
+
+# Sekcje styles.xml, do których odwołują się arkusze: tabela -> (element, atrybut identyfikatora w <xf>).
+_STYLE_TABLES = {'fonts': ('font', 'fontId'), 'fills': ('fill', 'fillId'), 'borders': ('border', 'borderId')}
+_FIRST_CUSTOM_FORMAT = 164
+
+
+def _section_pattern(section):
+    return re.compile(rf'<{section}\b[^>]*?(?:/>|>(.*?)</{section}>)', re.S)
+
+
+def _children(body, tag):
+    """Elementy <tag> jednego poziomu (bez zagnieżdżeń tego samego elementu) jako teksty XML."""
+    return re.findall(rf'<{tag}\b[^>]*?/>|<{tag}\b[^>]*?>.*?</{tag}>', body or '', re.S)
+
+
+class StyleSheet:
+    """
+    styles.xml pakietu jako listy elementów (fonty, wypełnienia, ramki,
+    formaty liczb, style komórek <xf> i formaty warunkowe <dxf>).
+
+    Indeksy stylów w XML arkusza (s="…", dxfId="…") wskazują na pozycje
+    w tych listach, więc arkusz przeniesiony do innego pakietu potrzebuje
+    ich nowych numerów: xf()/dxf() opisują styl niezależnie od indeksów,
+    add_xf()/add_dxf() znajdują go albo dopisują w docelowym styles.xml.
+    """
+
+    def __init__(self, xml):
+        self._text = xml.decode('utf-8')
+        self.tables = {table: _children(self._section(table), tag) for table, (tag, _) in _STYLE_TABLES.items()}
+        self.formats = {int(number): code for number, code in
+                        re.findall(r'<numFmt numFmtId="(\d+)" formatCode="([^"]*)"', self._section('numFmts'))}
+        self.xfs = _children(self._section('cellXfs'), 'xf')
+        self.dxfs = _children(self._section('dxfs'), 'dxf')
+
+    def _section(self, section):
+        match = _section_pattern(section).search(self._text)
+        return match.group(1) or '' if match else ''
+
+    def xf(self, index):
+        """Styl komórki s=index z dołączonymi definicjami fontu, wypełnienia, ramki i formatu."""
+        xf = self.xfs[index]
+        style = {'xf': xf}
+        for table, (_, attribute) in _STYLE_TABLES.items():
+            style[table] = self.tables[table][int(re.search(rf' {attribute}="(\d+)"', xf).group(1))]
+        number = int(re.search(r' numFmtId="(\d+)"', xf).group(1))
+        style['format'] = self.formats.get(number)
+        return style
+
+    def dxf(self, index):
+        return self.dxfs[index]
+
+    def _index(self, items, item):
+        try:
+            return items.index(item)
+        except ValueError:
+            items.append(item)
+            return len(items) - 1
+
+    def add_xf(self, style):
+        """Indeks stylu opisanego przez xf() w tym arkuszu stylów (dopisuje brakujące elementy)."""
+        xf = style['xf']
+        for table, (_, attribute) in _STYLE_TABLES.items():
+            index = self._index(self.tables[table], style[table])
+            xf = re.sub(rf' {attribute}="\d+"', f' {attribute}="{index}"', xf, count=1)
+        if style['format'] is not None:
+            number = next((n for n, code in self.formats.items() if code == style['format']), None)
+            if number is None:
+                number = max([_FIRST_CUSTOM_FORMAT - 1, *self.formats]) + 1
+                self.formats[number] = style['format']
+            xf = re.sub(r' numFmtId="\d+"', f' numFmtId="{number}"', xf, count=1)
+        return self._index(self.xfs, xf)
+
+    def add_dxf(self, dxf):
+        return self._index(self.dxfs, dxf)
+
+    def _replace_section(self, text, section, items, before):
+        content = f'<{section} count="{len(items)}">{"".join(items)}</{section}>' if items else ''
+        pattern = _section_pattern(section)
+        if pattern.search(text):
+            return pattern.sub(lambda _: content, text, count=1)
+        return text.replace(f'<{before}', content + f'<{before}', 1)
+
+    def to_xml(self):
+        text = self._text
+        formats = [f'<numFmt numFmtId="{number}" formatCode="{code}" />' for number, code in sorted(self.formats.items())]
+        text = self._replace_section(text, 'numFmts', formats, 'fonts')
+        for table in _STYLE_TABLES:
+            text = self._replace_section(text, table, self.tables[table], 'cellStyleXfs')
+        text = self._replace_section(text, 'cellXfs', self.xfs, 'cellStyles')
+        text = self._replace_section(text, 'dxfs', self.dxfs, 'tableStyles')
+        return text.encode('utf-8')
+
+
+# Odwołania do styles.xml w XML arkusza: styl komórki/wiersza, styl kolumny, format warunkowy.
+_SHEET_STYLE_REFS = re.compile(r'(<(?:c|row)\b[^>]*? s="|<col\b[^>]*? style="|<cfRule\b[^>]*? dxfId=")(\d+)"')
+
+
+def extract_sheet(data, sheet):
+    """
+    Fragment arkusza pakietu do ponownego użycia w innym pakiecie
+    (splice_sheets): XML arkusza oraz użyte w nim style komórek i formaty
+    warunkowe opisane niezależnie od indeksów styles.xml. Fragment da się
+    zapisać jako JSON.
+
+    Arkusz nie może mieć własnych relacji (wykresy, komentarze, hiperłącza)
+    ani korzystać ze wspólnej tablicy tekstów – openpyxl zapisuje teksty
+    bezpośrednio w komórkach (inlineStr).
+    """
+    parts = read_package(data)
+    content = dict((info.filename, xml) for info, xml in parts)
+    part = dict(sheet_part_names(parts))[sheet]
+    rels = part.replace('worksheets/', 'worksheets/_rels/') + '.rels'
+    if rels in content:
+        raise ValueError(f'Arkusz {sheet} ma własne relacje ({rels}) – nie można go przenieść')
+    xml = content[part].decode('utf-8')
+    if re.search(r'<c\b[^>]*? t="s"', xml):
+        raise ValueError(f'Arkusz {sheet} korzysta ze wspólnej tablicy tekstów – nie można go przenieść')
+
+    styles = StyleSheet(content['xl/styles.xml'])
+    xfs, dxfs = {}, {}
+    for match in _SHEET_STYLE_REFS.finditer(xml):
+        index = int(match.group(2))
+        if 'dxfId' in match.group(1):
+            dxfs.setdefault(str(index), styles.dxf(index))
+        else:
+            xfs.setdefault(str(index), styles.xf(index))
+    return {'sheet': sheet, 'xml': xml, 'xfs': xfs, 'dxfs': dxfs}
+
+
+def splice_sheets(data, fragments):
+    """
+    Wstawia fragmenty (extract_sheet) w miejsce arkuszy pakietu o tych samych
+    nazwach – zwykle pustych arkuszy-zaślepek. Style fragmentów są
+    dopisywane do styles.xml pakietu (istniejące są używane ponownie),
+    a indeksy w XML arkuszy przenumerowane. Zwraca bajty nowego pakietu.
+    """
+    if not fragments:
+        return data
+    parts = read_package(data)
+    content = dict((info.filename, xml) for info, xml in parts)
+    sheet_parts = dict(sheet_part_names(parts))
+    styles = StyleSheet(content['xl/styles.xml'])
+
+    replacements = {}
+    for fragment in fragments:
+        xf_map = {int(old): styles.add_xf(style) for old, style in fragment['xfs'].items()}
+        dxf_map = {int(old): styles.add_dxf(dxf) for old, dxf in fragment['dxfs'].items()}
+
+        def renumber(match):
+            mapping = dxf_map if 'dxfId' in match.group(1) else xf_map
+            return f'{match.group(1)}{mapping[int(match.group(2))]}"'
+
+        replacements[sheet_parts[fragment['sheet']]] = _SHEET_STYLE_REFS.sub(renumber, fragment['xml']).encode('utf-8')
+    replacements['xl/styles.xml'] = styles.to_xml()
+    return write_package(parts, replacements)
+
+
+# ============================================================================
+# Odczyt wybranych komórek z plików wypełnionych przez klientów
+# ============================================================================
+
+def filled_cells(data, color):
+    """
+    Adresy komórek pakietu z tłem color (np. 'CCE5FF' – pola do wypełnienia):
+    lista (arkusz, adres) w kolejności arkuszy, wierszy i kolumn.
+    """
+    parts = read_package(data)
+    content = dict((info.filename, xml) for info, xml in parts)
+    styles = StyleSheet(content['xl/styles.xml'])
+    marker = f'rgb="00{color.upper()}"'
+    filled = {index for index in range(len(styles.xfs)) if marker in styles.xf(index)['fills']}
+    cells = []
+    for sheet, part in sheet_part_names(parts):
+        for c in ET.fromstring(content[part]).iter(_C):
+            if int(c.get('s', 0)) in filled:
+                cells.append((sheet, c.get('r')))
+    return cells
+
+
+def _cell_value(c, shared_strings):
+    """Wartość elementu <c>: ostatnia obliczona wartość, a bez niej formuła z wiodącym '='."""
+    kind = c.get('t', 'n')
+    if kind == 'inlineStr':
+        node = c.find(_IS)
+        return ''.join(t.text or '' for t in node.iter(_T)) if node is not None else None
+    v = c.find(_V)
+    if v is None or v.text is None:
+        f = c.find(_F)
+        return '=' + f.text if f is not None and f.text else None
+    if kind == 's':
+        return shared_strings[int(v.text)]
+    if kind == 'b':
+        return v.text == '1'
+    if kind in ('str', 'e'):
+        return v.text
+    number = float(v.text)
+    return int(number) if number.is_integer() else number
+
+
+def read_cells(path, cells):
+    """
+    Odczytuje wartości wskazanych komórek z pliku .xlsx: cells = lista
+    (arkusz, adres), wynik = {(arkusz, adres): wartość} (None dla pustych).
+
+    Plik zapisany przez Excel/LibreOffice czytany jest strumieniowo: tylko
+    części arkuszy, których dotyczy cells, przez iterparse, z czyszczeniem
+    przetworzonych wierszy. Brak arkusza w pliku to ValueError.
+    """
+    wanted = {}
+    for sheet, coordinate in cells:
+        wanted.setdefault(sheet, set()).add(coordinate.replace('$', '').upper())
+    values = {(sheet, coordinate): None for sheet, coordinate in cells}
+
+    with zipfile.ZipFile(path) as zf:
+        names = set(zf.namelist())
+        rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        targets = {}
+        for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+            target = rel.get('Target')
+            targets[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else 'xl/' + target
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+        parts = {sheet.get('name'): targets[sheet.get(f'{{{NS_REL}}}id')]
+                 for sheet in workbook.iter(f'{{{NS_MAIN}}}sheet')}
+        missing = [sheet for sheet in wanted if sheet not in parts]
+        if missing:
+            raise ValueError(f"Brak arkuszy w pliku: {', '.join(missing)}")
+        strings = _shared_strings({'xl/sharedStrings.xml': zf.read('xl/sharedStrings.xml')}) \
+            if 'xl/sharedStrings.xml' in names else []
+
+        for sheet, coordinates in wanted.items():
+            remaining = set(coordinates)
+            with zf.open(parts[sheet]) as stream:
+                for _, element in ET.iterparse(stream):
+                    if element.tag == _C:
+                        coordinate = element.get('r')
+                        if coordinate in remaining:
+                            values[(sheet, coordinate)] = _cell_value(element, strings)
+                            remaining.discard(coordinate)
+                    elif element.tag == f'{{{NS_MAIN}}}row':
+                        element.clear()
+                        if not remaining:
+                            break
+    return values
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Wspólne dane testów: skrypt budujący i przykładowy klient."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_kalkulator  # noqa: E402
+
+# Horyzont skoroszytu testowego (--years).
+YEARS = 30
+
+# Klient jak w pliku wsadowym CSV: pola 01_Wejście i komórki innych arkuszy.
+CLIENT = {
+    'id': 'A',
+    'price': 1_000_000,
+    'cash': 150_000,
+    'pillar2': 50_000,
+    'rate_h1': 0.018,
+    'rate_h2': 0.022,
+    'amort_type': 'D',
+    'income': 180_000,
+    'voluntary_h1': 5_000,
+    '12_Analiza_sprzedazy_X_lat!B7': 8,
+    '12_Analiza_sprzedazy_X_lat!B8': 0.01,
+    '12_Analiza_sprzedazy_X_lat!B9': 0.03,
+    '14_Nowa_nieruchomosc_X_lat!B22': 0.01,
+    '14_Nowa_nieruchomosc_X_lat!B23': 20_000,
+    '14_Nowa_nieruchomosc_X_lat!B24': 0.8,
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption('--benchmark', action='store_true',
+                     help='uruchom też testy czasu (oznaczone benchmark), zależne od obciążenia maszyny')
+    parser.addoption('--import-budget', type=float, default=benchmark_kalkulator.IMPORT_BUDGET, metavar='SEKUNDY',
+                     help='budżet czasu importu skryptu dla testów benchmark (domyślnie: %(default)s)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: pomiar czasu; tylko z --benchmark')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='pomiar czasu – uruchom z --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def script():
+    return benchmark_kalkulator.load_script()
+
+
+@pytest.fixture(scope='session')
+def client():
+    return dict(CLIENT)
+
+
+@pytest.fixture(scope='session')
+def workbook(script, client, tmp_path_factory):
+    """Skoroszyt klienta (YEARS lat) zapisany z obliczonymi wartościami (--cached-values)."""
+    path = tmp_path_factory.mktemp('skoroszyt') / 'kalkulator_A.xlsx'
+    script.save_workbook(script.build_workbook(client, years=YEARS), str(path), cached_values=True)
+    return path
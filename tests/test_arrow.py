@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Eksport kolumnowy (kalkulator_arrow.export_tables): schemat i liczba wierszy po odczycie."""
+
+import numpy as np
+import pytest
+
+from conftest import YEARS
+from kalkulator_silnik import split_clients, yearly_schedule
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from kalkulator_arrow import TABLES, export_tables, table_schema  # noqa: E402
+
+
+def _read(path, fmt):
+    if fmt == 'parquet':
+        return pq.read_table(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_yearly_schedule_round_trip(client, tmp_path, fmt):
+    clients = [client, dict(client, id='B', price=800_000), dict(client, id='C', income=120_000)]
+    result = export_tables(clients, tmp_path, fmt=fmt, tables=['yearly_schedule'], chunk_size=2, years=YEARS)
+    path, rows = result['yearly_schedule']
+    assert rows == len(clients) * (YEARS + 1)
+
+    table = _read(path, fmt)
+    assert table.schema.equals(table_schema(pa, 'yearly_schedule'))
+    assert table.num_rows == rows
+    assert table.column('client_id').to_pylist() == [c['id'] for c in clients for _ in range(YEARS + 1)]
+
+    # Wartości po odczycie = harmonogram silnika, wiersze kolejno według klienta.
+    inputs, constants, _ = split_clients(clients)
+    expected = yearly_schedule(inputs, YEARS, constants)
+    np.testing.assert_array_equal(table.column('year').to_numpy(), np.tile(np.arange(YEARS + 1), len(clients)))
+    for column in TABLES['yearly_schedule'][1]:
+        np.testing.assert_allclose(table.column(column).to_numpy(), expected[column].ravel(), err_msg=column)
+
+
+def test_invalid_client_skipped(client, tmp_path):
+    """Klient z błędnymi danymi pomijany (on_error), reszta porcji zapisana."""
+    errors = []
+    clients = [client, dict(client, id='X', price='abc')]
+    result = export_tables(clients, tmp_path, tables=['yearly_schedule'], years=YEARS,
+                           on_error=lambda client_id, exc: errors.append(client_id))
+    assert errors == ['X']
+    assert result['yearly_schedule'][1] == YEARS + 1
+    assert set(pq.read_table(result['yearly_schedule'][0]).column('client_id').to_pylist()) == {client['id']}
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Backtest historycznych stóp (read_rate_history, backtest, --backtest)."""
+
+import numpy as np
+import pytest
+
+from kalkulator_silnik import backtest, monthly_schedule, read_rate_history, write_clients
+
+MONTHS = 120
+
+
+def _rate_file(path, months, rate_h1, rate_h2):
+    """Syntetyczna historia: stałe stopy w procentach, jak w eksporcie z SNB."""
+    lines = ['date;rate_h1;rate_h2']
+    lines += [f'{2000 + m // 12}-{m % 12 + 1:02d};{rate_h1 * 100:.4f};{rate_h2 * 100:.4f}'.replace('.', ',')
+              for m in range(months)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_read_rate_history_percent_and_comma(tmp_path):
+    dates, rates = read_rate_history(_rate_file(tmp_path / 'stopy.csv', 3, 0.018, 0.022))
+    assert dates == ['2000-01', '2000-02', '2000-03']
+    np.testing.assert_allclose(rates['rate_h1'], 0.018)
+    np.testing.assert_allclose(rates['rate_h2'], 0.022)
+
+
+@pytest.mark.parametrize('relative', [False, True])
+def test_constant_rates_match_schedule(client, tmp_path, relative):
+    # Przy relative=True stopy historyczne są inne niż klienta – liczy się tylko ich zmiana (tu zero)
+    rates_file = _rate_file(tmp_path / 'stopy.csv', MONTHS + 24, 0.05 if relative else client['rate_h1'],
+                            0.07 if relative else client['rate_h2'])
+    dates, rates = read_rate_history(rates_file)
+    result = backtest(client, dates, rates, months=MONTHS, relative=relative)
+    
+    expected = monthly_schedule([client], MONTHS)['interest_total'][0, 1:].sum()
+    assert len(result['start']) == 25
+    np.testing.assert_allclose(result['total_interest'], expected, rtol=1e-12)
+    cash_out = result['monthly_cash_out']
+    np.testing.assert_allclose(cash_out, np.broadcast_to(cash_out[:1], cash_out.shape), rtol=1e-12)
+
+
+def test_short_history_is_a_client_error(script, client, tmp_path, capsys):
+    write_clients(str(tmp_path / 'klienci.csv'), [dict(client, id='A'), dict(client, id='B')])
+    argv = ['--backtest', str(tmp_path / 'klienci.csv'),
+            '--rates', _rate_file(tmp_path / 'stopy.csv', 60, 0.018, 0.022), '--months', str(MONTHS)]
+    assert script.run_backtest(script.parse_args(argv)) == 2
+    output = capsys.readouterr().out
+    assert '❌ A: ValueError' in output and '❌ B: ValueError' in output
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Graf zależności formuł (DependencyGraph) i przeliczanie przyrostowe (Evaluator.recalculate)."""
+
+import pytest
+
+from kalkulator_formuly import DanglingReferenceError, DependencyGraph, Evaluator
+
+
+def _cells():
+    return {
+        'A': {(1, 1): 2, (2, 1): 3, (1, 2): '=A1*10', (2, 2): '=SUM(A1:A5)+B1'},
+        'B': {(1, 1): "=A!B2+'A'!A2", (3, 1): '=A1+1'},
+    }
+
+
+def test_missing_sheet_is_flagged():
+    cells = _cells()
+    cells['B'][(4, 1)] = "='Brak'!A1"
+    with pytest.raises(DanglingReferenceError) as error:
+        DependencyGraph(cells).validate()
+    assert len(error.value.problems) == 1
+    assert 'Brak' in error.value.problems[0]
+
+
+def test_reference_outside_grid_is_flagged():
+    cells = _cells()
+    cells['B'][(4, 1)] = '=A!XFE1+A!A1048577'
+    assert len(DependencyGraph(cells).problems) == 2
+
+
+def test_blank_cells_inside_grid_are_valid():
+    cells = _cells()
+    # Puste komórki za ostatnim użytym wierszem i kolumną arkusza
+    cells['B'][(4, 1)] = '=A!Z500+SUM(A!C1:C100)+INDEX(A!A:A,1000)'
+    graph = DependencyGraph(cells)
+    graph.validate()
+    assert ('A', 500, 26) in graph.precedents[('B', 4, 1)]
+    assert Evaluator(cells, graph).evaluate_all()[('B', 4, 1)] == 0
+
+
+def test_topological_order_puts_precedents_first():
+    graph = DependencyGraph(_cells())
+    order = graph.topological_order()
+    assert order.index(('A', 1, 2)) < order.index(('A', 2, 2)) < order.index(('B', 1, 1))
+
+
+def test_cycle_is_reported():
+    cells = {'A': {(1, 1): '=A2', (2, 1): '=A1+1'}}
+    with pytest.raises(ValueError, match='Cykliczne'):
+        DependencyGraph(cells).topological_order()
+
+
+def test_recalculate_matches_full_evaluation():
+    evaluator = Evaluator(_cells())
+    evaluator.evaluate_all()
+    # A3 jest pusta przy budowie grafu – zmiana musi dotrzeć do SUM(A1:A5)
+    changes = {('A', 1, 1): 5, ('A', 3, 1): 7}
+    changed = evaluator.recalculate(changes)
+    
+    cells = _cells()
+    for (sheet, row, col), value in changes.items():
+        cells[sheet][(row, col)] = value
+    expected = Evaluator(cells).evaluate_all()
+    assert set(changed) == {('A', 1, 2), ('A', 2, 2), ('B', 1, 1), ('B', 3, 1)}
+    assert {cell: evaluator.values[cell] for cell in expected} == expected
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Harmonogramy silnika (yearly_schedule, monthly_schedule) a arkusze 05 i 06."""
+
+import numpy as np
+import pytest
+
+from conftest import YEARS
+from kalkulator_silnik import monthly_schedule, split_clients, yearly_schedule
+from kalkulator_xlsx import read_cells
+
+MONTHS = 12 * YEARS
+
+# Kolumny A–N arkuszy 05 i 06 porównywane z harmonogramem silnika.
+SCHEDULE_CELLS = {'open_total': 'D', 'interest_total': 'G', 'amort_total': 'J', 'cash_out': 'K',
+                  'close_total': 'N'}
+
+
+@pytest.mark.parametrize('sheet, engine, first_row, periods', [
+    ('05_Harmonogram_roczny', yearly_schedule, 13, YEARS),
+    ('06_Harmonogram_miesieczny', monthly_schedule, 19, MONTHS),
+])
+def test_schedule_matches_sheet(workbook, client, sheet, engine, first_row, periods):
+    inputs, constants, _ = split_clients([client])
+    result = engine(inputs, periods, constants)
+    rows = range(first_row + 1, first_row + periods + 1)
+    values = read_cells(workbook, [(sheet, f'{column}{row}') for row in rows for column in SCHEDULE_CELLS.values()])
+    for name, column in SCHEDULE_CELLS.items():
+        actual = np.array([values[(sheet, f'{column}{row}')] for row in rows], dtype=float)
+        np.testing.assert_allclose(actual, result[name][0, 1:], rtol=1e-9, atol=1e-6, err_msg=f'{sheet} {name}')
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo stóp (simulate_rates, --monte-carlo)."""
+
+import json
+
+import numpy as np
+
+from kalkulator_silnik import (DEFAULT_CONSTANTS, client_arrays, financing, monthly_schedule, simulate_rates,
+                               write_clients)
+
+YEARS = 20
+
+
+def test_zero_volatility_reproduces_schedule(client):
+    result = simulate_rates(client, paths=3, years=YEARS, volatility=0.0, seed=1)
+    
+    s = monthly_schedule([client], YEARS * 12)
+    f = financing([client])
+    upkeep = (f['price'][0] * DEFAULT_CONSTANTS['maintenance'] + client_arrays([client])['hoa'][0]) / 12
+    monthly = s['interest_total'][0, 1:] + s['amort_total'][0, 1:] + upkeep
+    expected = monthly.reshape(YEARS, 12).mean(axis=1)
+    
+    np.testing.assert_allclose(result['monthly_cost_mean'], expected, rtol=1e-9)
+    for values in result['monthly_cost'].values():
+        np.testing.assert_allclose(values, expected, rtol=1e-9)
+    np.testing.assert_allclose(result['tragbarkeit_mean'], expected * 12 / client['income'], rtol=1e-9)
+
+
+def test_same_seed_same_result(client):
+    first, second = (simulate_rates(client, paths=500, years=YEARS, seed=7) for _ in range(2))
+    other = simulate_rates(client, paths=500, years=YEARS, seed=8)
+    for q in first['monthly_cost']:
+        np.testing.assert_array_equal(first['monthly_cost'][q], second['monthly_cost'][q])
+        np.testing.assert_array_equal(first['tragbarkeit'][q], second['tragbarkeit'][q])
+    np.testing.assert_array_equal(first['breach_probability'], second['breach_probability'])
+    assert first['breach_any'] == second['breach_any']
+    assert not np.array_equal(first['monthly_cost'][50], other['monthly_cost'][50])
+
+
+def test_run_monte_carlo_report_repeats_with_seed(script, client, tmp_path):
+    write_clients(str(tmp_path / 'klienci.csv'), [client])
+    reports = []
+    for name in ('a.json', 'b.json'):
+        argv = ['--monte-carlo', str(tmp_path / 'klienci.csv'), '--paths', '500', '--years', str(YEARS),
+                '--rate-volatility', '0.02', '--seed', '42', '--report', str(tmp_path / name)]
+        assert script.run_monte_carlo(script.parse_args(argv)) == 0
+        with open(tmp_path / name, encoding='utf-8') as f:
+            report = json.load(f)
+        for result in report['clients']:
+            del result['seconds']
+        reports.append(report)
+    assert reports[0] == reports[1]
+    assert 0 < reports[0]['clients'][0]['breach_any'] < 1
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Maksymalna cena nowej nieruchomości (max_affordable_price) i arkusz 14_Nowa_nieruchomosc_X_lat."""
+
+import numpy as np
+import pytest
+
+from kalkulator_silnik import (DEFAULT_CONSTANTS, max_affordable_price, new_property_position, sale_parameters,
+                               split_clients)
+from kalkulator_xlsx import read_cells
+
+NEW_PROPERTY = '14_Nowa_nieruchomosc_X_lat'
+
+
+def _passes(price, equity, income, c=DEFAULT_CONSTANTS):
+    """Oba testy sekcji D arkusza 14: wkład własny i Tragbarkeit (koszty banku wiersze 38–44)."""
+    loan = price - equity
+    h2 = np.maximum(0.0, price * (1 - c['target_ltv']) - equity)
+    costs = h2 / c['amort_years'] + loan * c['test_rate'] + price * c['maintenance']
+    return (equity >= price * c['min_down_total'] - 1e-6) & (costs <= c['max_tragbarkeit'] * income + 1e-6)
+
+
+def test_new_property_matches_sheet(workbook, client):
+    inputs, constants, cells = split_clients([client])
+    options = {key: cells[0][(NEW_PROPERTY, cell)] for key, cell in
+               (('income_growth', 'B22'), ('savings', 'B23'), ('sale_share', 'B24'))}
+    position = new_property_position(inputs, constants, **sale_parameters(cells[0]), **options)
+    names = {'income': 'B29', 'equity': 'B32', 'max_price': 'B33'}
+    values = read_cells(workbook, [(NEW_PROPERTY, cell) for cell in names.values()])
+    for name, cell in names.items():
+        assert values[(NEW_PROPERTY, cell)] == pytest.approx(float(position[name][0]), rel=1e-9), name
+
+
+def test_max_price_is_the_tightest_passing_price():
+    rng = np.random.default_rng(3)
+    equity = rng.uniform(20_000, 800_000, 500)
+    income = rng.uniform(40_000, 400_000, 500)
+    price = max_affordable_price(equity, income)
+    assert _passes(price, equity, income).all()
+    assert not _passes(price * (1 + 1e-6), equity, income).any()
+
+
+def test_no_income_or_equity_gives_zero():
+    np.testing.assert_array_equal(max_affordable_price([0.0, 100_000.0], [100_000.0, 0.0]), [0.0, 0.0])
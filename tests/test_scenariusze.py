@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Scenariusze wzrostu wartości × plany remontów (renovation_scenarios, read_plans) a arkusz 16_Renowacje."""
+
+import json
+
+import numpy as np
+import pytest
+
+from conftest import YEARS
+from kalkulator_silnik import APPRECIATION_CELLS, renovation_scenarios
+from kalkulator_xlsx import read_cells
+
+RENOVATION = '16_Renowacje'
+APPRECIATION = '08_Symulacja_wzrostu_wartości'
+GROWTH = [0.0, 0.02, 0.04]
+PLAN = [{'year': 5, 'cost': 40_000, 'raises_standard': 1}, {'year': 8, 'cost': 25_000, 'raises_standard': 0},
+        {'year': 12, 'cost': 60_000, 'raises_standard': 1}]
+
+# Kolumny tabeli G35:K(35+years) arkusza 16 (wiersz 35 = rok 0)
+CUBE_COLUMNS = {'cost': 'E', 'value': 'J', 'added_value': 'K'}
+
+
+def test_renovation_scenarios_match_sheet(script, client, tmp_path):
+    client = dict(client, **{f'{APPRECIATION}!{cell}': g for cell, g in zip(APPRECIATION_CELLS.values(), GROWTH)})
+    client[f'{RENOVATION}!B7'] = 3
+    for row, item in enumerate(PLAN, start=17):
+        for column, key in zip('CDE', ('year', 'cost', 'raises_standard')):
+            client[f'{RENOVATION}!{column}{row}'] = item[key]
+    path = tmp_path / 'kalkulator_A.xlsx'
+    script.save_workbook(script.build_workbook(client, years=YEARS), str(path), cached_values=True)
+    
+    rows = range(36, 36 + YEARS)
+    values = read_cells(path, [(RENOVATION, f'{column}{row}') for row in rows for column in CUBE_COLUMNS.values()])
+    cube = renovation_scenarios(client, GROWTH, [PLAN], years=YEARS)
+    for name, column in CUBE_COLUMNS.items():
+        actual = np.array([values[(RENOVATION, f'{column}{row}')] for row in rows], dtype=float)
+        np.testing.assert_allclose(actual, cube[name][2, 0, 1:], rtol=1e-9, atol=1e-6, err_msg=name)
+
+
+def test_renovation_fields_from_text(client):
+    """Rok i flaga remontu z pliku planów jako tekst/true liczone jak liczby."""
+    plans = [
+        [{'year': 5, 'cost': 40_000, 'raises_standard': 1}, {'year': 8, 'cost': 25_000, 'raises_standard': 1}],
+        [{'year': '5', 'cost': 40_000, 'raises_standard': '1'}, {'year': 8.0, 'cost': 25_000, 'raises_standard': True}],
+    ]
+    cube = renovation_scenarios(client, [0.0, 0.02], plans, years=YEARS)
+    np.testing.assert_array_equal(cube['value'][:, 0], cube['value'][:, 1])
+    assert cube['cost'][0, 1, YEARS] == 65_000
+
+
+def test_read_plans(script, tmp_path):
+    path = tmp_path / 'plany.json'
+    path.write_text(json.dumps({'investment_share': 0.5, 'plans': [{'name': 'bez remontów'}, PLAN]}),
+                    encoding='utf-8')
+    plans, share = script.read_plans(str(path))
+    assert share == 0.5
+    assert [(plan['name'], plan['renovations']) for plan in plans] == [('bez remontów', []), ('plan 2', PLAN)]
+
+
+def test_read_plans_names_the_bad_plan(script, tmp_path):
+    path = tmp_path / 'plany.json'
+    path.write_text(json.dumps([{'name': 'dach', 'renovations': {'year': 3}}]), encoding='utf-8')
+    with pytest.raises(ValueError, match="plan 'dach'"):
+        script.read_plans(str(path))
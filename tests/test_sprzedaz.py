@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Sprzedaż w każdym roku (sale_sweep) a tabela arkusza 12_Analiza_sprzedazy_X_lat."""
+
+import numpy as np
+import pytest
+
+from conftest import YEARS
+from kalkulator_silnik import key_outputs, sale_parameters, sale_sweep, split_clients
+from kalkulator_xlsx import read_cells
+
+SALE = '12_Analiza_sprzedazy_X_lat'
+NEW_PROPERTY = '14_Nowa_nieruchomosc_X_lat'
+
+# Kolumny tabeli A44:H(44+years) arkusza 12
+SWEEP_COLUMNS = {'value': 'B', 'costs': 'C', 'balance': 'D', 'net_proceeds': 'E', 'profit': 'F', 'roi': 'G',
+                 'cagr': 'H'}
+
+
+def test_sale_sweep_matches_sheet(workbook, client):
+    inputs, constants, cells = split_clients([client])
+    sale = sale_parameters(cells[0])
+    sweep = sale_sweep(inputs, YEARS, growth=sale['growth'], sale_costs=sale['sale_costs'], constants=constants)
+    
+    rows = range(45, 45 + YEARS)
+    wanted = [(SALE, f'{column}{row}') for row in rows for column in SWEEP_COLUMNS.values()] + [(SALE, 'B42')]
+    values = read_cells(workbook, wanted)
+    for name, column in SWEEP_COLUMNS.items():
+        actual = np.array([values[(SALE, f'{column}{row}')] for row in rows], dtype=float)
+        np.testing.assert_allclose(actual, sweep[name][0], rtol=1e-9, atol=1e-6, err_msg=name)
+    assert values[(SALE, 'B42')] == sweep['best_year'][0]
+
+
+def test_sale_sweep_matches_single_sale(client):
+    """Wiersz X tabeli to wynik sprzedaży po X latach (12!B30 przy B7 = X)."""
+    inputs, constants, cells = split_clients([client])
+    sale = sale_parameters(cells[0])
+    sweep = sale_sweep(inputs, YEARS, growth=sale['growth'], sale_costs=sale['sale_costs'], constants=constants)
+    for x in (1, 7, YEARS):
+        proceeds = key_outputs(inputs, constants, x, sale['growth'], sale['sale_costs'])['net_sale_proceeds']
+        assert sweep['net_proceeds'][0, x - 1] == pytest.approx(float(proceeds[0]), rel=1e-12)
+
+
+def test_sale_beyond_horizon_is_na(script, client, tmp_path):
+    """X (12!B7) większe niż horyzont --years: #N/A zamiast salda spoza harmonogramu."""
+    client = dict(client, **{f'{SALE}!B7': 15})
+    path = tmp_path / 'kalkulator_A.xlsx'
+    script.save_workbook(script.build_workbook(client, years=10), str(path), cached_values=True)
+    cells = [(SALE, 'B30'), (NEW_PROPERTY, 'B32'), ('16_Renowacje', 'B54'), ('16_Renowacje', 'B55')]
+    assert set(read_cells(path, cells).values()) == {'#N/A'}
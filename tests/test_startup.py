@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""Koszt importu skryptu (python -X importtime), jak w benchmark_kalkulator.py."""
+
+import pytest
+
+import benchmark_kalkulator
+
+
+def test_import_does_not_load_openpyxl():
+    result = benchmark_kalkulator.bench_startup(1)
+    assert not result['openpyxl'], result['heaviest']
+
+
+@pytest.mark.benchmark
+def test_import_within_budget(pytestconfig):
+    budget = pytestconfig.getoption('--import-budget')
+    result = benchmark_kalkulator.bench_startup(3)
+    assert result['seconds'] <= budget, result['heaviest']
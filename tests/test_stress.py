@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Powierzchnia szoków H1 × H2 (stress_surface) a siatka arkusza 11_Stress_test."""
+
+import numpy as np
+import pytest
+
+from kalkulator_silnik import split_clients, stress_surface
+from kalkulator_xlsx import read_cells
+
+STRESS = '11_Stress_test'
+COLUMNS = 'BCDEFGHIJ'
+ROWS = range(29, 29 + len(COLUMNS))
+
+
+@pytest.mark.parametrize('test_rate_shock', [0.0, 0.01])
+def test_stress_surface_matches_sheet(script, client, tmp_path, test_rate_shock):
+    client = dict(client, **{f'{STRESS}!B24': test_rate_shock})
+    path = tmp_path / 'kalkulator_A.xlsx'
+    script.save_workbook(script.build_workbook(client), str(path), cached_values=True)
+    
+    wanted = ([(STRESS, f'{column}28') for column in COLUMNS] + [(STRESS, f'A{row}') for row in ROWS]
+              + [(STRESS, f'{column}{row}') for row in ROWS for column in COLUMNS] + [(STRESS, 'B25')])
+    values = read_cells(path, wanted)
+    h1_shocks = [values[(STRESS, f'A{row}')] for row in ROWS]
+    h2_shocks = [values[(STRESS, f'{column}28')] for column in COLUMNS]
+    
+    inputs, constants, _ = split_clients([client])
+    surface = stress_surface(inputs[0], h1_shocks, h2_shocks, [test_rate_shock], constants)
+    grid = np.array([[values[(STRESS, f'{column}{row}')] for column in COLUMNS] for row in ROWS], dtype=float)
+    np.testing.assert_allclose(grid, surface['tragbarkeit'], rtol=1e-12)
+    assert values[(STRESS, 'B25')] == pytest.approx(float(surface['bank_tragbarkeit'][0]), rel=1e-12)
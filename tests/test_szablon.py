@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Tryb --template (WorkbookTemplate) a pełne budowanie skoroszytu klienta."""
+
+import io
+
+import pytest
+
+from kalkulator_xlsx import WorkbookTemplate, read_package, read_workbook_cells
+
+
+def _workbook_bytes(script, inputs=None, cached_values=False, years=30, streaming=False):
+    buffer = io.BytesIO()
+    wb = script.build_workbook(inputs, years=years, streaming=streaming)
+    if cached_values:
+        wb.calculation.fullCalcOnLoad = False
+    wb.save(buffer)
+    data = buffer.getvalue()
+    return script.add_cached_values(data) if cached_values else data
+
+
+def _values(data):
+    """Wartości zapisane w komórkach (wyniki formuł) wszystkich arkuszy."""
+    import openpyxl
+    wb = openpyxl.load_workbook(io.BytesIO(data), data_only=True)
+    return {ws.title: {(cell.row, cell.column): cell.value for row in ws.iter_rows() for cell in row
+                       if cell.value is not None}
+            for ws in wb}
+
+
+@pytest.mark.parametrize('cached_values', [False, True])
+@pytest.mark.parametrize('years, streaming', [(10, False), (30, False), (30, True)])
+def test_template_matches_full_build(script, client, cached_values, years, streaming):
+    template = WorkbookTemplate(_workbook_bytes(script, years=years, streaming=streaming))
+    rendered = template.render(script.input_cells(client), cached_values=cached_values)
+    built = _workbook_bytes(script, client, cached_values=cached_values, years=years, streaming=streaming)
+    
+    assert read_workbook_cells(read_package(rendered)) == read_workbook_cells(read_package(built))
+    if cached_values:
+        assert _values(rendered) == _values(built)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Główne wyniki silnika (key_outputs) i analiza wrażliwości (sensitivity) a arkusze 03, 04 i 12."""
+
+import pytest
+
+from conftest import YEARS
+from kalkulator_silnik import key_outputs, sale_parameters, sensitivity, split_clients
+from kalkulator_xlsx import read_cells
+
+SALE = '12_Analiza_sprzedazy_X_lat'
+
+# Komórki arkuszy odpowiadające wynikom key_outputs
+OUTPUT_CELLS = {
+    'tragbarkeit': ('03_Tragbarkeit', 'B11'),
+    'monthly_cash_out': ('04_Cashflow', 'B8'),
+    'net_sale_proceeds': (SALE, 'B30'),
+}
+
+
+def test_key_outputs_match_sheets(workbook, client):
+    inputs, constants, cells = split_clients([client])
+    outputs = key_outputs(inputs, constants, **sale_parameters(cells[0]))
+    values = read_cells(workbook, list(OUTPUT_CELLS.values()))
+    for name, cell in OUTPUT_CELLS.items():
+        assert values[cell] == pytest.approx(float(outputs[name][0]), rel=1e-9), name
+
+
+def test_sensitivity_base_is_key_outputs(client):
+    inputs, constants, cells = split_clients([client])
+    sale = sale_parameters(cells[0])
+    outputs = key_outputs(inputs, constants, **sale)
+    for name, rows in sensitivity(inputs[0], bump=0.1, **sale).items():
+        assert all(row['base'] == pytest.approx(float(outputs[name][0]), rel=1e-12) for row in rows), name
+        swings = [row['swing'] for row in rows]
+        assert swings == sorted(swings, reverse=True)
+
+
+def test_blank_sale_fields_match_sheet(script, client, tmp_path):
+    """Puste 12!B7..B9 to 0 – w arkuszu i w sale_parameters."""
+    client = {key: value for key, value in client.items() if not key.startswith(SALE)}
+    path = tmp_path / 'kalkulator_A.xlsx'
+    script.save_workbook(script.build_workbook(client, years=YEARS), str(path), cached_values=True)
+    inputs, constants, cells = split_clients([client])
+    expected = key_outputs(inputs, constants, **sale_parameters(cells[0]))['net_sale_proceeds'][0]
+    assert read_cells(path, [(SALE, 'B30')])[(SALE, 'B30')] == pytest.approx(float(expected), rel=1e-9)
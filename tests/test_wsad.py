@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Tryb wsadowy (--batch): nazwy plików klientów i błędne dane wejściowe."""
+
+import os
+
+import pytest
+
+from kalkulator_silnik import write_clients
+
+
+@pytest.mark.parametrize('template', [False, True])
+def test_batch_rejects_text_inputs_and_keeps_duplicate_ids(script, client, tmp_path, template):
+    clients = [dict(client, id='a b'), dict(client, id='a_b'), dict(client, id='zły', price='abc')]
+    write_clients(str(tmp_path / 'klienci.csv'), clients)
+    output_dir = tmp_path / 'wyniki'
+    argv = ['--batch', str(tmp_path / 'klienci.csv'), '--output-dir', str(output_dir), '--workers', '2']
+    
+    failures = script.run_batch(script.parse_args(argv + (['--template'] if template else [])))
+    
+    assert failures == 1
+    assert sorted(os.listdir(output_dir)) == ['kalkulator_a_b.xlsx', 'kalkulator_a_b_2.xlsx']
+
+
+def test_client_filename_suffixes_taken_names(script):
+    taken = set()
+    names = [os.path.basename(script.client_filename('', client_id, taken)) for client_id in ('A', 'a', 'A_2', 'A')]
+    assert names == ['kalkulator_A.xlsx', 'kalkulator_a_2.xlsx', 'kalkulator_A_2_2.xlsx', 'kalkulator_A_3.xlsx']